@@ -0,0 +1,40 @@
+import sys
+import pyzx as zx
+import os
+import time
+import gc
+import tracemalloc
+
+# Compares the memory use and simplification/extraction throughput of the
+# graph backends on a set of benchmark circuits.
+# Usage: python benchmark_backends.py [circuit directory] [backend1 backend2 ...]
+
+def measure(c, backend):
+    gc.collect()
+    tracemalloc.start()
+    g = c.to_graph(backend=backend)
+    mem_graph = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nverts = g.num_vertices()
+    t = time.time()
+    zx.simplify.full_reduce(g, quiet=True)
+    time_simpl = time.time() - t
+    t = time.time()
+    zx.extract.streaming_extract(g, quiet=True)
+    time_extr = time.time() - t
+    return nverts, mem_graph, time_simpl, time_extr
+
+if __name__ == '__main__':
+    d = sys.argv[1] if len(sys.argv) > 1 else os.path.join('circuits', 'Slow')
+    backends = sys.argv[2:] if len(sys.argv) > 2 else [b for b in ('simple', 'compact', 'igraph') 
+                                                        if b in zx.graph.graph.backends]
+    fnames = [f for f in sorted(os.listdir(d)) if f.find('before') != -1]
+    print("Circuit".ljust(20), "backend".rjust(8), "vertices".rjust(9), "mem (kB)".rjust(10),
+            "B/vertex".rjust(9), "Time-Simp".rjust(10), "Time-Extract".rjust(13))
+    for f in fnames:
+        c = zx.Circuit.load(os.path.join(d, f)).to_basic_gates()
+        for b in backends:
+            nverts, mem, ts, te = measure(c, b)
+            print(f[:-7].ljust(20), b.rjust(8), str(nverts).rjust(9), "{:.1f}".format(mem/1024).rjust(10),
+                "{:.1f}".format(mem/nverts).rjust(9), "{:.2f}".format(ts).rjust(10), "{:.2f}".format(te).rjust(13))
+        sys.stdout.flush()
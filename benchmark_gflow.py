@@ -0,0 +1,30 @@
+import sys
+import pyzx as zx
+import os
+import time
+from pyzx.gflow import gflow, fast_gflow
+
+# Compares gflow.gflow with gflow.fast_gflow on the graphs that interior_clifford_simp makes
+# of a set of benchmark circuits. Both should find the same layers.
+# Usage: python benchmark_gflow.py [circuit directory]
+
+def measure(f, g):
+    t = time.time()
+    r = f(g)
+    return time.time() - t, r
+
+if __name__ == '__main__':
+    d = sys.argv[1] if len(sys.argv) > 1 else os.path.join('circuits', 'Fast')
+    fnames = [f for f in sorted(os.listdir(d)) if f.find('before') != -1]
+    print("Circuit".ljust(20), "vertices".rjust(9), "layers".rjust(7), "gflow".rjust(9), "fast_gflow".rjust(11))
+    for f in fnames:
+        c = zx.Circuit.load(os.path.join(d, f)).to_basic_gates()
+        g = c.to_graph()
+        zx.simplify.interior_clifford_simp(g, quiet=True)
+        t2, r2 = measure(fast_gflow, g)
+        t1, r1 = measure(gflow, g)
+        if (r1 is None) != (r2 is None) or (r1 and r1[0] != r2[0]):
+            print("Results differ for", f)
+        print(f[:-7].ljust(20), str(g.num_vertices()).rjust(9), str(r2[2] if r2 else '-').rjust(7),
+            "{:.2f}s".format(t1).rjust(9), "{:.2f}s".format(t2).rjust(11))
+        sys.stdout.flush()
@@ -0,0 +1,60 @@
+import sys
+import pyzx as zx
+import os
+import time
+
+# Compares the time taken by full_reduce when the Clifford simplifications are done
+# by a varying amount of worker processes (see simplify.simp_parallel), which requires
+# the 'fork' start method of multiprocessing (Linux or macOS).
+# Only the matching of id_simp, spider_simp, pivot_simp and lcomp_simp is divided over the workers,
+# so the column 'match' gives the share of the sequential time spent on that, and 'bound' the
+# speedup this allows with the largest amount of workers (Amdahl's law).
+# A speedup can only be expected on a machine with at least as many CPUs as workers:
+# simp_parallel doesn't start more workers than simplify.available_cpus(), and with fewer
+# than two it simplifies sequentially. With --force this limit is lifted, which measures
+# the overhead of the worker processes.
+# Usage: python benchmark_parallel.py [--force] [circuit directory] [nworkers1 nworkers2 ...]
+
+PARALLEL_RULES = ('id_simp', 'spider_simp', 'pivot_simp', 'lcomp_simp')
+
+def measure(c, nworkers):
+    g = c.to_graph()
+    t = time.time()
+    zx.simplify.full_reduce(g, quiet=True, nworkers=nworkers)
+    return time.time() - t, zx.tcount(g)
+
+def match_share(c):
+    g = c.to_graph()
+    stats = zx.simplify.RewriteStats()
+    t = time.time()
+    zx.simplify.full_reduce(g, quiet=True, stats=stats)
+    t = time.time() - t
+    summary = stats.summary()
+    return sum(summary[r]['match_time'] for r in PARALLEL_RULES if r in summary) / t
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--force' in args:
+        args.remove('--force')
+        zx.simplify.available_cpus = lambda: os.cpu_count() * 64
+    d = args[0] if args else os.path.join('circuits', 'Slow')
+    workers = [int(n) for n in args[1:]] if len(args) > 1 else [1, 2, 4, 8]
+    fnames = [f for f in sorted(os.listdir(d)) if f.find('before') != -1]
+    print("CPUs available: {:d}, workers started at most: {:d}".format(os.cpu_count(),
+        zx.simplify.available_cpus()))
+    print("Circuit".ljust(20), "vertices".rjust(9), *("{:d} workers".format(n).rjust(17) for n in workers),
+        "match".rjust(7), "bound".rjust(7))
+    totals = [0.0]*len(workers)
+    for f in fnames:
+        c = zx.Circuit.load(os.path.join(d, f)).to_basic_gates()
+        results = [measure(c, n) for n in workers]
+        if any(tc != results[0][1] for _, tc in results):
+            print("T-counts differ for {}: {}".format(f, [tc for _, tc in results]))
+        t1 = results[0][0]
+        p = match_share(c)
+        for k, (t, _) in enumerate(results): totals[k] += t
+        print(f[:-7].ljust(20), str(c.to_graph().num_vertices()).rjust(9),
+            *("{:.2f}s ({:.2f}x)".format(t, t1/t).rjust(17) for t, _ in results),
+            "{:.0%}".format(p).rjust(7), "{:.2f}x".format(1/((1-p) + p/max(workers))).rjust(7))
+        sys.stdout.flush()
+    print("Total".ljust(20), "".rjust(9), *("{:.2f}s ({:.2f}x)".format(t, totals[0]/t).rjust(17) for t in totals))
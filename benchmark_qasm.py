@@ -0,0 +1,52 @@
+import sys
+import pyzx as zx
+import os
+import time
+import tempfile
+from pyzx.circuit import QASMParser
+from pyzx.qasm import load_qasm
+
+# Compares the time it takes QASMParser and the single-pass qasm.load_qasm to read
+# multi-megabyte QASM files. These are made by repeating the gates of a set of benchmark circuits
+# until the file has the given size. Both parsers should give the same circuit.
+# Usage: python benchmark_qasm.py [circuit directory] [size in MB]
+
+def measure(f, fname):
+    t = time.time()
+    r = f(fname)
+    return time.time() - t, r
+
+def old_parser(fname):
+    f = open(fname, 'r')
+    s = f.read()
+    f.close()
+    return QASMParser().parse(s)
+
+if __name__ == '__main__':
+    d = sys.argv[1] if len(sys.argv) > 1 else os.path.join('circuits', 'Fast')
+    size = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    fnames = [f for f in sorted(os.listdir(d)) if f.find('before') != -1]
+    tmp = tempfile.mkdtemp()
+    print("Circuit".ljust(20), "MB".rjust(6), "gates".rjust(9), "QASMParser".rjust(11),
+          "load_qasm".rjust(10), "compact".rjust(9))
+    for f in fnames:
+        c = zx.Circuit.load(os.path.join(d, f))
+        lines = c.to_qasm().splitlines()
+        body = "\n".join(lines[3:]) + "\n"
+        fname = os.path.join(tmp, f + '.qasm')
+        with open(fname, 'w') as out:
+            out.write("\n".join(lines[:3]) + "\n")
+            written = 0
+            while written < size * 2**20:
+                written += out.write(body)
+        t1, r1 = measure(old_parser, fname)
+        t2, r2 = measure(load_qasm, fname)
+        t3, r3 = measure(lambda n: load_qasm(n, compact=True), fname)
+        if r1.gates != r2.gates or r1.qubits != r2.qubits or len(r3) != len(r1.gates):
+            print("Results differ for", f)
+        print(f[:-7].ljust(20), "{:.1f}".format(os.path.getsize(fname) / 2**20).rjust(6),
+            str(len(r1.gates)).rjust(9), "{:.2f}s".format(t1).rjust(11),
+            "{:.2f}s".format(t2).rjust(10), "{:.2f}s".format(t3).rjust(9))
+        os.remove(fname)
+        sys.stdout.flush()
+    os.rmdir(tmp)
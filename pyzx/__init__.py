@@ -22,6 +22,7 @@ from .simplify import *
 from .io import *
 from .tensor import *
 from .circuit import Circuit
+from .compact_circuit import CompactCircuit
 from .combs.combDefinition import *
 from .combs.combRouting import *
 from . import quantomatic
@@ -34,6 +35,8 @@ from . import optimize
 from . import simplify
 from . import d3
 from . import utils
+from . import canonical
+from . import qasm
 from .routing import cnot_mapper
 from .routing import architecture
 from . import tikz
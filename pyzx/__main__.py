@@ -20,6 +20,7 @@ Run one of the scripts supplied with PyZX.
 
 The options for command are:
     opt    -- Optimise a circuit using PyZX
+    batch  -- Optimise all the circuits in a directory in parallel
     tikz   -- Convert a circuit into a Tikz file
     mapper -- Map CNOT circuits onto restricted architectures
     router -- Map any circuit onto restricted architectures
@@ -48,13 +49,16 @@ if __name__ == '__main__':
         parser.print_help()
         exit(1)
     args = parser.parse_args(sys.argv[1:2])
-    if args.command not in ('opt', 'tikz', 'mapper', 'router', 'cnots', 'phasepoly', 'train'):
+    if args.command not in ('opt', 'batch', 'tikz', 'mapper', 'router', 'cnots', 'phasepoly', 'train'):
         print("Unrecognized command '{}'".format(args.command))
         parser.print_help()
         exit(1)
 
     if args.command == 'opt':
         circ2circ.main(sys.argv[2:])
+    if args.command == 'batch':
+        from .scripts import batch
+        batch.main(sys.argv[2:])
     if args.command == 'tikz':
         circ2tikz.main(sys.argv[2:])
     if args.command == 'mapper':
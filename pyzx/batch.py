@@ -0,0 +1,302 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Runs the optimisation pipeline of ``python -m pyzx opt`` on many circuits at once.
+The main function is :func:`run_batch`, which optimises the circuits using a pool of
+worker processes and writes a line of statistics for every circuit to a JSONL or CSV file
+as soon as it is done. It can also be run from the command line using ``python -m pyzx batch``.
+"""
+
+import os
+import csv
+import json
+import time
+from collections import deque
+
+try:
+    import multiprocessing as mp
+    from multiprocessing.connection import wait
+except ImportError:
+    pass
+
+from .circuit import Circuit, determine_file_type, circuit_writers, write_circuit
+from . import simplify
+from . import extract
+from . import optimize
+
+__all__ = ['optimize_circuit', 'optimize_file', 'batch_sources', 'read_results', 'run_batch']
+
+FIELDS = ['source', 'status', 'error', 'qubits', 'gates_before', 'tcount_before', 'twoqubit_before',
+          'gates_after', 'tcount_after', 'twoqubit_after', 'time', 'dest', 'cached']
+"""The fields of a result of :func:`run_batch`, in the order they appear in a CSV file."""
+
+
+def optimize_circuit(c, simp='full', phasepoly=False, quiet=True):
+    """Optimises a circuit by simplifying its ZX-diagram, extracting a circuit from it,
+    and optimising that circuit further. Returns a new circuit consisting of basic gates.
+
+    :param c: The :class:`~circuit.Circuit` to optimise.
+    :param simp: The simplification routine to use: ``'full'`` for :func:`~simplify.full_reduce`,
+       ``'cliff'`` for :func:`~simplify.clifford_simp` or ``'tele'`` for :func:`~simplify.teleport_reduce`.
+    :param phasepoly: Whether to use :func:`~optimize.full_optimize` instead of
+       :func:`~optimize.basic_optimization` on the extracted circuit.
+    :param quiet: Whether to print information on the progress."""
+    if simp not in ('full', 'cliff', 'tele'):
+        raise ValueError("Unknown simplifier {}. Please use full, cliff or tele".format(simp))
+    g = c.to_graph()
+    if not quiet: print("Running simplification algorithm...")
+    if simp == 'tele':
+        g = simplify.teleport_reduce(g,quiet=quiet)
+        c2 = Circuit.from_graph(g)
+        c2 = c2.split_phase_gates()
+    else:
+        if simp == 'full':
+            simplify.full_reduce(g,quiet=quiet)
+        if simp == 'cliff':
+            simplify.clifford_simp(g,quiet=quiet)
+        if not quiet: print("Extracting circuit...")
+        c2 = extract.streaming_extract(g)
+    if not quiet: print("Optimizing...")
+    if phasepoly:
+        c3 = optimize.full_optimize(c2.to_basic_gates())
+    else:
+        c3 = optimize.basic_optimization(c2.to_basic_gates())
+    c3 = c3.to_basic_gates()
+    return c3.split_phase_gates()
+
+def optimize_file(source, dest=None, outformat='match', simp='full', phasepoly=False, cache=None):
+    """Loads the circuit in the file ``source``, optimises it with :func:`optimize_circuit`
+    and returns a dictionary with the fields of :data:`FIELDS` describing the circuits
+    before and after. The gate counts are those of the circuits decomposed into basic gates,
+    but like ``python -m pyzx opt`` it optimises the circuit as it is loaded, so that
+    both give the same result for the same file.
+
+    :param dest: If given, the optimised circuit is written to this file.
+    :param outformat: The format of the output file (qasm, qc or quipper).
+       By default the same as that of ``source``.
+    :param cache: An optional :class:`~cache.CircuitCache`. If it contains the result
+       of optimising the same circuit in the same way, that result is used,
+       and ``cached`` is set to True in the returned dictionary.
+    The other parameters are passed to :func:`optimize_circuit`."""
+    c = Circuit.load(source)
+    b = c.to_basic_gates()
+    r = {'source': source, 'qubits': b.qubits, 'gates_before': len(b.gates),
+         'tcount_before': b.tcount(), 'twoqubit_before': b.twoqubitcount()}
+    if cache is not None:
+        hits = cache.hits
+        c2 = cache.optimize(c, optimize_circuit, simp=simp, phasepoly=phasepoly)
+        r['cached'] = cache.hits > hits
+    else:
+        c2 = optimize_circuit(c, simp, phasepoly)
+    r.update({'gates_after': len(c2.gates), 'tcount_after': c2.tcount(),
+              'twoqubit_after': c2.twoqubitcount()})
+    if dest:
+        dtype = determine_file_type(source) if outformat == 'match' else outformat
+        if dtype not in circuit_writers:
+            raise ValueError("Unsupported circuit type {}. Please use qasm, qc or quipper".format(dtype))
+        f = open(dest, 'w')
+        try: write_circuit(f, c2, dtype)
+        except BaseException: # Don't leave an incomplete file behind
+            f.close()
+            os.remove(dest)
+            raise
+        f.close()
+        r['dest'] = dest
+    return r
+
+def batch_sources(path):
+    """Returns the list of circuit files to optimise. If ``path`` is a directory, these are
+    the files in it (not those in subdirectories), in alphabetical order.
+    Otherwise ``path`` should be a manifest: a text file listing a file on every line.
+    Relative paths in a manifest are taken relative to the directory of the manifest,
+    and empty lines and lines starting with ``#`` are ignored."""
+    if os.path.isdir(path):
+        return [os.path.join(path, f) for f in sorted(os.listdir(path))
+                if not f.startswith('.') and os.path.isfile(os.path.join(path, f))]
+    base = os.path.dirname(path)
+    sources = []
+    f = open(path, 'r')
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        sources.append(os.path.join(base, line))
+    f.close()
+    return sources
+
+def _is_csv(output):
+    return os.path.splitext(output)[1].lower() == '.csv'
+
+def read_results(output):
+    """Returns the list of results stored by :func:`run_batch` in the JSONL or CSV file ``output``.
+    Incomplete lines, as left behind when a batch was interrupted, are ignored."""
+    if not os.path.exists(output): return []
+    f = open(output, 'r', newline='')
+    lines = f.read().splitlines(True)
+    f.close()
+    if _is_csv(output): 
+        results = list(csv.DictReader(lines))
+    else:
+        results = []
+        for line in lines:
+            try: results.append(json.loads(line))
+            except ValueError: pass
+    return [r for r in results if r.get('status') in ('ok', 'error', 'timeout')]
+
+def _batch_worker(conn, options):
+    """Loop run by each of the worker processes of :func:`run_batch`. It receives pairs of
+    a source and a destination file, and sends back the result of :func:`optimize_file`."""
+    try:
+        while True:
+            task = conn.recv()
+            if task is None: break
+            source, dest = task
+            t = time.perf_counter()
+            try:
+                r = optimize_file(source, dest, **options)
+                r['status'] = 'ok'
+            except Exception as e:
+                r = {'source': source, 'status': 'error', 'error': "{}: {}".format(type(e).__name__, e)}
+            r['time'] = time.perf_counter() - t
+            conn.send(r)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+def run_batch(sources, output, nworkers=None, timeout=None, outdir=None, outformat='match',
+              simp='full', phasepoly=False, resume=True, callback=None, cache=None):
+    """Optimises many circuits with :func:`optimize_file`, using ``nworkers`` processes.
+    The worker processes are reused for the next circuit, except when a circuit takes longer
+    than ``timeout`` seconds, in which case its worker is terminated and replaced by a new one.
+    The result of each circuit is appended to ``output`` as soon as it is done,
+    as a line of JSON, or of CSV if the filename ends with ``.csv``. Its ``status`` is
+    ``'ok'``, ``'error'`` (with the exception in ``error``) or ``'timeout'``.
+
+    :param sources: A list of files, or a directory or manifest as accepted by :func:`batch_sources`.
+    :param output: The file to which the results are written.
+    :param nworkers: The amount of worker processes. By default the amount of CPUs.
+    :param timeout: If given, the maximal amount of seconds that is spent on a single circuit.
+    :param outdir: If given, the optimised circuits are written to this directory,
+       using the name of the source file with the extension of ``outformat``.
+    :param outformat: The format of the optimised circuits. See :func:`optimize_file`.
+    :param simp: The simplification routine to use. See :func:`optimize_circuit`.
+    :param phasepoly: Whether to use the phase-polynomial optimiser. See :func:`optimize_circuit`.
+    :param resume: If True (the default), the circuits that already have a result in ``output``
+       are skipped, so that an interrupted batch can be continued by running it again.
+       Otherwise ``output`` is overwritten.
+    :param callback: Optional function that is called with each result as it comes in.
+    :param cache: An optional :class:`~cache.CircuitCache` that is shared by the workers,
+       so that circuits that were optimised before, in this or another batch, are not optimised again.
+    :rtype: The list of results of the circuits that were optimised in this call."""
+    if isinstance(sources, str): sources = batch_sources(sources)
+    if nworkers is None: nworkers = os.cpu_count() or 1
+    if outdir and not os.path.exists(outdir): os.makedirs(outdir)
+    done = set()
+    if resume: done = set(r['source'] for r in read_results(output))
+    elif os.path.exists(output): os.remove(output)
+    pending = deque()
+    for source in sources:
+        if source in done: continue
+        dest = None
+        if outdir:
+            dtype = outformat
+            if outformat == 'match':
+                try: dtype = determine_file_type(source)
+                except (TypeError, OSError): dtype = 'qasm' # the worker reports the error
+            name = os.path.splitext(os.path.basename(source))[0]
+            dest = os.path.join(outdir, name + '.' + dtype)
+        pending.append((source, dest))
+    if not pending: return []
+
+    options = {'outformat': outformat, 'simp': simp, 'phasepoly': phasepoly, 'cache': cache}
+    def start_worker():
+        parent_conn, child_conn = mp.Pipe()
+        p = mp.Process(target=_batch_worker, args=(child_conn, options))
+        p.daemon = True
+        p.start()
+        child_conn.close()
+        return parent_conn, p
+
+    header = _is_csv(output) and (not os.path.exists(output) or os.path.getsize(output) == 0)
+    partial = False
+    if os.path.exists(output) and os.path.getsize(output) > 0:
+        f = open(output, 'rb')
+        f.seek(-1, os.SEEK_END)
+        partial = f.read(1) != b'\n' # The last line was cut off by an interruption
+        f.close()
+    f = open(output, 'a', newline='')
+    if partial: f.write('\n')
+    if _is_csv(output):
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        if header: writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda r: f.write(json.dumps(r) + '\n')
+    results = []
+    def record(r):
+        write(r)
+        f.flush()
+        results.append(r)
+        if callback: callback(r)
+
+    idle = [start_worker() for _ in range(min(nworkers, len(pending)))]
+    busy = dict() # connection -> (process, task, starting time)
+    try:
+        while pending or busy:
+            while idle and pending:
+                conn, p = idle.pop()
+                task = pending.popleft()
+                conn.send(task)
+                busy[conn] = (p, task, time.perf_counter())
+            wait_time = None
+            if timeout is not None:
+                first = min(start for p, task, start in busy.values())
+                wait_time = max(0.0, first + timeout - time.perf_counter())
+            for conn in wait(list(busy), wait_time):
+                p, task, start = busy.pop(conn)
+                try:
+                    r = conn.recv()
+                except EOFError: # The worker died, for instance because it ran out of memory
+                    r = {'source': task[0], 'status': 'error', 'time': time.perf_counter() - start,
+                         'error': "Worker process exited with code {}".format(p.exitcode)}
+                    conn.close()
+                    p.join()
+                    conn, p = start_worker()
+                record(r)
+                idle.append((conn, p))
+            if timeout is not None:
+                now = time.perf_counter()
+                for conn, (p, task, start) in list(busy.items()):
+                    if now - start < timeout: continue
+                    del busy[conn]
+                    p.terminate()
+                    p.join()
+                    conn.close()
+                    record({'source': task[0], 'status': 'timeout', 'time': now - start})
+                    idle.append(start_worker())
+    finally:
+        for conn, p in idle:
+            try: conn.send(None)
+            except (OSError, EOFError): pass
+            conn.close()
+        for conn, (p, task, start) in busy.items():
+            p.terminate()
+            conn.close()
+        for conn, p in idle: p.join()
+        for p, task, start in busy.values(): p.join()
+        f.close()
+    return results
@@ -0,0 +1,221 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Contains an on-disk cache of optimised circuits, so that optimising a circuit
+that was seen before doesn't have to redo the work. The entries are addressed by a hash
+of the input circuit and of the optimisation routine and its parameters, see :class:`CircuitCache`.
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import tempfile
+from fractions import Fraction
+
+from .circuit import Circuit, gate_types
+
+__all__ = ['CircuitCache', 'circuit_hash', 'dump_circuit', 'load_circuit']
+
+CACHE_VERSION = 1
+"""Version of the cache format. It is part of every key, so that changing it invalidates all entries
+that were stored before. It should be increased when the optimisation routines change their output."""
+
+_gate_classes = {cls.__name__: cls for cls in gate_types.values()}
+
+def _encode(x):
+    if isinstance(x, Fraction): return {'fraction': str(x)}
+    raise TypeError("Can't store {!r} in the cache".format(x))
+
+def _decode(d):
+    if 'fraction' in d: return Fraction(d['fraction'])
+    return d
+
+def _dumps(x):
+    return json.dumps(x, default=_encode, sort_keys=True, separators=(',',':'))
+
+def _gates(c):
+    return [[type(g).__name__, vars(g)] for g in c.gates]
+
+def circuit_hash(c):
+    """Returns a hash of the gates of the circuit ``c`` as a hexadecimal string.
+    Circuits with the same gates on the same amount of qubits get the same hash,
+    regardless of their name or the file they were loaded from."""
+    return hashlib.sha256(_dumps([c.qubits, _gates(c)]).encode('utf-8')).hexdigest()
+
+def dump_circuit(c):
+    """Returns a compressed description of the circuit ``c`` as bytes,
+    from which :func:`load_circuit` recreates the exact same gates."""
+    return zlib.compress(_dumps([c.name, c.qubits, _gates(c)]).encode('utf-8'), 6)
+
+def load_circuit(data):
+    """Inverse of :func:`dump_circuit`."""
+    name, qubits, gates = json.loads(zlib.decompress(data).decode('utf-8'), object_hook=_decode)
+    c = Circuit(qubits, name=name)
+    for gname, attribs in gates:
+        cls = _gate_classes[gname]
+        g = cls.__new__(cls)
+        if 'targets' in attribs: attribs['targets'] = tuple(attribs['targets'])
+        g.__dict__.update(attribs)
+        c.gates.append(g)
+    return c
+
+
+class CircuitCache(object):
+    """A cache of optimised circuits stored in the directory ``directory``.
+    Every entry is a separate file, named after the key of the entry,
+    that contains the result of :func:`dump_circuit`.
+
+    Several processes can use the same directory at the same time: entries are written to a
+    temporary file which is then renamed, so that other processes only ever see complete entries,
+    and an entry that disappears because another process evicted it is treated as missing.
+
+    When the cache holds more than ``max_bytes`` bytes or more than ``max_entries`` entries,
+    the least recently used entries are removed until it is back at 90% of the limit.
+    The time of the last use of an entry is the modification time of its file,
+    which is updated when it is read. Every process only counts the entries it writes itself,
+    so when several processes share the directory the cache can temporarily grow beyond
+    the limits, until one of them calls :meth:`evict`.
+
+    Example::
+
+        cache = CircuitCache('cache/', max_bytes=10**9)
+        c2 = cache.optimize(c, optimize.full_optimize) # Computes the result
+        c3 = cache.optimize(c, optimize.full_optimize) # Loads the result from the cache
+
+    :param directory: The directory in which the entries are stored. It is created when necessary.
+    :param max_bytes: Optional bound on the total size of the entries.
+    :param max_entries: Optional bound on the amount of entries."""
+    suffix = '.zxc'
+    def __init__(self, directory, max_bytes=None, max_entries=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(directory): os.makedirs(directory, exist_ok=True)
+        self._bytes, self._entries = 0, 0
+        if max_bytes is not None or max_entries is not None:
+            entries = self._scan()
+            self._bytes, self._entries = sum(e[2] for e in entries), len(entries)
+
+    def key(self, c, pipeline, **params):
+        """Returns the key of the result of optimising the circuit ``c`` with the routine
+        named ``pipeline`` and the keyword parameters ``params``, whose values should be
+        representable as JSON."""
+        h = hashlib.sha256()
+        h.update(json.dumps([CACHE_VERSION, pipeline, params], sort_keys=True).encode('utf-8'))
+        h.update(circuit_hash(c).encode('ascii'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get(self, key):
+        """Returns the circuit stored under ``key``, or None if there is no such entry."""
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+            data = f.read()
+            f.close()
+            c = load_circuit(data)
+        except OSError:
+            self.misses += 1
+            return None
+        except (ValueError, KeyError, TypeError, zlib.error): # A corrupted entry
+            self.misses += 1
+            self._remove(path)
+            return None
+        try: os.utime(path)
+        except OSError: pass
+        self.hits += 1
+        return c
+
+    def put(self, key, c):
+        """Stores the circuit ``c`` under ``key``, replacing an existing entry."""
+        path = self._path(key)
+        data = dump_circuit(c)
+        d = os.path.dirname(path)
+        if not os.path.exists(d): os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, suffix='.tmp')
+        try: old = os.stat(path).st_size # The size of the entry that is replaced
+        except OSError: old = None
+        try:
+            f = os.fdopen(fd, 'wb')
+            f.write(data)
+            f.close()
+            os.replace(tmp, path)
+        except BaseException:
+            self._remove(tmp)
+            raise
+        if old is None:
+            self._bytes += len(data)
+            self._entries += 1
+        else: self._bytes += len(data) - old
+        if ((self.max_bytes is not None and self._bytes > self.max_bytes) or
+            (self.max_entries is not None and self._entries > self.max_entries)):
+            self.evict()
+
+    def optimize(self, c, func, **params):
+        """Returns ``func(c, **params)``, taking it from the cache if it was computed before.
+        ``func`` should be a function from circuits to circuits, like
+        :func:`~optimize.full_optimize` or :func:`~batch.optimize_circuit`."""
+        key = self.key(c, func.__module__ + '.' + func.__name__, **params)
+        c2 = self.get(key)
+        if c2 is None:
+            c2 = func(c, **params)
+            self.put(key, c2)
+        return c2
+
+    def _scan(self):
+        entries = []
+        for d in os.scandir(self.directory):
+            if not d.is_dir(): continue
+            for e in os.scandir(d.path):
+                if not e.name.endswith(self.suffix): continue
+                try: st = e.stat()
+                except OSError: continue
+                entries.append((st.st_mtime, e.path, st.st_size))
+        return entries
+
+    def _remove(self, path):
+        try: os.remove(path)
+        except OSError: pass
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is back at 90% of its limits.
+        This is called automatically by :meth:`put`."""
+        entries = sorted(self._scan())
+        size = sum(e[2] for e in entries)
+        count = len(entries)
+        max_bytes = None if self.max_bytes is None else 0.9*self.max_bytes
+        max_entries = None if self.max_entries is None else int(0.9*self.max_entries)
+        for mtime, path, nbytes in entries:
+            if ((max_bytes is None or size <= max_bytes) and
+                (max_entries is None or count <= max_entries)): break
+            self._remove(path)
+            size -= nbytes
+            count -= 1
+        self._bytes, self._entries = size, count
+
+    def clear(self):
+        """Removes all the entries."""
+        for mtime, path, nbytes in self._scan(): self._remove(path)
+        self._bytes, self._entries = 0, 0
+
+    def __len__(self):
+        return len(self._scan())
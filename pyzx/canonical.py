@@ -0,0 +1,171 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Contains functions to compute fingerprints of ZX-diagrams that don't depend on the
+numbering of the vertices, for instance to detect that two graphs are the same.
+:func:`graph_hash` computes a Weisfeiler-Lehman hash, which is fast, but might
+give the same hash to two graphs that are not isomorphic. :func:`canonical_labelling`
+computes an exact canonical numbering of the vertices, which can be used for
+an exact hash using ``graph_hash(g, exact=True)``.
+
+Both take into account the types and phases of the vertices, the types of the edges,
+and the order of the inputs and outputs. The positions of the vertices (qubits and rows)
+are ignored. They work for all backends.
+"""
+
+import hashlib
+
+import numpy as np
+
+__all__ = ['graph_hash', 'canonical_labelling']
+
+_M1 = np.uint64(0xbf58476d1ce4e5b9)
+_M2 = np.uint64(0x94d049bb133111eb)
+_C = np.uint64(0x9e3779b97f4a7c15)
+_S30, _S27, _S31 = np.uint64(30), np.uint64(27), np.uint64(31)
+
+def _mix(x):
+    """The finalizer of SplitMix64, applied to an array of unsigned 64-bit integers.
+    Spreads every bit of the input over the whole output."""
+    x = x ^ (x >> _S30)
+    x = x * _M1
+    x = x ^ (x >> _S27)
+    x = x * _M2
+    return x ^ (x >> _S31)
+
+def _combine(h, x):
+    return _mix(h * _C + x)
+
+def _arrays(g):
+    """Returns the vertices of ``g`` in some order, the initial colour of every vertex,
+    and the endpoints and types of the edges as indices into this order."""
+    vs = list(g.vertices())
+    index = {v: i for i, v in enumerate(vs)}
+    n = len(vs)
+    types = g.types()
+    phases = g.phases()
+    inputs = {v: i for i, v in enumerate(g.inputs)}
+    outputs = {v: i for i, v in enumerate(g.outputs)}
+    fractions = {}
+    info = np.zeros((n, 5), dtype=np.uint64)
+    mask = 2**64 - 1
+    for i, v in enumerate(vs):
+        p = phases[v]
+        if p not in fractions: fractions[p] = g.phase_fraction(p) % 2
+        f = fractions[p]
+        info[i] = (types[v], f.numerator & mask, f.denominator & mask,
+                   inputs.get(v, -1) & mask, outputs.get(v, -1) & mask)
+    colour = np.zeros(n, dtype=np.uint64)
+    for j in range(5): colour = _combine(colour, info[:,j])
+    m = g.num_edges()
+    s = np.empty(m, dtype=np.int64)
+    t = np.empty(m, dtype=np.int64)
+    et = np.empty(m, dtype=np.uint64)
+    for k, e in enumerate(g.edges()):
+        v, w = g.edge_st(e)
+        s[k], t[k], et[k] = index[v], index[w], g.edge_type(e)
+    return vs, info, colour, s, t, et
+
+def _refine(colour, s, t, et):
+    """Weisfeiler-Lehman refinement. Every round, the colour of a vertex is replaced
+    by a hash of its colour and the multiset of the colours of its neighbours together
+    with the types of the connecting edges. The multiset is hashed by summing the hashes of
+    its elements. This stops when a round doesn't split any of the colour classes."""
+    n = len(colour)
+    classes = len(np.unique(colour))
+    esalt = _mix(et + _C)
+    while True:
+        acc = np.zeros(n, dtype=np.uint64)
+        np.add.at(acc, s, _mix(colour[t] ^ esalt))
+        np.add.at(acc, t, _mix(colour[s] ^ esalt))
+        new = _combine(colour, acc)
+        c = len(np.unique(new))
+        if c == classes: return colour # (new is just a relabelling of colour)
+        colour, classes = new, c
+
+def _digest(*arrays):
+    h = hashlib.sha256()
+    for a in arrays:
+        h.update(np.int64(len(a)).tobytes())
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest()
+
+def graph_hash(g, exact=False):
+    """Returns a hash of the graph ``g`` as a hexadecimal string, which does not depend on
+    the numbering of the vertices. Two graphs that only differ in the numbering of their
+    vertices (and the positions of the vertices) get the same hash.
+
+    By default this is the Weisfeiler-Lehman hash, which can't tell apart certain
+    non-isomorphic graphs with a lot of symmetry. If ``exact`` is True, the hash is computed
+    from the graph renumbered with :func:`canonical_labelling`, so that graphs get the same hash
+    if and only if they are isomorphic (up to collisions of SHA-256).
+    This can take much longer on graphs with many symmetries."""
+    vs, info, colour, s, t, et = _arrays(g)
+    if exact:
+        order = _canonical_order(info, colour, s, t, et)
+        return _digest(*_certificate(order, info, s, t, et))
+    colour = _refine(colour, s, t, et)
+    return _digest(np.sort(colour), np.array([len(s)], dtype=np.int64))
+
+def _certificate(order, info, s, t, et):
+    """Describes the graph with its vertices renumbered such that ``order[i]`` becomes ``i``."""
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    a, b = rank[s], rank[t]
+    edges = np.stack([np.minimum(a,b), np.maximum(a,b), et.astype(np.int64)], axis=1)
+    edges = edges[np.lexsort((edges[:,2], edges[:,1], edges[:,0]))]
+    return info[order], edges
+
+def _canonical_order(info, colour, s, t, et):
+    """Individualisation-refinement search for the numbering of the vertices with the
+    lexicographically smallest :func:`_certificate`. The colour classes are refined as
+    far as possible with :func:`_refine`. When some class still has more than one vertex,
+    each of the vertices of the first such class is given a unique colour in turn,
+    and the search continues from there. As the colours don't depend on the numbering
+    of the vertices, neither does the result."""
+    best = [None, None]
+    def search(colour):
+        colour = _refine(colour, s, t, et)
+        values, counts = np.unique(colour, return_counts=True)
+        if len(values) == len(colour):
+            order = np.argsort(colour)
+            cert = _certificate(order, info, s, t, et)
+            key = (cert[0].tobytes(), cert[1].tobytes())
+            if best[0] is None or key < best[0]:
+                best[0], best[1] = key, order
+            return
+        cell = values[np.argmax(counts > 1)]
+        for v in np.nonzero(colour == cell)[0]:
+            c = colour.copy()
+            c[v:v+1] = _mix(c[v:v+1] ^ _M1)
+            search(c)
+    search(colour)
+    return best[1]
+
+def canonical_labelling(g):
+    """Returns a dictionary mapping every vertex of ``g`` to a number from 0 to
+    ``g.num_vertices()-1``, such that two isomorphic graphs renumbered in this way become
+    identical. Like :func:`graph_hash` this takes into account the types and phases of the vertices,
+    the types of the edges and the order of the inputs and outputs.
+
+    As the inputs and outputs are ordered, most of the vertices of a diagram coming from a circuit
+    can be told apart by :func:`graph_hash`'s refinement alone, and this is fast.
+    The remaining symmetric parts are searched exhaustively, which takes exponential time
+    in the worst case."""
+    vs, info, colour, s, t, et = _arrays(g)
+    order = _canonical_order(info, colour, s, t, et)
+    return {vs[i]: k for k, i in enumerate(order)}
@@ -16,6 +16,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
+import io
 from fractions import Fraction
 import copy
 import math
@@ -23,7 +24,7 @@ import math
 from .graph import Graph
 from .drawing import phase_to_s
 
-__all__ = ['Circuit', 'determine_file_type']
+__all__ = ['Circuit', 'determine_file_type', 'QASMWriter', 'QCWriter', 'QuipperWriter', 'write_circuit']
 
 class Circuit(object):
     """Class for representing quantum circuits.
@@ -77,7 +78,7 @@ class Circuit(object):
         for r in sorted(rows.keys()):
             for v in rows[r]:
                 q = qs[v]
-                phase = phases[v]
+                phase = g.phase_fraction(phases[v])
                 t = ty[v]
                 neigh = [w for w in g.neighbours(v) if rs[w]<r]
                 if len(neigh) != 1:
@@ -141,14 +142,12 @@ class Circuit(object):
     def from_qasm_file(fname):
         """Produces a :class:`Circuit` based on a QASM description of a circuit.
         It ignores all the non-unitary instructions like measurements in the file. 
-        It currently doesn't support custom gates that have parameters."""
-        f = open(fname, 'r')
-        s = f.read()
-        f.close()
-        p = QASMParser()
-        c = p.parse(s)
-        c.name = os.path.basename(fname)
-        return c
+        It currently doesn't support custom gates that have parameters.
+        The file is read in a single pass by :func:`~qasm.load_qasm`. Files that use a custom gate
+        before its definition, which the single pass can't handle, are read again as a whole
+        by :class:`QASMParser`, which also accepts those."""
+        from .qasm import load_qasm
+        return load_qasm(fname)
 
     @staticmethod
     def from_qc_file(fname):
@@ -270,38 +269,17 @@ class Circuit(object):
     def split_phase_gates(self):
         c = Circuit(self.qubits, name=self.name)
         for g in self.gates:
-            if isinstance(g, (ZPhase, XPhase)):
-                if not g.phase: continue
-                if g.phase == 1:
-                    if isinstance(g, ZPhase): c.add_gate("Z", g.target)
-                    else: c.add_gate("NOT", g.target)
-                    continue
-                if isinstance(g, XPhase):
-                    c.add_gate("HAD", g.target)
-                if g.phase.denominator == 2:
-                    if g.phase.numerator % 4 == 1:
-                        c.add_gate("S", g.target)
-                    else: c.add_gate("S", g.target, adjoint=True)
-                elif g.phase.denominator == 4:   
-                    n = g.phase.numerator % 8
-                    if n == 3 or n == 5:
-                        c.add_gate("Z", g.target)
-                        n = (n-4)%8
-                    if n == 1: c.add_gate("T", g.target)
-                    if n == 7: c.add_gate("T", g.target, adjoint=True)
-                else:
-                    c.add_gate("ZPhase", g.target, g.phase)
-                if isinstance(g, XPhase):
-                    c.add_gate("HAD", g.target) 
-            else:
-                c.add_gate(g)
+            c.gates.extend(_split_phase_gate(g))
         return c
 
-    def to_graph(self, compress_rows=True, backend=None):
+    def to_graph(self, compress_rows=True, backend=None, phase_denominator=None):
         """Turns the circuit into a ZX-Graph.
         If ``compress_rows`` is set, it tries to put single qubit gates on different qubits,
-        on the same row."""
+        on the same row. If ``phase_denominator`` is given, the graph stores its phases
+        as integer multiples of pi/``phase_denominator``, see
+        :meth:`~graph.base.BaseGraph.set_phase_denominator`."""
         g = Graph(backend)
+        if phase_denominator: g.set_phase_denominator(phase_denominator)
         qs = {}
         rs = {}
         for i in range(self.qubits):
@@ -354,29 +332,21 @@ class Circuit(object):
 
     def to_quipper(self):
         """Produces a Quipper ASCII description of the circuit."""
-        s = "Inputs: " + ", ".join("{!s}Qbit".format(i) for i in range(self.qubits)) + "\n"
-        for g in self.gates:
-            s += g.to_quipper() + "\n"
-        s += "Outputs: " + ", ".join("{!s}Qbit".format(i) for i in range(self.qubits))
-        return s
+        return self._write(QuipperWriter)
 
     def to_qasm(self):
         """Produces a QASM description of the circuit."""
-        s = """OPENQASM 2.0;\ninclude "qelib1.inc";\n"""
-        s += "qreg q[{!s}];\n".format(self.qubits)
-        for g in self.gates:
-            s += g.to_qasm() + "\n"
-        return s
+        return self._write(QASMWriter)
 
     def to_qc(self):
         """Produces a .qc description of the circuit."""
-        s = ".v " + " ".join("q{:d}".format(i) for i in range(self.qubits))
-        s += "\n\nBEGIN\n"
-        c = self.split_phase_gates()
-        for g in c.gates:
-            s += g.to_qc() + "\n"
-        s += "END\n"
-        return s
+        return self._write(QCWriter)
+
+    def _write(self, writer):
+        f = io.StringIO()
+        with writer(f, self.qubits) as w:
+            w.add_circuit(self)
+        return f.getvalue()
 
 
     def to_tensor(self):
@@ -461,6 +431,18 @@ class Circuit(object):
         c = self.to_basic_gates()
         return sum(1 for g in c.gates if g.name in ('CNOT','CZ'))
 
+    def depth(self):
+        """Returns the depth of the circuit when written using basic gates,
+        where gates acting on different qubits can be applied at the same time."""
+        c = self.to_basic_gates()
+        layer = [0]*self.qubits
+        for g in c.gates:
+            qs = [getattr(g,a) for a in ("ctrl1","ctrl2","control","target") if hasattr(g,a)]
+            if not qs: continue
+            d = max(layer[q] for q in qs) + 1
+            for q in qs: layer[q] = d
+        return max(layer, default=0)
+
     def stats(self):
         """Returns statistics on the amount of gates in the circuit, separated into different classes 
         (such as amount of T-gates, two-qubit gates, Hadamard gates)."""
@@ -483,14 +465,18 @@ class Circuit(object):
                 clifford += 1
             else:
                 other += 1
-        s = """Circuit {} on {} qubits with {} gates.
+        return _stats_string(self.name, self.qubits, total, tcount, clifford, twoqubit, hadamard, other)
+
+def _stats_string(name, qubits, total, tcount, clifford, twoqubit, hadamard, other):
+    """The description of the gate counts of a circuit returned by :meth:`Circuit.stats`."""
+    s = """Circuit {} on {} qubits with {} gates.
         {} is the T-count
         {} Cliffords among which 
-        {} 2-qubit gates and {} Hadamard gates.""".format(self.name, self.qubits, total, 
+        {} 2-qubit gates and {} Hadamard gates.""".format(name, qubits, total, 
                 tcount, clifford, twoqubit, hadamard)
-        if other > 0:
-            s += "\nThere are {} gates of a different type".format(other)
-        return s
+    if other > 0:
+        s += "\nThere are {} gates of a different type".format(other)
+    return s
 
 def determine_file_type(circuitfile):
         """Tries to figure out in which format the file is given (quipper, qasm or qc)"""
@@ -748,19 +734,7 @@ class QASMParser(object):
                 gates.append(g)
                 continue
             if name.startswith("rx") or name.startswith("rz"):
-                i = name.find('(')
-                j = name.find(')')
-                if i == -1 or j == -1: raise TypeError("Invalid specification {}".format(name))
-                val = name[i+1:j]
-                try:
-                    phase = float(val)/math.pi
-                except ValueError:
-                    if val.find('pi') == -1: raise TypeError("Invalid specification {}".format(name))
-                    val = val.replace('pi', '')
-                    val = val.replace('*','')
-                    try: phase = float(val)
-                    except: raise TypeError("Invalid specification {}".format(name))
-                phase = Fraction(phase).limit_denominator(100000000)
+                phase = _qasm_phase(name)
                 if name.startswith('rx'): g = XPhase(argset[0],phase=phase)
                 else: g = ZPhase(argset[0],phase=phase)
                 gates.append(g)
@@ -777,6 +751,199 @@ class QASMParser(object):
         return gates
 
 
+def _qasm_phase(name):
+    """Returns the phase, as a multiple of pi, of a QASM rotation gate ``name`` such as ``rz(0.25*pi)``."""
+    i = name.find('(')
+    j = name.find(')')
+    if i == -1 or j == -1: raise TypeError("Invalid specification {}".format(name))
+    val = name[i+1:j]
+    try:
+        phase = float(val)/math.pi
+    except ValueError:
+        if val.find('pi') == -1: raise TypeError("Invalid specification {}".format(name))
+        val = val.replace('pi', '')
+        val = val.replace('*','')
+        try: phase = float(val)
+        except: raise TypeError("Invalid specification {}".format(name))
+    return Fraction(phase).limit_denominator(100000000)
+
+
+def _split_phase_gate(g):
+    """Returns the gates :meth:`Circuit.split_phase_gates` replaces the gate ``g`` with."""
+    if not isinstance(g, (ZPhase, XPhase)): return [g]
+    if not g.phase: return []
+    if g.phase == 1:
+        return [Z(g.target)] if isinstance(g, ZPhase) else [NOT(g.target)]
+    gates = []
+    if isinstance(g, XPhase):
+        gates.append(HAD(g.target))
+    if g.phase.denominator == 2:
+        if g.phase.numerator % 4 == 1:
+            gates.append(S(g.target))
+        else: gates.append(S(g.target, adjoint=True))
+    elif g.phase.denominator == 4:
+        n = g.phase.numerator % 8
+        if n == 3 or n == 5:
+            gates.append(Z(g.target))
+            n = (n-4)%8
+        if n == 1: gates.append(T(g.target))
+        if n == 7: gates.append(T(g.target, adjoint=True))
+    else:
+        gates.append(ZPhase(g.target, g.phase))
+    if isinstance(g, XPhase):
+        gates.append(HAD(g.target))
+    return gates
+
+
+class CircuitWriter(object):
+    """Base class of the writers that write the description of a circuit to a file-like object
+    one gate at a time, so that the whole description is never held in memory.
+    The text of the gates is collected and passed to ``f.write`` once every :attr:`buffer_size` gates.
+    Like a :class:`Circuit`, a writer has an ``add_gate`` method, so that it can be passed
+    as the ``sink`` of :func:`~extract.streaming_extract`.
+
+    Call :meth:`close` when all the gates have been added, to write the end of the description,
+    or use the writer in a ``with`` statement. This doesn't close ``f`` itself.
+    When the body of the ``with`` statement raises an exception, :meth:`abort` is called instead:
+    the gates added so far are written, followed by a comment saying that the description is
+    incomplete, and the end of the description is left out. The caller is responsible for
+    removing the file if an incomplete file is of no use, as :func:`~batch.optimize_file` does.
+    If ``basic_gates`` is set, every gate is written as its :meth:`to_basic_gates`, like
+    the gates of :meth:`Circuit.to_basic_gates`. This is needed for the SWAP gates
+    that extraction produces.
+
+    Example::
+
+        with open('circuit.qasm', 'w') as f, QASMWriter(f, g.qubit_count(), basic_gates=True) as w:
+            streaming_extract(g, sink=w)
+    """
+    buffer_size = 10000
+    def __init__(self, f, qubits, basic_gates=False):
+        self.f = f
+        self.qubits = qubits
+        self.basic_gates = basic_gates
+        self.gate_count = 0
+        self._lines = []
+        self.f.write(self.header())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None: self.close()
+        else: self.abort("{} while writing".format(exc_type.__name__))
+
+    def header(self):
+        """Returns the text that comes before the gates."""
+        return ""
+
+    def footer(self):
+        """Returns the text that comes after the gates."""
+        return ""
+
+    def lines(self, gate):
+        """Returns the lines describing ``gate``."""
+        raise NotImplementedError()
+
+    def add_gate(self, gate, *args, **kwargs):
+        """Writes a gate, which is given like in :meth:`Circuit.add_gate`."""
+        if isinstance(gate, str):
+            gate_class = gate_types[gate]
+            gate = gate_class(*args, **kwargs)
+        if self.basic_gates:
+            for g in gate.to_basic_gates(): self._lines.extend(self.lines(g))
+        else: self._lines.extend(self.lines(gate))
+        self.gate_count += 1
+        if len(self._lines) >= self.buffer_size: self.flush()
+
+    def add_gates(self, gates):
+        """Writes all the gates of the iterable ``gates``, such as the iterator returned by
+        :func:`~extract.streaming_extract_gates`."""
+        for g in gates: self.add_gate(g)
+
+    def add_circuit(self, circ):
+        """Writes the gates of the circuit ``circ``."""
+        self.add_gates(circ.gates)
+
+    def flush(self):
+        """Writes the text of the gates that have been added since the last flush."""
+        if self._lines:
+            self._lines.append("")
+            self.f.write("\n".join(self._lines))
+            self._lines = []
+
+    def comment(self, text):
+        """Returns a line containing the comment ``text``."""
+        raise NotImplementedError()
+
+    def close(self):
+        """Writes the remaining gates and the end of the description."""
+        self.flush()
+        self.f.write(self.footer())
+
+    def abort(self, reason):
+        """Writes the remaining gates, followed by a comment that marks the description
+        as incomplete because of ``reason``, instead of the end of the description."""
+        self.flush()
+        self.f.write(self.comment("Incomplete circuit: " + reason) + "\n")
+
+
+class QASMWriter(CircuitWriter):
+    """Writes a circuit in the format of :meth:`Circuit.to_qasm`."""
+    def header(self):
+        return """OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[{!s}];\n""".format(self.qubits)
+
+    def lines(self, gate):
+        return (gate.to_qasm(),)
+
+    def comment(self, text):
+        return "// " + text
+
+
+class QCWriter(CircuitWriter):
+    """Writes a circuit in the format of :meth:`Circuit.to_qc`."""
+    def header(self):
+        return ".v " + " ".join("q{:d}".format(i) for i in range(self.qubits)) + "\n\nBEGIN\n"
+
+    def footer(self):
+        return "END\n"
+
+    def lines(self, gate):
+        return [g.to_qc() for g in _split_phase_gate(gate)]
+
+    def comment(self, text):
+        return "# " + text
+
+
+class QuipperWriter(CircuitWriter):
+    """Writes a circuit in the format of :meth:`Circuit.to_quipper`."""
+    def header(self):
+        return "Inputs: " + ", ".join("{!s}Qbit".format(i) for i in range(self.qubits)) + "\n"
+
+    def footer(self):
+        return "Outputs: " + ", ".join("{!s}Qbit".format(i) for i in range(self.qubits))
+
+    def lines(self, gate):
+        return (gate.to_quipper(),)
+
+    def comment(self, text):
+        return 'Comment["{}"]'.format(text)
+
+
+circuit_writers = {'qasm': QASMWriter, 'qc': QCWriter, 'quipper': QuipperWriter}
+"""The :class:`CircuitWriter` of each of the file types."""
+
+def write_circuit(f, circuit, dtype):
+    """Writes the circuit ``circuit`` to the file-like object ``f``, in the file type ``dtype``
+    (qasm, qc or quipper), one block of gates at a time. ``circuit`` can be any object with
+    ``qubits`` and ``gates`` attributes, such as a :class:`Circuit` or a
+    :class:`~compact_circuit.CompactCircuit`."""
+    if dtype not in circuit_writers:
+        raise ValueError("Unsupported circuit type {}. Please use qasm, qc or quipper".format(dtype))
+    with circuit_writers[dtype](f, circuit.qubits) as w:
+        w.add_circuit(circuit)
+
+
 class InitAncilla:
     name = 'InitAncilla'
     def __init__(self, label):
@@ -876,7 +1043,7 @@ class Gate(object):
         return "{} {}".format(n, " ".join(args))
 
     def graph_add_node(self, g, labels, qs, t, q, r, phase=0):
-        v = g.add_vertex(t,labels[q],r,phase)
+        v = g.add_vertex(t,labels[q],r,g.phase_units(phase) if phase else 0)
         g.add_edge((qs[q],v))
         qs[q] = v
         return v
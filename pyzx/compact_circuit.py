@@ -0,0 +1,437 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Contains :class:`CompactCircuit`, a memory-compact alternative to :class:`~circuit.Circuit`
+for circuits with millions of gates. Instead of a list of :class:`~circuit.Gate` objects,
+it stores the gates in a few typed :mod:`array` columns: an opcode, the qubits the gate acts on
+and an index into a table of the distinct phases. This takes about 15 bytes per gate,
+instead of a few hundred for a gate object with its own ``__dict__``.
+"""
+
+import copy
+from array import array
+from collections import Counter
+from fractions import Fraction
+
+from .graph import Graph
+from .circuit import (Circuit, ZPhase, Z, S, T, XPhase, NOT, HAD, CNOT, CZ, CX, SWAP,
+                      ParityPhase, Tofolli, CCZ, gate_types, _stats_string)
+
+__all__ = ['CompactCircuit']
+
+OPCODES = (ZPhase, Z, S, T, XPhase, NOT, HAD, CNOT, CZ, CX, SWAP, Tofolli, CCZ, ParityPhase)
+"""The gate classes that :class:`CompactCircuit` stores in its columns. The opcode
+of a gate is the index of its class in this tuple. Gates of other classes (and gates
+with attributes that their class doesn't set) are kept as objects, with opcode :data:`OBJECT`."""
+
+OBJECT = 255
+"""The opcode of a gate that :class:`CompactCircuit` keeps as an object."""
+
+_ZPHASE, _Z, _S, _T, _XPHASE, _NOT, _HAD, _CNOT, _CZ, _CX, _SWAP, _TOF, _CCZ, _PARITY = range(len(OPCODES))
+_OPCODE = {cls: i for i, cls in enumerate(OPCODES)}
+
+# The attributes the constructor of each class sets, with the qubits in the order they are stored.
+_QUBIT_ATTRS = {ZPhase: ('target',), XPhase: ('target',), HAD: ('target',),
+                CNOT: ('control', 'target'), CZ: ('control', 'target'),
+                Tofolli: ('ctrl1', 'ctrl2', 'target')}
+_ATTRS = {ZPhase: {'target', 'phase'}, Z: {'target', 'phase'}, S: {'target', 'phase', 'adjoint'},
+          T: {'target', 'phase', 'adjoint'}, XPhase: {'target', 'phase'}, NOT: {'target', 'phase'},
+          HAD: {'target'}, CNOT: {'control', 'target'}, CZ: {'control', 'target'},
+          CX: {'control', 'target'}, SWAP: {'control', 'target'}, Tofolli: {'ctrl1', 'ctrl2', 'target'},
+          CCZ: {'ctrl1', 'ctrl2', 'target'}, ParityPhase: {'targets', 'phase'}}
+for _cls in OPCODES:
+    if _cls not in _QUBIT_ATTRS and _cls is not ParityPhase:
+        _QUBIT_ATTRS[_cls] = _QUBIT_ATTRS[next(b for b in _cls.__mro__ if b in _QUBIT_ATTRS)]
+
+# The fixed phases of the gates of which the phase is determined by the class, by adjointness
+_FIXED_PHASE = {_Z: (Fraction(1,1), None), _NOT: (Fraction(1,1), None),
+                _S: (Fraction(1,2), Fraction(-1,2)), _T: (Fraction(1,4), Fraction(-1,4))}
+
+_ADJOINT = 1
+"""Flag of an adjoint S or T gate."""
+_LIST = 2
+"""Flag of a ParityPhase gate whose targets are a list instead of a tuple."""
+
+_MAX_QUBIT = 2**31 - 1
+
+
+class _GateList(object):
+    """List-like view on the gates of a :class:`CompactCircuit`. The gates are created when they
+    are accessed, so changing them doesn't change the circuit; assign them to an index instead."""
+    def __init__(self, c):
+        self._c = c
+    def __len__(self):
+        return len(self._c._ops)
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._c._gate(j) for j in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError("gate index out of range")
+        return self._c._gate(i)
+    def __setitem__(self, i, gate):
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError("gate index out of range")
+        self._c._set(i, gate)
+    def __iter__(self):
+        gate = self._c._gate
+        return (gate(i) for i in range(len(self)))
+    def __eq__(self, other):
+        return len(self) == len(other) and all(g == h for g, h in zip(self, other))
+    def append(self, gate):
+        self._c.add_gate(gate)
+    def extend(self, gates):
+        for gate in gates: self._c.add_gate(gate)
+
+
+class CompactCircuit(object):
+    """Memory-compact version of :class:`~circuit.Circuit`.
+
+    Every gate is a row in the array columns ``_ops`` (the opcode, see :data:`OPCODES`),
+    ``_flags`` (whether an S or T gate is adjoint), ``_phases`` (an index into the table
+    ``_phase_table`` of distinct phases, or -1) and ``_offsets``, which points to the start of the
+    qubits of the gate in the flat column ``_qubits``. ``gates`` is a list-like view that creates
+    the :class:`~circuit.Gate` objects when they are accessed, so that code written for
+    :class:`~circuit.Circuit` keeps working. :meth:`tcount`, :meth:`twoqubitcount`, :meth:`stats`,
+    :meth:`to_graph` and :meth:`to_qasm` work on the columns directly.
+
+    Converting with :meth:`from_circuit` and :meth:`to_circuit` is lossless: gates with
+    qubits that aren't small nonnegative integers, gates of other classes and gates with attributes
+    that their constructor doesn't set are stored as they are."""
+    def __init__(self, qubit_amount, name=''):
+        self.qubits = qubit_amount
+        self.name = name
+        self._ops = array('B')
+        self._flags = array('B')
+        self._phases = array('i')
+        self._offsets = array('I', [0])
+        self._qubits = array('i')
+        self._phase_table = []
+        self._phase_index = dict()
+        self._objects = dict() # row -> gate, for the rows with opcode OBJECT
+        self.gates = _GateList(self)
+
+    def __str__(self):
+        return "CompactCircuit({!s} qubits, {!s} gates)".format(self.qubits,len(self._ops))
+
+    def __repr__(self):
+        return str(self)
+
+    def __len__(self):
+        return len(self._ops)
+
+    def copy(self):
+        c = CompactCircuit(self.qubits, self.name)
+        c._ops = array('B', self._ops)
+        c._flags = array('B', self._flags)
+        c._phases = array('i', self._phases)
+        c._offsets = array('I', self._offsets)
+        c._qubits = array('i', self._qubits)
+        c._phase_table = list(self._phase_table)
+        c._phase_index = dict(self._phase_index)
+        c._objects = {i: copy.copy(g) for i, g in self._objects.items()}
+        return c
+
+    @staticmethod
+    def from_circuit(circuit):
+        """Returns a :class:`CompactCircuit` with the same gates as the :class:`~circuit.Circuit` ``circuit``."""
+        c = CompactCircuit(circuit.qubits, circuit.name)
+        for gate in circuit.gates: c.add_gate(gate)
+        return c
+
+    def to_circuit(self):
+        """Returns a :class:`~circuit.Circuit` with the same gates."""
+        c = Circuit(self.qubits, self.name)
+        c.gates = list(self.gates)
+        return c
+
+    def add_gate(self, gate, *args, **kwargs):
+        """Adds a gate to the circuit, like :meth:`Circuit.add_gate <circuit.Circuit.add_gate>`."""
+        if isinstance(gate, str):
+            gate = gate_types[gate](*args, **kwargs)
+        self._append(self._encode(gate), gate)
+
+    def _append(self, row, gate):
+        """Adds a row ``(op, flags, qubits, phase)`` given by :meth:`_encode` for ``gate``."""
+        op, flags, qubits, phase = row
+        i = len(self._ops)
+        self._ops.append(op)
+        self._flags.append(flags)
+        self._phases.append(phase)
+        self._qubits.extend(qubits)
+        self._offsets.append(len(self._qubits))
+        if op == OBJECT: self._objects[i] = gate
+
+    def add_circuit(self, circ):
+        """Adds the gates of another circuit with the same amount of qubits to this one."""
+        if self.qubits != circ.qubits: raise TypeError("Amount of qubits do not match")
+        for gate in circ.gates: self.add_gate(gate)
+
+    def _set(self, i, gate):
+        """Replaces the gate at row ``i``. As the qubits of all the gates are stored in a single column,
+        this takes time linear in the amount of gates, unless the new gate acts on as many qubits."""
+        op, flags, qubits, phase = self._encode(gate)
+        start, end = self._offsets[i], self._offsets[i+1]
+        if len(qubits) == end - start:
+            self._qubits[start:end] = array('i', qubits)
+        else:
+            self._qubits[start:end] = array('i', qubits)
+            d = len(qubits) - (end - start)
+            offsets = self._offsets
+            for j in range(i+1, len(offsets)): offsets[j] += d
+        self._ops[i] = op
+        self._flags[i] = flags
+        self._phases[i] = phase
+        self._objects.pop(i, None)
+        if op == OBJECT: self._objects[i] = gate
+
+    def _phase_id(self, phase):
+        key = (type(phase), phase) # so that 1 and Fraction(1) are not mixed up
+        if key not in self._phase_index:
+            self._phase_index[key] = len(self._phase_table)
+            self._phase_table.append(phase)
+        return self._phase_index[key]
+
+    def _encode(self, gate):
+        """Returns the opcode, flags, qubits and phase index of the row of ``gate``."""
+        op = _OPCODE.get(type(gate), OBJECT)
+        if op == OBJECT: return OBJECT, 0, (), -1
+        d = vars(gate)
+        if d.keys() != _ATTRS[type(gate)]: return OBJECT, 0, (), -1
+        flags = 0
+        phase = -1
+        if op == _PARITY:
+            qubits = d['targets']
+            if type(qubits) is list: flags = _LIST
+            elif type(qubits) is not tuple: return OBJECT, 0, (), -1
+        else:
+            qubits = tuple(d[a] for a in _QUBIT_ATTRS[type(gate)])
+        if not all(type(q) is int and 0 <= q <= _MAX_QUBIT for q in qubits): return OBJECT, 0, (), -1
+        if op in _FIXED_PHASE:
+            adjoint = d.get('adjoint', False)
+            if type(adjoint) is not bool: return OBJECT, 0, (), -1
+            p = _FIXED_PHASE[op][1 if adjoint else 0]
+            if d['phase'] != p or type(d['phase']) is not Fraction: return OBJECT, 0, (), -1
+            if adjoint: flags = _ADJOINT
+        elif 'phase' in d:
+            phase = self._phase_id(d['phase'])
+        return op, flags, qubits, phase
+
+    def _gate(self, i):
+        """Creates the gate object of row ``i``."""
+        op = self._ops[i]
+        if op == OBJECT: return self._objects[i]
+        cls = OPCODES[op]
+        qubits = self._qubits[self._offsets[i]:self._offsets[i+1]]
+        g = cls.__new__(cls)
+        d = g.__dict__
+        if op == _PARITY:
+            d['targets'] = list(qubits) if self._flags[i] & _LIST else tuple(qubits)
+        else:
+            for a, q in zip(_QUBIT_ATTRS[cls], qubits): d[a] = q
+        if op in _FIXED_PHASE:
+            adjoint = bool(self._flags[i] & _ADJOINT)
+            d['phase'] = _FIXED_PHASE[op][1 if adjoint else 0]
+            if op in (_S, _T): d['adjoint'] = adjoint
+        elif self._phases[i] != -1:
+            d['phase'] = self._phase_table[self._phases[i]]
+        return g
+
+    def _counts(self):
+        """Returns the amount of gates with each opcode, and the amount of ZPhase, XPhase
+        and ParityPhase gates using each phase of the phase table."""
+        ops = self._ops.tobytes()
+        counts = [ops.count(op) for op in range(len(OPCODES))]
+        phases = Counter(self._phases)
+        pcounts = [phases[p] for p in range(len(self._phase_table))]
+        return counts, pcounts
+
+    def tcount(self):
+        """Returns the amount of T-gates necessary to implement this circuit."""
+        counts, pcounts = self._counts()
+        total = counts[_T] + 7*(counts[_TOF] + counts[_CCZ])
+        total += sum(n for p, n in zip(self._phase_table, pcounts) if p.denominator > 2)
+        total += sum(g.tcount() for g in self._objects.values())
+        return total
+
+    def twoqubitcount(self):
+        """Returns the amount of 2-qubit gates necessary to implement this circuit."""
+        counts, pcounts = self._counts()
+        total = sum(n*_TWOQUBIT[op] for op, n in enumerate(counts) if op != _PARITY)
+        if counts[_PARITY]:
+            ops, offsets = self._ops, self._offsets
+            total += sum(2*(offsets[i+1] - offsets[i] - 1) for i in range(len(ops)) if ops[i] == _PARITY)
+        for g in self._objects.values():
+            total += sum(1 for h in g.to_basic_gates() if h.name in ('CNOT','CZ'))
+        return total
+
+    def stats(self):
+        """Returns statistics on the amount of gates in the circuit, like
+        :meth:`Circuit.stats <circuit.Circuit.stats>`."""
+        counts, pcounts = self._counts()
+        clifford_phases = sum(n for p, n in zip(self._phase_table, pcounts) if p.denominator <= 2)
+        # Of the gates with a phase from the table, the ParityPhase gates are not Cliffords
+        if counts[_PARITY]:
+            ops, phases, table = self._ops, self._phases, self._phase_table
+            clifford_phases -= sum(1 for i in range(len(ops))
+                                   if ops[i] == _PARITY and table[phases[i]].denominator <= 2)
+        hadamard = counts[_HAD]
+        twoqubit = counts[_CNOT] + counts[_CZ] + counts[_CX] + counts[_SWAP]
+        clifford = clifford_phases + counts[_Z] + counts[_S] + counts[_NOT] + hadamard + twoqubit
+        other = counts[_TOF] + counts[_CCZ] + counts[_PARITY]
+        for g in self._objects.values():
+            if isinstance(g, (ZPhase, XPhase)):
+                if g.phase.denominator <= 2: clifford += 1
+            elif isinstance(g, HAD):
+                hadamard += 1
+                clifford += 1
+            elif isinstance(g, (CZ, CX, CNOT)):
+                twoqubit += 1
+                clifford += 1
+            else:
+                other += 1
+        return _stats_string(self.name, self.qubits, len(self._ops), self.tcount(),
+                             clifford, twoqubit, hadamard, other)
+
+    def to_graph(self, compress_rows=True, backend=None, phase_denominator=None):
+        """Turns the circuit into a ZX-Graph, like :meth:`Circuit.to_graph <circuit.Circuit.to_graph>`.
+        The simple gates are added straight from the columns, without creating the gate objects."""
+        g = Graph(backend)
+        if phase_denominator: g.set_phase_denominator(phase_denominator)
+        qs = {}
+        rs = {}
+        for i in range(self.qubits):
+            v = g.add_vertex(0,i,0)
+            g.inputs.append(v)
+            qs[i] = v
+            rs[i] = 1
+
+        labels = {i:i for i in range(self.qubits)}
+
+        units = dict() # phase -> phase of the vertex
+        def phase_units(p):
+            if p not in units: units[p] = g.phase_units(p) if p else 0
+            return units[p]
+        table = self._phase_table
+        ops, flags, phases = self._ops, self._flags, self._phases
+        offsets, qubits = self._offsets, self._qubits
+        add_vertex, add_edge = g.add_vertex, g.add_edge
+        objects = self._objects
+        for i in range(len(ops)):
+            op = ops[i]
+            if op == OBJECT and objects[i].name == 'InitAncilla':
+                l = objects[i].label
+                if l in labels:
+                    raise ValueError("Ancilla label {} already in use".format(str(l)))
+                q = len(labels)
+                labels[l] = q
+                r = max(rs.values())
+                for j in rs: rs[j] = r
+                rs[l] = r+1
+                v = g.add_vertex(1, q, r)
+                qs[l] = v
+                continue
+            if op == OBJECT and objects[i].name == 'PostSelect':
+                l = objects[i].label
+                if l not in labels:
+                    raise ValueError("PostSelect label {} is not in use".format(str(l)))
+                v = g.add_vertex(1, labels[l], rs[l])
+                g.add_edge((qs[l],v),1)
+                r = max(rs.values())
+                for j in rs: rs[j] = r+1
+                del qs[l]
+                del rs[l]
+                del labels[l]
+                continue
+            if not compress_rows:
+                r = max(rs.values())
+                for j in rs: rs[j] = r
+            if op <= _HAD: # A single qubit gate
+                q = qubits[offsets[i]]
+                r = rs[q]
+                if op == _HAD:
+                    v = add_vertex(1,labels[q],r)
+                    add_edge((qs[q],v),2)
+                else:
+                    if op in _FIXED_PHASE: p = _FIXED_PHASE[op][flags[i] & _ADJOINT]
+                    else: p = table[phases[i]]
+                    v = add_vertex(1 if op < _XPHASE else 2,labels[q],r,phase_units(p))
+                    add_edge((qs[q],v))
+                qs[q] = v
+                rs[q] = r+1
+            elif op <= _CX: # CNOT, CZ or CX
+                c, t = qubits[offsets[i]], qubits[offsets[i]+1]
+                r = max(rs[t],rs[c])
+                tt, tc, et = _CONTROLLED[op]
+                vt = add_vertex(tt,labels[t],r)
+                add_edge((qs[t],vt))
+                vc = add_vertex(tc,labels[c],r)
+                add_edge((qs[c],vc))
+                add_edge((vt,vc),et)
+                qs[t], qs[c] = vt, vc
+                rs[t] = rs[c] = r+1
+            else:
+                self._gate(i).to_graph(g,labels,qs,rs)
+            if not compress_rows:
+                r = max(rs.values())
+                for j in rs: rs[j] = r
+
+        r = max(rs.values())
+        for l, o in labels.items():
+            v = g.add_vertex(0,o,r)
+            g.outputs.append(v)
+            g.add_edge((qs[l],v))
+
+        return g
+
+    def to_qasm(self):
+        """Produces a QASM description of the circuit."""
+        lines = ["OPENQASM 2.0;", 'include "qelib1.inc";', "qreg q[{!s}];".format(self.qubits)]
+        ops, flags, phases = self._ops, self._flags, self._phases
+        offsets, qubits = self._offsets, self._qubits
+        names = ["q[{:d}]".format(q) for q in range(max(qubits, default=-1)+1)]
+        heads = dict() # (opcode, flags, phase) -> the start of the line
+        append = lines.append
+        for i in range(len(ops)):
+            op = ops[i]
+            if op == OBJECT or op == _PARITY:
+                append(self._gate(i).to_qasm())
+                continue
+            key = (op, flags[i], phases[i])
+            if key not in heads:
+                n = _QASM_NAMES[op][flags[i] & _ADJOINT]
+                if n == 'undefined':
+                    raise TypeError("Gate {} doesn't have a QASM description".format(str(self._gate(i))))
+                if op in (_ZPHASE, _XPHASE): n += "({}*pi)".format(float(self._phase_table[phases[i]]))
+                heads[key] = n + " "
+            s, e = offsets[i], offsets[i+1]
+            if e - s == 1: append(heads[key] + names[qubits[s]] + ";")
+            elif e - s == 2: append(heads[key] + names[qubits[s]] + ", " + names[qubits[s+1]] + ";")
+            else: append(heads[key] + ", ".join(names[q] for q in qubits[s:e]) + ";")
+        append("")
+        return "\n".join(lines)
+
+
+def _two_qubit_count(cls):
+    qubits = range(len(_QUBIT_ATTRS[cls]))
+    if cls in (ZPhase, XPhase): g = cls(*qubits, Fraction(1,4))
+    else: g = cls(*qubits)
+    return sum(1 for h in g.to_basic_gates() if h.name in ('CNOT','CZ'))
+
+_TWOQUBIT = [0 if cls is ParityPhase else _two_qubit_count(cls) for cls in OPCODES]
+# The vertex types of the target and control, and the type of the edge between them
+_CONTROLLED = {_CNOT: (2, 1, 1), _CZ: (1, 1, 2), _CX: (2, 2, 2)}
+_QASM_NAMES = [(cls.qasm_name, getattr(cls, 'qasm_name_adjoint', cls.qasm_name)) for cls in OPCODES]
@@ -74,7 +74,7 @@ def draw(g, scale=None):
               'x': (g.row(v) + 1) * scale,
               'y': (g.qubit(v) + 2) * scale,
               't': g.type(v),
-              'phase': phase_to_s(g.phase(v)) }
+              'phase': phase_to_s(g.phase_fraction(g.phase(v))) }
              for v in g.vertices()]
     links = [{'source': str(g.edge_s(e)),
               'target': str(g.edge_t(e)),
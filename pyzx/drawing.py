@@ -179,7 +179,7 @@ def draw(g, layout=None, labels=False, figsize=(8,2), h_edge_draw='blue', rows=N
     for v in vertices:
         p = layout[v]
         t = g.type(v)
-        a = g.phase(v)
+        a = g.phase_fraction(g.phase(v))
         
         sz = 0.2
         col = 'black'
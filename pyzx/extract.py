@@ -17,26 +17,33 @@
 
 from __future__ import print_function
 
-__all__ = ['clifford_extract', 'streaming_extract']
+__all__ = ['clifford_extract', 'streaming_extract', 'streaming_extract_gates']
 
 from fractions import Fraction
 import itertools
+import random
 
-from .linalg import Mat2, greedy_reduction, column_optimal_swap
+from .linalg import Mat2, BitMat2, greedy_reduction, column_optimal_swap, popcount
 from .graph import Graph
-from .simplify import id_simp, tcount
-from .rules import match_spider_parallel, spider
-from .circuit import Circuit, ParityPhase, CNOT, HAD, ZPhase, CZ, InitAncilla
+from .simplify import tcount
+from .rules import match_spider_parallel, spider, match_ids_parallel, remove_ids
+from .circuit import Circuit, ParityPhase, CNOT, HAD, ZPhase, XPhase, CZ, CX, SWAP, InitAncilla, PostSelect
 
 
 def bi_adj(g, vs, ws):
     return Mat2([[1 if g.connected(v,w) else 0 for v in vs] for w in ws])
 
+def packed_bi_adj(g, vs, ws):
+    """Like :func:`bi_adj`, but returns the biadjacency matrix as a :class:`~linalg.BitMat2`,
+    and only looks at the neighbours of ``ws`` instead of at every pair of vertices."""
+    index = {v: i for i, v in enumerate(vs)}
+    return BitMat2([sum(1 << index[v] for v in g.neighbours(w) if v in index) for w in ws], len(vs))
+
 def cut_rank(g, left, right):
-    return bi_adj(g, left, right).rank()
+    return packed_bi_adj(g, left, right).rank()
 
 def cut_edges(g, left, right, available=None):
-    m = bi_adj(g, left, right)
+    m = packed_bi_adj(g, left, right).to_mat2()
     max_r = max(g.row(v) for v in left)
     for v in g.vertices():
         r = g.row(v)
@@ -44,10 +51,10 @@ def cut_edges(g, left, right, available=None):
             g.set_row(v, r+2)
     x,y = m.factor()
 
+    rset = set(right)
     for v1 in left:
-        for v2 in right:
-            if (g.connected(v1,v2)):
-                g.remove_edge(g.edge(v1,v2))
+        for v2 in [w for w in g.neighbours(v1) if w in rset]:
+            g.remove_edge(g.edge(v1,v2))
     
     cut_rank = y.rows()
 
@@ -97,6 +104,17 @@ def unspider_by_row(g, v):
     return w
 
 def connectivity_from_biadj(g, m, left, right, edgetype=2):
+    if isinstance(m, BitMat2):
+        index = {v: j for j, v in enumerate(left)}
+        for i, w in enumerate(right):
+            current = sum(1 << index[v] for v in g.neighbours(w) if v in index)
+            diff = current ^ m.data[i]
+            while diff:
+                j = (diff & -diff).bit_length() - 1
+                diff &= diff - 1
+                if (current >> j) & 1: g.remove_edge((w,left[j]))
+                else: g.add_edge((w,left[j]),edgetype)
+        return
     for i in range(len(right)):
         for j in range(len(left)):
             if m.data[i][j] and not g.connected(right[i],left[j]):
@@ -104,18 +122,84 @@ def connectivity_from_biadj(g, m, left, right, edgetype=2):
             elif not m.data[i][j] and g.connected(right[i],left[j]):
                 g.remove_edge((right[i],left[j]))
 
-def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
+def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1, sink=None, seed=None):
     """Given a graph put into semi-normal form by :func:`simplify.full_reduce`, 
     it extracts its equivalent set of gates into an instance of :class:`circuit.Circuit`.
+
+    If ``sink`` is given, the gates are instead passed one at a time to ``sink.add_gate``
+    as soon as they are extracted, and ``sink`` is returned. Together with a writer that
+    outputs the gates directly, this means the gates never have to be in memory all at once.
+    See also :func:`streaming_extract_gates`.
+
+    If ``seed`` is given, the vertices of the frontier are put in a random order determined
+    by the seed, instead of being ordered by their index. This changes how ties are broken
+    when choosing the CNOTs, so that different seeds give different, equally valid, circuits.
+    See :func:`~portfolio.portfolio_extract`.
     """
     g.normalise()
+    if sink is None: sink = Circuit(g.qubit_count())
+    for i, gate in enumerate(_streaming_extract(g, allow_ancillae, quiet, seed)):
+        sink.add_gate(gate)
+        if stopcount != -1 and i >= stopcount: break
+    return sink
+
+def streaming_extract_gates(g, allow_ancillae=False, quiet=True, seed=None):
+    """Like :func:`streaming_extract`, but returns an iterator over the extracted gates.
+    The gates are extracted while iterating, so that ``g`` is only fully extracted
+    once the iterator is exhausted."""
+    g.normalise()
+    return _streaming_extract(g, allow_ancillae, quiet, seed)
+
+def _drop_past(g, vs, leftrow):
+    """Removes the vertices before the vertices ``vs``, which have fallen behind ``leftrow``.
+    As the vertices of the frontier are only ever connected to a single vertex before them,
+    the vertices removed here are no longer needed for the extraction. The inputs are kept."""
+    rs = g.rows()
+    done = [v for v in vs if v in rs and rs[v] < leftrow]
+    past = set()
+    for v in done:
+        past.update(w for w in g.neighbours(v) if rs[w] < leftrow)
+    past.difference_update(g.inputs)
+    g.remove_vertices(past)
+
+def _find_frontier(g, candidates, leftrow):
+    """Returns the vertices at ``leftrow`` among the vertices ``candidates`` and their neighbours.
+    Used by :func:`streaming_extract` to find the frontier again after the graph has been
+    rewritten around the previous frontier ``candidates``."""
+    vs = g.vertices()
+    rs = g.rows()
+    frontier = set()
+    for v in candidates:
+        if v not in vs: continue
+        if rs[v] == leftrow: frontier.add(v)
+        frontier.update(w for w in g.neighbours(v) if rs[w] == leftrow)
+    return frontier
+
+def _remove_ids_near(g, candidates, matchf):
+    """Removes the identity spiders among ``candidates`` that satisfy ``matchf``, like
+    :func:`~simplify.id_simp` but without looking at the rest of the graph.
+    Returns whether any were removed."""
+    vs = g.vertices()
+    found = False
+    while True:
+        m = match_ids_parallel(g, matchf, vertexlist=[v for v in candidates if v in vs])
+        if not m: return found
+        etab, rem_verts, rem_edges, check_isolated_vertices = remove_ids(g, m)
+        g.add_edge_table(etab)
+        g.remove_vertices(rem_verts)
+        found = True
+
+def _streaming_extract(g, allow_ancillae, quiet, seed=None):
+    """Generator doing the work of :func:`streaming_extract` on the normalised graph ``g``."""
+    rng = random.Random(seed) if seed is not None else None
     qs = g.qubits() # We are assuming that these are objects that update...
     rs = g.rows()   # ...to reflect changes to the graph, so that when...
     ty = g.types()  # ... g.set_row/g.set_qubit is called, these things update directly to reflect that
     phases = g.phases()
-    c = Circuit(g.qubit_count())
+    vs = g.vertices()
     leftrow = 1
     maxq = max(qs.values()) + 1
+    inputs, outputs = set(g.inputs), set(g.outputs)
 
     nodestotal = tcount(g)
     nodesparsed = 0
@@ -123,16 +207,24 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
 
     # special_nodes contains the ParityPhase like nodes
     special_nodes = {}
-    for v in g.vertices():
-        if len(list(g.neighbours(v))) == 1 and v not in g.inputs and v not in g.outputs:
-            n = list(g.neighbours(v))[0]
+    # The frontier is kept up to date as it moves, instead of looking through the whole graph.
+    # When it is None, the graph has been rewritten around the last frontier and it is looked up again.
+    frontier = set()
+    for v in vs:
+        if g.vertex_degree(v) == 1 and v not in inputs and v not in outputs:
+            n = next(iter(g.neighbours(v)))
             special_nodes[n] = v
         if rs[v] > 1:
             g.set_row(v, rs[v]+20)
+        elif rs[v] == leftrow:
+            frontier.add(v)
     
     tried_id_simp = False
     while True:
-        left = [v for v in g.vertices() if rs[v] == leftrow]
+        if frontier is None: frontier = _find_frontier(g, last, leftrow)
+        left = sorted(frontier)
+        if rng: rng.shuffle(left)
+        last, frontier = frontier, None
         boundary_verts = []
         right = set()
         good_verts = []
@@ -151,13 +243,14 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
             if qs[n] != q:
                 raise TypeError("Graph doesn't seem circuit like: cross qubit connections")
             if g.edge_type(g.edge(n,v)) == 2:
-                c.add_gate("HAD", q)
+                yield HAD(q)
                 g.set_edge_type(g.edge(n,v),1)
             if t == 0: continue # it is an output
             if phase != 0:
+                phase = g.phase_fraction(phase)
                 if phase.denominator > 2: nodesparsed += 1
-                if t == 1: c.add_gate("ZPhase", q, phase=phase)
-                else: c.add_gate("XPhase", q, phase=phase)
+                if t == 1: yield ZPhase(q, phase=phase)
+                else: yield XPhase(q, phase=phase)
                 g.set_phase(v, 0)
         for v in left:
             q = qs[v]
@@ -169,13 +262,13 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
                 if t == t2:
                     if g.edge_type(g.edge(v,n)) != 2:
                         raise TypeError("Invalid vertical connection between vertices of the same type")
-                    if t == 1: c.add_gate("CZ", q2, q)
-                    else: c.add_gate("CX", q2, q)
+                    if t == 1: yield CZ(q2, q)
+                    else: yield CX(q2, q)
                 else:
                     if g.edge_type(g.edge(v,n)) != 1:
                         raise TypeError("Invalid vertical connection between vertices of different type")
-                    if t == 1: c.add_gate("CNOT", q, q2)
-                    else: c.add_gate("CNOT", q2, q)
+                    if t == 1: yield CNOT(q, q2)
+                    else: yield CNOT(q2, q)
                 g.remove_edge(g.edge(v,n))
             
             # Done processing gates, now we look to see if we can shift the frontier
@@ -194,7 +287,7 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
                     right.remove(d[0])
         for v in postselects:
             if not quiet: print("postselect", v, qs[v])
-            c.add_gate("PostSelect", qs[v])
+            yield PostSelect(qs[v])
             left.remove(v)
             g.set_row(v, leftrow-0.5)
             if qs[v] == maxq - 1:
@@ -208,28 +301,32 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
                 targets.remove(special_nodes[n])
                 if targets.issubset(left): # Only connectivity on the lefthandside, so we can extract it
                     nphase = phases[n]
-                    if nphase not in (0,1):
+                    if nphase not in (0,g.phase_units(1)):
                         raise Exception("Can't parse ParityPhase with non-Pauli Phase")
-                    phase = phases[special_nodes[n]]
-                    c.add_gate("ParityPhase", phase*(-1 if nphase else 1), *[qs[t] for t in targets])
+                    phase = g.phase_fraction(phases[special_nodes[n]])
+                    yield ParityPhase(phase*(-1 if nphase else 1), *[qs[t] for t in targets])
                     g.remove_vertices([special_nodes[n],n])
                     nodesparsed += 1
                     right.remove(n)
                     del special_nodes[n]
                     have_removed_gadgets = True
-            if stopcount != -1 and len(c.gates) > stopcount: return c
             if have_removed_gadgets: continue
             right = list(right)
-            m = bi_adj(g,right,left)
+            if rng: rng.shuffle(right)
+            m = packed_bi_adj(g,right,left)
             m2 = m.copy()
             m2.gauss(full_reduce=True)
-            if not any(sum(l)==1 for l in m2.data):
+            if not any(popcount(l)==1 for l in m2.data):
                 if not tried_id_simp:
                     tried_id_simp = True
-                    i = id_simp(g, matchf=lambda v: rs[v]>leftrow, quiet=True)
+                    # Only the vertices close to the frontier can change its connectivity
+                    near = set(right)
+                    for w in right: near.update(g.neighbours(w))
+                    i = _remove_ids_near(g, near, lambda v: rs[v]>leftrow)
                     if i: 
                         if not quiet: print("id_simp found some matches")
-                        m = match_spider_parallel(g, matchf=lambda e: rs[g.edge_s(e)]>=leftrow and rs[g.edge_t(e)]>=leftrow)
+                        edges = set(e for v in near if v in vs for e in g.incident_edges(v))
+                        m = match_spider_parallel(g, matchf=lambda e: rs[g.edge_s(e)]>=leftrow and rs[g.edge_t(e)]>=leftrow, edgelist=edges)
                         m = [(v1,v2) if v1 in left else (v2,v1) for v1,v2 in m]
                         if not quiet and m: print("spider fusion found some matches")
                         etab, rem_verts, not_needed1, not_needed2 = spider(g, m)
@@ -243,31 +340,32 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
                         raise
                     raise Exception
                     gates, maxq = find_ancilla_qubits(g, left, set(right), special_nodes, maxq, quiet=quiet)
-                    c.gates.extend(gates)
+                    yield from gates
                     continue
-                c.gates.extend(gates)
+                yield from gates
                 nodesparsed += 1
                 tried_id_simp = False
                 if lr > leftrow:
                     for v in boundary_verts:
                         g.set_row(v, lr)
                     leftrow = lr
+                    _drop_past(g, left, leftrow)
                 continue
             sequence = greedy_reduction(m) # Find the optimal set of CNOTs we can apply to get a frontier we can work with
             if not isinstance(sequence, list): # Couldn't find any reduction, hopefully we can fix this
                 right = set(right)
                 gates, success = try_greedy_cut(g, left, right, right.difference(special_nodes), quiet=quiet)
                 if success:
-                    c.gates.extend(gates)
+                    yield from gates
                     continue
                 raise Exception("We should never get here")
                 
             if not quiet: print("Greedy reduction with {:d} CNOTs".format(len(sequence)))
             for control, target in sequence:
-                c.add_gate("CNOT", qs[left[target]], qs[left[control]])
+                yield CNOT(qs[left[target]], qs[left[control]])
                 # If a control is connected to an output, we need to add a new node.
                 for v in g.neighbours(left[control]):
-                    if v in g.outputs:
+                    if v in outputs:
                         #print("Adding node before output")
                         q = qs[v]
                         r = rs[v]
@@ -280,9 +378,11 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
                         k = right.index(v)
                         right[k] = w
                         break
-                for k in range(len(m.data[control])): # We update the graph to represent the extraction of a CNOT
-                    if not m.data[control][k]: continue
-                    if m.data[target][k]: g.remove_edge((left[target],right[k]))
+                row, trow = m.data[control], m.data[target]
+                while row: # We update the graph to represent the extraction of a CNOT
+                    k = (row & -row).bit_length() - 1
+                    row &= row - 1
+                    if (trow >> k) & 1: g.remove_edge((left[target],right[k]))
                     else: g.add_edge((left[target],right[k]), 2)
                 m.row_add(control, target)
             for v in left:
@@ -292,13 +392,16 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
                     good_neighs.append(d[0])
             if not good_verts: continue
         
-        for v in g.vertices():
-            if rs[v] < leftrow: continue
-            if v in good_verts: continue
-            g.set_row(v,rs[v]+1) # Push the frontier one layer up
+        # Instead of pushing the frontier and everything after it one layer up,
+        # we move the vertices that are done one layer down, which only involves the frontier
+        good = set(good_verts)
+        frontier = set(v for v in last if v in vs and rs[v] == leftrow and v not in good)
+        for v in good_verts:
+            g.set_row(v,leftrow-1)
         for i,v in enumerate(good_neighs): 
-            g.set_row(v,leftrow+1) # Bring the new nodes of the frontier to the correct position
+            g.set_row(v,leftrow) # Bring the new nodes of the frontier to the correct position
             g.set_qubit(v,qs[good_verts[i]])
+            frontier.add(v)
 
         tried_id_simp = False
 
@@ -306,8 +409,7 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
             print("{:d}/{:d}".format(nodesparsed, nodestotal))
             nodesmarker = int(round(nodesparsed-5,-1))
             nodesmarker += 10
-        leftrow += 1
-        if stopcount != -1 and len(c.gates) > stopcount: return c
+        _drop_past(g, good_verts, leftrow)
             
     swap_map = {}
     leftover_swaps = False
@@ -316,20 +418,17 @@ def streaming_extract(g, allow_ancillae=False, quiet=True, stopcount=-1):
         neigh = [w for w in g.neighbours(v) if rs[w]>leftrow]
         if len(neigh) != 1: 
             raise TypeError("Algorithm failed: Not fully reducable")
-            return c
         n = neigh[0]
         if ty[n] != 0: 
             raise TypeError("Algorithm failed: Not fully reducable")
-            return c
         if g.edge_type(g.edge(n,v)) == 2:
-            c.add_gate("HAD", q)
+            yield HAD(q)
             g.set_edge_type(g.edge(n,v),1)
         if qs[n] != q: leftover_swaps = True
         swap_map[q] = qs[n]
     if leftover_swaps: 
         for t1, t2 in permutation_as_swaps(swap_map):
-            c.add_gate("SWAP", t1, t2)
-    return c
+            yield SWAP(t1, t2)
 
 
 def try_greedy_cut(g, left, right, candidates, quiet=True):
@@ -354,12 +453,12 @@ def try_greedy_cut(g, left, right, candidates, quiet=True):
     right = list(right)
     # We want to figure out which vertices in candidates are 'pivotable'
     # That is, that removing them will decrease the cut rank of the remainder
-    m = bi_adj(g, right, left)
+    m = packed_bi_adj(g, right, left)
     m.gauss(full_reduce=True) # Gaussian elimination doesn't change this property
     good_nodes = []
     for r in m.data:
-        if sum(r) == 1: # Exactly one nonzero value, so removing the column with the nonzero value...
-            i = next(i for i in range(len(r)) if r[i]) # ...decreases the rank of the matrix
+        if popcount(r) == 1: # Exactly one nonzero value, so removing the column with the nonzero value...
+            i = r.bit_length() - 1 # ...decreases the rank of the matrix
             w = right[i]
             if w in candidates:
                 good_nodes.append(w)
@@ -375,12 +474,12 @@ def try_greedy_cut(g, left, right, candidates, quiet=True):
 
     left.sort(key=g.qubit)
     qs = [g.qubit(v) for v in left]
-    m = bi_adj(g, new_right, left)
+    m = packed_bi_adj(g, new_right, left)
     target = column_optimal_swap(m)
     for i, j in target.items():
         g.set_qubit(new_right[i],qs[j])
     new_right.sort(key=g.qubit)
-    m = bi_adj(g, new_right, left)
+    m = packed_bi_adj(g, new_right, left)
     gates = m.to_cnots(optimize=True)
     for cnot in gates:
         cnot.target = qs[cnot.target]
@@ -406,18 +505,18 @@ def handle_phase_gadget(g, left, neigh, special_nodes, quiet=True):
     leftrow = rs[left[0]]
     gadgets = neigh.intersection(special_nodes) # These are the phase gadgets that are attached to the left row
     if len(gadgets) == 0: raise ValueError("No phase gadget connected to this row")
-    all_verts = neigh.union(left).union(special_nodes.values())
+    all_verts = neigh.union(left)
     right = list(neigh)
     options = []
     for gadget in gadgets:
-        if all(w in all_verts for w in g.neighbours(gadget)):
+        if all(w in all_verts or w == special_nodes[gadget] for w in g.neighbours(gadget)):
             options.append(gadget)
     #print(options)
     for o in options: # We move the candidates gadgets to the end of the list
         right.remove(o)
         right.append(o)
     #print(right)
-    m = bi_adj(g, right, left+options)
+    m = packed_bi_adj(g, right, left+options)
     r = reduce_bottom_rows(m, q)
     gadget = options[r-len(left)] # This is a gadget that works
     right.remove(gadget)
@@ -446,24 +545,24 @@ def handle_phase_gadget(g, left, neigh, special_nodes, quiet=True):
         right = cut_edges(g, left+[gadget], right)
     # We have now prepared the stage to do the extraction of the phase gadget
     
-    phase = g.phase(special_nodes[gadget])
+    phase = g.phase_fraction(g.phase(special_nodes[gadget]))
     phase = -1*phase if g.phase(gadget) != 0 else phase
     left.sort(key=g.qubit)
     qv = [qs[v] for v in left]
-    m = bi_adj(g, right, left)
+    m = packed_bi_adj(g, right, left)
     target = column_optimal_swap(m)
     for i, j in target.items():
         g.set_qubit(right[i],qv[j])
     right.sort(key=g.qubit)
 
-    m = bi_adj(g, right, left)
+    m = packed_bi_adj(g, right, left)
     if m.rank() != q:
         raise Exception("Rank in phase gadget reduction too low.")
     operations = Circuit(q)
     operations.row_add = lambda r1,r2: operations.gates.append((r1,r2))
     m.gauss(full_reduce=True,x=operations)
     gates = [CNOT(qv[r2],qv[r1]) for r1,r2 in operations.gates]
-    m = bi_adj(g, right+[gadget], left)
+    m = packed_bi_adj(g, right+[gadget], left)
     for r1,r2 in operations.gates:
         m.row_add(r1,r2)
     connectivity_from_biadj(g, m, right+[gadget], left)
@@ -490,7 +589,7 @@ def handle_phase_gadget(g, left, neigh, special_nodes, quiet=True):
     if not gadget_right: #Only connected on leftside so we are done
         if not quiet: print("Simple phase gadget")
         gate = ParityPhase(phase, *targets)
-        g.remove_vertices([special_nodes[gadget],gadget])
+        g.remove_vertices([special_nodes.pop(gadget),gadget])
         gates.append(gate)
         return gates, leftrow
     
@@ -513,32 +612,31 @@ def handle_phase_gadget(g, left, neigh, special_nodes, quiet=True):
         if qs[v] not in rtargets:
             g.set_row(v, leftrow+1)
 
-    g.remove_vertices([special_nodes[gadget],gadget])
+    g.remove_vertices([special_nodes.pop(gadget),gadget])
     return gates, leftrow+1
 
 def reduce_bottom_rows(m, qubits):
     """Using just row_add's from the first qubit rows in m, tries to find a row that can be 
     completely zero'd out. Returns the rownumber of this row when successful."""
-    cols = m.cols()
+    if isinstance(m, Mat2): m = BitMat2.from_mat2(m)
+    d = m.data
     leading_one = {}
-    adds = []
     for r in range(qubits):
         while True:
-            i = next(i for i in range(cols) if m.data[r][i])
+            if not d[r]: raise ValueError("The first rows are not linearly independent")
+            i = (d[r] & -d[r]).bit_length() - 1
             if i in leading_one:
-                m.row_add(leading_one[i],r)
-                adds.append((leading_one[i],r))
+                d[r] ^= d[leading_one[i]]
             else:
                 leading_one[i] = r
                 break
     for r in range(qubits, m.rows()):
         while True:
-            if not any(m.data[r]): 
+            if not d[r]: 
                 return r
-            i = next(i for i in range(cols) if m.data[r][i])
+            i = (d[r] & -d[r]).bit_length() - 1
             if i not in leading_one: break
-            m.row_add(leading_one[i], r)
-            adds.append((leading_one[i],r))
+            d[r] ^= d[leading_one[i]]
     raise ValueError("Did not find any completely reducable row")
 
 def find_ancilla_qubits(g, left, right, gadgets, maxq, quiet=True):
@@ -719,7 +817,7 @@ def clifford_extract(g, left_row, right_row, cnot_blocksize=2):
 
     if len(qleft) != len(qright):
         raise ValueError("Amount of qubits should match on left and right side")
-    m = bi_adj(g,qleft,qright)
+    m = packed_bi_adj(g,qleft,qright)
     if m.rank() != qubits:
         raise ValueError("Adjency matrix rank does not match amount of qubits")
     for v in qright:
@@ -847,7 +945,7 @@ def simple_extract(g, quiet=True):
                 g.set_edge_type(g.edge(n,v),1)
             #if t == 0: continue # it is an output
             if phase != 0:
-                add_phase_gate(q, phase)
+                add_phase_gate(q, g.phase_fraction(phase))
                 g.set_phase(v, 0)
         
         boundary_verts = []
@@ -869,14 +967,14 @@ def simple_extract(g, quiet=True):
                 tgts = set(g.neighbours(w))
                 tgts.remove(gadgets[w])
                 if tgts.issubset(left):
-                    add_gadget([qs[v] for v in tgts], phases[gadgets[w]])
-                    g.remove_vertex(gadgets[w])
+                    add_gadget([qs[v] for v in tgts], g.phase_fraction(phases[gadgets[w]]))
+                    g.remove_vertex(gadgets.pop(w))
                     g.remove_vertex(w)
                 elif tgts.issubset(left+list(processed_targets.keys())):
                     qubits = [qs[v] for v in left if v in tgts]
                     verts = [processed_targets[v] for v in tgts if v in processed_targets]
-                    add_nonlocal_gadget(qubits,verts, phases[gadgets[w]])
-                    g.remove_vertex(gadgets[w])
+                    add_nonlocal_gadget(qubits,verts, g.phase_fraction(phases[gadgets[w]]))
+                    g.remove_vertex(gadgets.pop(w))
                     g.remove_vertex(w)
         neighbours = set()
         for v in left.copy(): # Deal with frontier connected to outputs
@@ -52,6 +52,8 @@
 from .extract import bi_adj
 from .linalg import Mat2
 
+__all__ = ['gflow', 'fast_gflow']
+
 def gflow(g):
     l = dict()
     gflow = dict()
@@ -87,3 +89,93 @@ def gflow(g):
         else:
             processed.update(correct)
             k += 1
+
+
+def fast_gflow(g):
+    """Computes the same as :func:`gflow`, but a lot faster on large graphs.
+    Returns a tuple ``(l, gflow, k)`` of the layer of every vertex, the correction set of
+    every vertex that isn't an output and the amount of layers, or None if the graph has no gflow.
+    The layers are the same as those of :func:`gflow`, but a different correction set might be chosen
+    for a vertex when there are several possibilities.
+
+    Instead of doing a Gaussian elimination for every candidate vertex, the linear systems of all
+    the candidates of a layer are solved together with a single elimination, see :func:`_solve_layer`.
+    The vertices bordering the unprocessed part of the graph are kept up to date as vertices are
+    processed, instead of being looked up again for every layer."""
+    l = dict()
+    gflow = dict()
+    for v in g.outputs:
+        l[v] = 0
+
+    inputs = set(g.inputs)
+    processed = set(g.outputs)
+    # The amount of unprocessed neighbours of every processed vertex that is not an input.
+    # The ones with unprocessed neighbours left are the columns of the linear systems.
+    open_neighbours = dict()
+    processed_prime = set()
+    def process(vs):
+        for v in vs:
+            for w in g.neighbours(v):
+                if w in open_neighbours:
+                    open_neighbours[w] -= 1
+                    if not open_neighbours[w]: processed_prime.discard(w)
+        for v in vs:
+            if v in inputs: continue
+            open_neighbours[v] = sum(1 for w in g.neighbours(v) if w not in processed)
+            if open_neighbours[v]: processed_prime.add(v)
+    process(list(processed))
+    k = 1
+    while True:
+        prime = list(processed_prime)
+        candidates = list(set(w for v in prime for w in g.neighbours(v) if w not in processed))
+        correct = _solve_layer(g, prime, candidates)
+        if not correct:
+            if not candidates:
+                return l, gflow, k
+            return None
+        for u, x in correct.items():
+            gflow[u] = x
+            l[u] = k
+        processed.update(correct)
+        process(list(correct))
+        k += 1
+
+def _solve_layer(g, prime, candidates):
+    """For every vertex ``u`` in ``candidates``, solves the linear system over Z2 that asks for a subset
+    of ``prime`` whose odd neighbourhood contains ``u`` and none of the other candidates.
+    Returns a dictionary mapping the vertices for which there is a solution to a solution.
+
+    Every vertex of ``prime`` is a column of the biadjacency matrix, stored as an integer with a bit
+    for every candidate. These are put into reduced echelon form one by one, where each keeps track of
+    the vertices of ``prime`` it is the sum of. As in a reduced echelon form the pivot of a row is the only
+    one in its column, the system of ``u`` has a solution exactly when a row consists of just
+    the bit of ``u``, in which case that row's vertices are the solution."""
+    index = {w: i for i, w in enumerate(candidates)}
+    basis = dict() # pivot bit -> (row, bits of the vertices of prime that it is the sum of)
+    for j, v in enumerate(prime):
+        row = 0
+        for w in g.neighbours(v):
+            if w in index: row ^= 1 << index[w]
+        tag = 1 << j
+        # Adding a row of the basis only changes the bit of its own pivot among the pivots,
+        # so only the pivots among the original bits of the column have to be looked at
+        bits = row
+        while bits:
+            b = bits & -bits
+            bits ^= b
+            if b in basis:
+                brow, btag = basis[b]
+                row ^= brow
+                tag ^= btag
+        if not row: continue
+        p = row & -row
+        for q, (brow, btag) in basis.items():
+            if brow & p: basis[q] = (brow ^ row, btag ^ tag)
+        basis[p] = (row, tag)
+    correct = dict()
+    for u, i in index.items():
+        b = 1 << i
+        if b in basis and basis[b][0] == b:
+            tag = basis[b][1]
+            correct[u] = {prime[j] for j in range(tag.bit_length()) if (tag >> j) & 1}
+    return correct
@@ -16,6 +16,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import abc
+from fractions import Fraction
 
 from pyzx.tensor import tensorfy
 
@@ -63,6 +64,7 @@ class BaseGraph(object):
         self.phase_master = None
         self.phase_mult = dict()
         self.max_phase_index = -1
+        self.phase_denominator = None
 
     def __str__(self):
         return "Graph({} vertices, {} edges)".format(
@@ -97,6 +99,7 @@ class BaseGraph(object):
             backend = type(self).backend
         g = Graph(backend = backend)
         g.track_phases = self.track_phases
+        if self.phase_denominator: g.set_phase_denominator(self.phase_denominator)
         mult = 1
         if adjoint: mult = -1
 
@@ -133,6 +136,27 @@ class BaseGraph(object):
         """Returns a new graph equal to the adjoint of this graph."""
         return self.copy(adjoint=True)
 
+    def snapshot(self):
+        """Starts recording changes to the graph, so that they can later be undone with 
+        :meth:`rollback`. This is a cheap alternative to making a :meth:`copy` of the graph 
+        before trying a rewrite: only the state of the vertices that are actually changed is saved.
+        Snapshots can be nested, in which case :meth:`rollback` and :meth:`commit` act on the
+        latest one.
+
+        `Note`: When phases are tracked for :func:`~simplify.teleport_reduce`, the fusions 
+        reported to the phase master are not undone."""
+        raise NotImplementedError("Not implemented on backend " + type(self).backend)
+
+    def rollback(self):
+        """Restores the graph to the state it was in when the latest :meth:`snapshot` was made,
+        and discards that snapshot. Vertices keep their indices."""
+        raise NotImplementedError("Not implemented on backend " + type(self).backend)
+
+    def commit(self):
+        """Discards the latest :meth:`snapshot`, keeping the changes made since then.
+        If there is an earlier snapshot, a rollback of that one will undo these changes as well."""
+        raise NotImplementedError("Not implemented on backend " + type(self).backend)
+
     def replace_subgraph(self, left_row, right_row, replace):
         """Deletes the subgraph of all nodes with rank strictly between ``left_row``
         and ``right_row`` and replaces it with the graph ``replace``.
@@ -159,8 +183,9 @@ class BaseGraph(object):
         vtab = {}
         for v in replace.vertices():
             if v in replace.inputs or v in replace.outputs: continue
+            phase = self.phase_units(replace.phase_fraction(replace.phase(v)))
             vtab[v] = self.add_vertex(replace.type(v),replace.qubit(v),
-                                replace.row(v)+left_row,replace.phase(v))
+                                replace.row(v)+left_row,phase)
         for v in replace.inputs:
             vtab[v] = [i for i in qleft if self.qubit(i) == replace.qubit(v)][0]
 
@@ -320,6 +345,7 @@ class BaseGraph(object):
         result from adding (#edges, #h-edges), and then removing all parallel edges using Hopf/spider laws."""
         add = ([],[]) # list of edges and h-edges to add
         remove = []   # list of edges to remove
+        pi = self.phase_units(1)
         #add_pi_phase = []
         for (v1,v2),(n1,n2) in etab.items():
             conn_type = self.edge_type(self.edge(v1,v2))
@@ -333,7 +359,7 @@ class BaseGraph(object):
                 n2 = n2%2         #while hadamard edges go modulo 2
                 if n1 != 0 and n2 != 0:  #reduction rule for when both edges appear
                     new_type = 1
-                    self.add_to_phase(v1, 1)
+                    self.add_to_phase(v1, pi)
                     #add_pi_phase.append(v1)
                 elif n1 != 0: new_type = 1
                 elif n2 != 0: new_type = 2
@@ -343,7 +369,7 @@ class BaseGraph(object):
                 n2 = bool(n2)    #while hadamard edges fuse
                 if n1 != 0 and n2 != 0:  #reduction rule for when both edges appear
                     new_type = 2
-                    self.add_to_phase(v1, 1)
+                    self.add_to_phase(v1, pi)
                     #add_pi_phase.append(v1)
                 elif n1 != 0: new_type = 1
                 elif n2 != 0: new_type = 2
@@ -388,7 +414,8 @@ class BaseGraph(object):
 
 
     def remove_vertices(self, vertices):
-        """Removes the list of vertices from the graph."""
+        """Removes the list of vertices from the graph. Raises a KeyError, without removing anything,
+        if one of them is not in the graph or is listed more than once."""
         raise NotImplementedError("Not implemented on backend " + type(self).backend)
 
     def remove_vertex(self, vertex):
@@ -434,6 +461,24 @@ class BaseGraph(object):
         Should be overloaded if the backend supplies a cheaper version than this."""
         return set(self.edges())
 
+    def edge_view(self):
+        """Returns a read-only set-like view on the edges of the graph, which stays up to date
+        when the graph changes. Unlike :meth:`edge_set` it doesn't copy the edges, so that it is
+        cheap to create, but it can't be changed.
+        Should be overloaded if the backend supplies a cheaper version than this,
+        which by default returns :meth:`edge_set`."""
+        return self.edge_set()
+
+    def edges_of_type(self, edgetype):
+        """Iterator over the edges of the given type (1 for regular edges, 2 for Hadamard edges).
+        Should be overloaded if the backend supplies a cheaper version than this."""
+        return (e for e in self.edges() if self.edge_type(e) == edgetype)
+
+    def num_edges_of_type(self, edgetype):
+        """Returns the amount of edges of the given type.
+        Should be overloaded if the backend supplies a cheaper version than this."""
+        return sum(1 for e in self.edges_of_type(edgetype))
+
     def edge(self, s, t):
         """Returns the edge object with the given source/target."""
         raise NotImplementedError("Not implemented on backend " + type(self).backend)
@@ -496,6 +541,40 @@ class BaseGraph(object):
         """Add the given phase to the phase value of the given vertex."""
         self.set_phase(vertex,self.phase(vertex)+phase)
 
+    def set_phase_denominator(self, denominator):
+        """Switches the graph to integer phase mode, or back to the default mode if
+        ``denominator`` is None. By default phases are stored as a :class:`~fractions.Fraction` 
+        multiple of pi modulo 2. In integer phase mode they are instead stored as integer 
+        multiples of pi/``denominator`` modulo 2*``denominator``, so that the rewrite rules 
+        don't have to do any Fraction arithmetic. The phases that are not a multiple of 
+        pi/``denominator`` are still stored as a Fraction, but in the same units.
+        The phases of the vertices already in the graph are converted.
+
+        All the methods of the graph that take or return phases, like :meth:`phase` and
+        :meth:`set_phase`, use the representation of the current mode.
+        Use :meth:`phase_units` and :meth:`phase_fraction` to convert between the two.
+
+        :param denominator: A power of two, or None."""
+        if denominator is not None and (denominator < 1 or denominator & (denominator-1)):
+            raise ValueError("Phase denominator should be a power of two, not {!s}".format(denominator))
+        phases = {v: self.phase_fraction(self.phase(v)) for v in self.vertices()}
+        self.phase_denominator = denominator
+        for v, p in phases.items():
+            self.set_phase(v, self.phase_units(p))
+
+    def phase_units(self, phase):
+        """Converts a phase given as a multiple of pi to the representation
+        used by the graph, see :meth:`set_phase_denominator`."""
+        if not self.phase_denominator: return Fraction(phase)
+        phase = Fraction(phase) * self.phase_denominator
+        return phase.numerator if phase.denominator == 1 else phase
+
+    def phase_fraction(self, phase):
+        """Converts a phase in the representation used by the graph to a
+        :class:`~fractions.Fraction` multiple of pi, see :meth:`set_phase_denominator`."""
+        if not self.phase_denominator: return Fraction(phase)
+        return Fraction(phase, self.phase_denominator) if isinstance(phase, int) else phase/self.phase_denominator
+
     def qubit(self, vertex):
         """Returns the qubit index associated to the vertex. 
         If no index has been set, returns -1."""
@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-backends = {'simple': True}
+backends = {'simple': True, 'compact': True}
 
 typeB = 0
 typeZ = 1
@@ -25,19 +25,23 @@ def Graph(backend=None):
 	"""Returns an instance of an implementation of :class:`~graph.base.BaseGraph`. 
 	By default :class:`~graph.graph_s.GraphS` is used. 
 	Currently ``backend`` is allowed to be `simple` (for the default),
-	or 'graph_tool' and 'igraph'.
+	`compact` (for the memory-efficient :class:`~graph.graph_c.GraphC`),
+	`igraph` (for :class:`~graph.graph_ig.GraphIG`, when python-igraph is installed)
+	or 'graph_tool'.
 	**Note**: graph_tool is currently not fully supported."""
 	if not backend: backend = 'simple'
 	if backend:
 		if backend not in backends:
 			raise KeyError("Unavailable backend '{}'".format(backend))
 		if backend == 'simple': return GraphS()
+		if backend == 'compact': return GraphC()
 		if backend == 'graph_tool': 
 			return GraphGT()
 		if backend == 'igraph': return GraphIG()
 	return GraphS()
 
 from .graph_s import GraphS
+from .graph_c import GraphC
 
 try:
 	import graph_tool.all as gt
@@ -0,0 +1,428 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from array import array
+from fractions import Fraction
+from .base import BaseGraph
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+_NAN = float('nan')
+
+BULK_ETAB_MIN = 256
+"""Edge tables with at least this many entries are applied by :meth:`GraphC.add_edge_table`
+using array operations, provided they are not tiny compared to the size of the graph."""
+
+class _VertexView(object):
+	"""Live view on the vertices of a :class:`GraphC`, similar to ``dict.keys()``."""
+	def __init__(self, g):
+		self._g = g
+	def __iter__(self):
+		ty = self._g._ty
+		return (v for v in range(len(ty)) if ty[v] >= 0)
+	def __len__(self):
+		return self._g._nverts
+	def __contains__(self, v):
+		ty = self._g._ty
+		return 0 <= v < len(ty) and ty[v] >= 0
+
+class _ColumnView(object):
+	"""Live dictionary-like view on a qubit or row column of a :class:`GraphC`.
+	Only vertices for which a value has been set are considered keys."""
+	def __init__(self, g, col):
+		self._g = g
+		self._col = col
+	def __getitem__(self, v):
+		x = self._col[v]
+		if x != x: raise KeyError(v)
+		return int(x) if x.is_integer() else x
+	def get(self, v, default=None):
+		x = self._col[v]
+		if x != x: return default
+		return int(x) if x.is_integer() else x
+	def __contains__(self, v):
+		return v in self._g._vertex_view and self._col[v] == self._col[v]
+	def keys(self):
+		col = self._col
+		return (v for v in self._g.vertices() if col[v] == col[v])
+	__iter__ = keys
+	def values(self):
+		return (self[v] for v in self.keys())
+	def items(self):
+		return ((v, self[v]) for v in self.keys())
+	def __len__(self):
+		return sum(1 for v in self.keys())
+
+
+class GraphC(BaseGraph):
+	"""Memory-compact implementation of :class:`~graph.base.BaseGraph`.
+
+	Vertex types, qubit indices and rows are stored in typed :mod:`array` columns
+	indexed by the vertex id, and the indices of removed vertices are kept on a
+	free-list so that they can be reused. The adjacency structure is stored CSR-style:
+	every vertex owns a growable block of a single flat neighbour array (and a matching
+	edge type array), which is relocated to the end when it runs out of space.
+	Blocks that are no longer in use are reclaimed by occasionally compacting the arrays.
+
+	`Note`: Because of the free-list, the index of a newly added vertex is not necessarily
+	larger than that of the existing vertices."""
+	backend = 'compact'
+
+	#The documentation of what these methods do
+	#can be found in base.BaseGraph
+	def __init__(self):
+		BaseGraph.__init__(self)
+		self._ty = array('b')     # vertex type, -1 for a free slot
+		self._phase = []
+		self._qindex = array('d') # NaN when not set
+		self._rindex = array('d') # NaN when not set
+		self._off = array('q')    # start of the adjacency block of a vertex
+		self._deg = array('l')
+		self._cap = array('l')
+		self._nbr = array('l')    # flat neighbour array
+		self._ety = array('b')    # flat edge type array
+		self._waste = 0           # amount of unused space in _nbr
+		self._free = []
+		self._nverts = 0
+		self.nedges = 0
+		self._vertex_view = _VertexView(self)
+		self._qubit_view = _ColumnView(self, self._qindex)
+		self._row_view = _ColumnView(self, self._rindex)
+
+		self.inputs = []
+		self.outputs = []
+		self._vdata = dict()
+
+	def vindex(self): return len(self._ty)
+	def depth(self):
+		rs = [r for r in self._rindex if r == r]
+		if not rs: return -1
+		r = max(rs)
+		return int(r) if r.is_integer() else r
+	def qubit_count(self):
+		qs = [q for q in self._qindex if q == q]
+		if not qs: return 0
+		return int(max(qs)) + 1
+
+	def add_vertices(self, amount):
+		free = self._free
+		vs = []
+		while free and len(vs) < amount:
+			v = free.pop()
+			self._ty[v] = 0
+			self._phase[v] = 0
+			vs.append(v)
+		n = amount - len(vs)
+		if n:
+			start = len(self._ty)
+			self._ty.extend(bytes(n))
+			self._phase.extend([0]*n)
+			self._qindex.extend([_NAN]*n)
+			self._rindex.extend([_NAN]*n)
+			self._off.extend([0]*n)
+			self._deg.extend([0]*n)
+			self._cap.extend([0]*n)
+			vs.extend(range(start, start+n))
+		self._nverts += amount
+		return vs
+
+	def _grow(self, v):
+		"""Moves the adjacency block of ``v`` to the end of the flat arrays and doubles its size."""
+		off, cap, deg = self._off[v], self._cap[v], self._deg[v]
+		newcap = max(4, 2*cap)
+		n = len(self._nbr)
+		if cap and off + cap == n: # block is already at the end, so grow it in place
+			self._nbr.extend(array('l', [0])*(newcap-cap))
+			self._ety.extend(bytes(newcap-cap))
+		else:
+			self._nbr.extend(self._nbr[off:off+deg])
+			self._nbr.extend(array('l', [0])*(newcap-deg))
+			self._ety.extend(self._ety[off:off+deg])
+			self._ety.extend(bytes(newcap-deg))
+			self._off[v] = n
+			self._waste += cap
+		self._cap[v] = newcap
+
+	def _append(self, v, w, et):
+		d = self._deg[v]
+		if d == self._cap[v]: self._grow(v)
+		i = self._off[v] + d
+		self._nbr[i] = w
+		self._ety[i] = et
+		self._deg[v] = d + 1
+
+	def _find(self, v, w):
+		"""Returns the position of ``w`` in the adjacency block of ``v``, or -1."""
+		off = self._off[v]
+		try:
+			return off + self._nbr[off:off+self._deg[v]].index(w)
+		except ValueError:
+			return -1
+
+	def _unlink(self, v, w):
+		i = self._find(v, w)
+		last = self._off[v] + self._deg[v] - 1
+		self._nbr[i] = self._nbr[last]
+		self._ety[i] = self._ety[last]
+		self._deg[v] -= 1
+
+	def compact(self):
+		"""Rebuilds the flat adjacency arrays so that no space is wasted."""
+		nbr = array('l')
+		ety = array('b')
+		off, deg, cap = self._off, self._deg, self._cap
+		for v in self.vertices():
+			o, d = off[v], deg[v]
+			off[v] = len(nbr)
+			cap[v] = d
+			nbr.extend(self._nbr[o:o+d])
+			ety.extend(self._ety[o:o+d])
+		self._nbr = nbr
+		self._ety = ety
+		self._waste = 0
+
+	def _edge_arrays(self):
+		"""Returns numpy arrays ``(source, target, edge type)`` listing every edge once,
+		with the source smaller than the target."""
+		deg = np.array(self._deg, dtype=np.int64)
+		off = np.array(self._off, dtype=np.int64)
+		total = int(deg.sum())
+		src = np.repeat(np.arange(len(deg), dtype=np.int64), deg)
+		starts = np.cumsum(deg) - deg
+		pos = np.repeat(off - starts, deg) + np.arange(total, dtype=np.int64)
+		dst = np.array(self._nbr, dtype=np.int64)[pos]
+		et = np.array(self._ety, dtype=np.int8)[pos]
+		mask = src < dst
+		return src[mask], dst[mask], et[mask]
+
+	def _rebuild_adjacency(self, src, dst, et):
+		"""Replaces the adjacency structure by the edges given as arrays
+		``(source, target, edge type)``, listing every edge once."""
+		s = np.concatenate((src, dst))
+		order = np.argsort(s, kind='stable')
+		deg = np.bincount(s, minlength=len(self._ty))
+		off = np.cumsum(deg) - deg
+		self._nbr = array('l', np.concatenate((dst, src))[order].astype(np.dtype('l')).tobytes())
+		self._ety = array('b', np.concatenate((et, et))[order].astype(np.int8).tobytes())
+		self._off = array('q', off.astype(np.dtype('q')).tobytes())
+		self._deg = array('l', deg.astype(np.dtype('l')).tobytes())
+		self._cap = array('l', self._deg)
+		self._waste = 0
+		self.nedges = len(src)
+
+	def add_edge_table(self, etab):
+		"""See :meth:`~graph.base.BaseGraph.add_edge_table`. Large edge tables are resolved 
+		all at once with numpy: the current edge types are looked up by a sorted search, the 
+		resulting edge types and pi phases follow from the counts with array operations, and then
+		the adjacency arrays are rebuilt. Pairs that occur in the table in both orientations 
+		are merged first."""
+		n = len(etab)
+		if np is None or n < BULK_ETAB_MIN or 16*n < self.nedges:
+			return BaseGraph.add_edge_table(self, etab)
+		nv = len(self._ty)
+		pairs = np.fromiter((v for e in etab for v in e), dtype=np.int64, count=2*n).reshape(n,2)
+		counts = np.fromiter((c for cs in etab.values() for c in cs), dtype=np.int64, count=2*n).reshape(n,2)
+		keys = pairs.min(1)*nv + pairs.max(1)
+		keys, first, inv = np.unique(keys, return_index=True, return_inverse=True)
+		n1 = np.bincount(inv, weights=counts[:,0], minlength=len(keys)).astype(np.int64)
+		n2 = np.bincount(inv, weights=counts[:,1], minlength=len(keys)).astype(np.int64)
+		v1 = pairs[first,0] # the vertex that gets the pi phase, as in BaseGraph.add_edge_table
+
+		src, dst, et = self._edge_arrays()
+		ekeys = src*nv + dst
+		if len(ekeys):
+			order = np.argsort(ekeys)
+			pos = np.searchsorted(ekeys, keys, sorter=order)
+			eidx = order[np.minimum(pos, len(ekeys)-1)]
+			found = ekeys[eidx] == keys
+		else:
+			eidx = np.zeros(len(keys), dtype=np.int64)
+			found = np.zeros(len(keys), dtype=bool)
+		conn_type = np.zeros(len(keys), dtype=np.int64)
+		conn_type[found] = et[eidx[found]]
+		n1 += conn_type == 1
+		n2 += conn_type == 2
+
+		ty = np.array(self._ty, dtype=np.int8)
+		same = ty[keys // nv] == ty[keys % nv]
+		n1 = np.where(same, n1 > 0, n1 % 2 == 1)  # equal types: normal edges fuse,
+		n2 = np.where(same, n2 % 2 == 1, n2 > 0)  # while hadamard edges go modulo 2
+		new_type = np.where(n1 & n2, np.where(same, 1, 2), n1 + 2*n2).astype(np.int8)
+		pi = self.phase_units(1)
+		for v in np.flatnonzero(np.bincount(v1[n1 & n2], minlength=nv) % 2):
+			self.add_to_phase(int(v), pi)
+
+		keep = np.ones(len(src), dtype=bool)
+		fidx = eidx[found]
+		et[fidx] = new_type[found]
+		keep[fidx[new_type[found] == 0]] = False
+		added = ~found & (new_type != 0)
+		self._rebuild_adjacency(np.concatenate((src[keep], keys[added] // nv)),
+					np.concatenate((dst[keep], keys[added] % nv)),
+					np.concatenate((et[keep], new_type[added])))
+
+	def add_edges(self, edges, edgetype=1):
+		for s,t in edges:
+			i = self._find(s, t)
+			if i != -1: # like in GraphS, adding an existing edge overwrites its type
+				self.set_edge_type((s,t), edgetype)
+				continue
+			self.nedges += 1
+			self._append(s, t, edgetype)
+			self._append(t, s, edgetype)
+
+	def remove_vertices(self, vertices):
+		vertices = list(vertices)
+		ty = self._ty
+		seen = set()
+		for v in vertices: # check all of them before anything is removed
+			if not 0 <= v < len(ty) or ty[v] < 0 or v in seen: raise KeyError(v)
+			seen.add(v)
+		for v in vertices:
+			off, deg = self._off[v], self._deg[v]
+			for w in self._nbr[off:off+deg]:
+				self._unlink(w, v)
+			self.nedges -= deg
+			self._waste += self._cap[v]
+			self._deg[v] = 0
+			self._cap[v] = 0
+			self._ty[v] = -1
+			self._phase[v] = None
+			self._qindex[v] = _NAN
+			self._rindex[v] = _NAN
+			self.phase_index.pop(v,None)
+			self._vdata.pop(v,None)
+			self._free.append(v)
+			self._nverts -= 1
+		if self._waste > 1024 and 2*self._waste > len(self._nbr):
+			self.compact()
+
+	def remove_vertex(self, vertex):
+		self.remove_vertices([vertex])
+
+	def remove_isolated_vertices(self):
+		deg = self._deg
+		self.remove_vertices([v for v in self.vertices() if deg[v]==0])
+
+	def remove_edges(self, edges):
+		for s,t in edges:
+			self.nedges -= 1
+			self._unlink(s, t)
+			self._unlink(t, s)
+
+	def remove_edge(self, edge):
+		self.remove_edges([edge])
+
+	def num_vertices(self):
+		return self._nverts
+
+	def num_edges(self):
+		return self.nedges
+
+	def vertices(self):
+		return self._vertex_view
+
+	def edges(self):
+		off, deg, nbr = self._off, self._deg, self._nbr
+		for v in self.vertices():
+			o = off[v]
+			for w in nbr[o:o+deg[v]]:
+				if w > v: yield (v,w)
+
+	def edge(self, s, t):
+		return (s,t) if s < t else (t,s)
+	def edge_set(self):
+		return set(self.edges())
+	def edge_st(self, edge):
+		return edge
+
+	def neighbours(self, vertex):
+		off = self._off[vertex]
+		return self._nbr[off:off+self._deg[vertex]]
+
+	def vertex_degree(self, vertex):
+		return self._deg[vertex]
+
+	def incident_edges(self, vertex):
+		return [(vertex, v1) if v1 > vertex else (v1, vertex) for v1 in self.neighbours(vertex)]
+
+	def connected(self,v1,v2):
+		off = self._off[v1]
+		return v2 in self._nbr[off:off+self._deg[v1]]
+
+	def edge_type(self, e):
+		v1,v2 = e
+		i = self._find(v1, v2)
+		if i == -1: return 0
+		return self._ety[i]
+
+	def set_edge_type(self, e, t):
+		v1,v2 = e
+		self._ety[self._find(v1, v2)] = t
+		self._ety[self._find(v2, v1)] = t
+
+	def type(self, vertex):
+		return self._ty[vertex]
+	def types(self):
+		return self._ty
+	def set_type(self, vertex, t):
+		self._ty[vertex] = t
+
+	def phase(self, vertex):
+		return self._phase[vertex]
+	def phases(self):
+		return self._phase
+	def set_phase(self, vertex, phase):
+		if self.phase_denominator:
+			if type(phase) is not int:
+				phase = Fraction(phase)
+				if phase.denominator == 1: phase = phase.numerator
+			self._phase[vertex] = phase % (2*self.phase_denominator)
+		else: self._phase[vertex] = Fraction(phase) % 2
+	def add_to_phase(self, vertex, phase):
+		if self.phase_denominator: self.set_phase(vertex, self._phase[vertex] + phase)
+		else: self._phase[vertex] = (self._phase[vertex] + phase) % 2
+
+	def qubit(self, vertex):
+		return self._qubit_view.get(vertex,-1)
+	def qubits(self):
+		return self._qubit_view
+	def set_qubit(self, vertex, q):
+		self._qindex[vertex] = q
+
+	def row(self, vertex):
+		return self._row_view.get(vertex,-1)
+	def rows(self):
+		return self._row_view
+	def set_row(self, vertex, r):
+		self._rindex[vertex] = r
+
+	def vdata_keys(self, vertex):
+		return self._vdata.get(vertex, {}).keys()
+	def vdata(self, vertex, key, default=0):
+		if vertex in self._vdata:
+			return self._vdata[vertex].get(key,default)
+		else:
+			return default
+	def set_vdata(self, vertex, key, val):
+		if vertex in self._vdata:
+			self._vdata[vertex][key] = val
+		else:
+			self._vdata[vertex] = {key:val}
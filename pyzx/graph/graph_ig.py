@@ -21,77 +21,193 @@ except ImportError:
 	print("python-igraph not available")
 	ig = None
 
+from fractions import Fraction
 from .base import BaseGraph
+from .graph_c import _VertexView
 
 class GraphIG(BaseGraph):
 	"""Implementation of :class:`~graph.base.BaseGraph` using ``python-igraph`` 
-	as its backend"""
+	as its backend. 
+
+	The adjacency structure is an undirected igraph graph, with the type of every edge 
+	stored in the edge attribute ``t``, so that adding and removing edges in bulk, 
+	as done by :meth:`add_edge_table` and :meth:`remove_vertices`, is done by igraph's C core.
+	The vertex data is stored in Python lists indexed by the vertex, as in
+	:class:`~graph.graph_c.GraphC`. Edges are tuples ``(s,t)`` with ``s < t``.
+
+	igraph renumbers the vertices when one is deleted, which would invalidate vertex indices
+	kept by the rewrite rules. Removed vertices are therefore kept in the igraph graph 
+	as isolated vertices, whose indices are put on a free-list to be reused.
+	Hence, as for :class:`~graph.graph_c.GraphC`, the index of a newly added vertex is not 
+	necessarily larger than that of the existing vertices.
+
+	Looking up a single edge attribute through igraph is slow, so :meth:`edge_type` uses a 
+	list of all the edge types, which is fetched again after the edges have changed.
+	Hence rules first finding all their matches and then rewriting work best with this backend."""
 	backend = 'igraph'
+
+	#The documentation of what these methods do 
+	#can be found in base.BaseGraph
 	def __init__(self):
 		BaseGraph.__init__(self)
 		self.graph = ig.Graph(directed=False)
-		self.graph.vs['_a'] = None
-		self.graph.vs['_t'] = None
-		self.graph.vs['_q'] = None
-		self.graph.vs['_r'] = None
-		self.graph.es['_t'] = None
+		self._etypes = None # cached list of the edge types by edge id, None after a change
+		self._ty = []      # vertex type, -1 for a free slot
+		self._phase = []
+		self._qindex = dict()
+		self._rindex = dict()
+		self._vdata = dict()
+		self._free = []
+		self._nverts = 0
+		self._vertex_view = _VertexView(self)
 		self._maxq = -1
 		self._maxr = -1
 		self.inputs = []
 		self.outputs = []
 
-	# since igraph uses consecutive indexing, vindex() == num_vertices()
-	def vindex(self):
-		return self.num_vertices()
-
+	def vindex(self): return len(self._ty)
 	def depth(self): 
-		self._maxr = max(self._rindex.values())
+		if self._rindex: self._maxr = max(self._rindex.values())
+		else: self._maxr = -1
 		return self._maxr
-	def qubit_count(self): return self._maxq + 1
-
-	def add_vertices(self, amount, vertex_data=None):
-		self.graph.add_vertices(amount)
-		n = self.num_vertices()
-		return range(n - amount, n)
-
-	def add_edges(self, edges, edge_data=None):
-		self.graph.add_edges(edges)
+	def qubit_count(self): 
+		if self._qindex: self._maxq = max(self._qindex.values())
+		else: self._maxq = -1
+		return self._maxq + 1
+
+	def add_vertices(self, amount):
+		vs = []
+		while self._free and len(vs) < amount:
+			v = self._free.pop()
+			self._ty[v] = 0
+			self._phase[v] = 0
+			vs.append(v)
+		n = amount - len(vs)
+		if n:
+			start = len(self._ty)
+			self.graph.add_vertices(n)
+			self._ty.extend([0]*n)
+			self._phase.extend([0]*n)
+			vs.extend(range(start, start+n))
+		self._nverts += amount
+		return vs
+
+	def add_edges(self, edges, edgetype=1):
+		edges = list(edges)
+		self._etypes = None
+		self.graph.add_edges(edges, attributes={'t': [edgetype]*len(edges)})
+
+	def add_edge_table(self, etab):
+		"""See :meth:`~graph.base.BaseGraph.add_edge_table`. The current edge types are looked up 
+		in one go, after which the edges that change type, are removed and are added are each
+		passed to igraph in a single call. Pairs that occur in the table in both orientations 
+		are merged first."""
+		merged = dict()
+		for (v1,v2),(n1,n2) in etab.items():
+			e = (v1,v2) if v1 < v2 else (v2,v1)
+			if e in merged:
+				m = merged[e]
+				merged[e] = (m[0]+n1, m[1]+n2)
+			else: merged[e] = (n1,n2)
+		if not merged: return
+		pairs = list(merged)
+		graph = self.graph
+		eids = graph.get_eids(pairs, error=False)
+		etypes = graph.es['t']
+		self._etypes = None
+		ty = self._ty
+		pi = self.phase_units(1)
+		retype, retype_t, remove, add, add_t = [], [], [], [], []
+		for e, eid in zip(pairs, eids):
+			n1, n2 = merged[e]
+			conn_type = etypes[eid] if eid >= 0 else 0
+			if conn_type == 1: n1 += 1
+			elif conn_type == 2: n2 += 1
+			v1, v2 = e
+			if ty[v1] == ty[v2]: # normal edges fuse, hadamard edges go modulo 2
+				n1 = n1 > 0
+				n2 = n2 % 2
+				new_type = 1 if n1 else (2 if n2 else 0)
+			else:                # normal edges go modulo 2, hadamard edges fuse
+				n1 = n1 % 2
+				n2 = n2 > 0
+				new_type = 2 if n2 else (1 if n1 else 0)
+			if n1 and n2: self.add_to_phase(v1, pi)
+			if new_type == conn_type: continue
+			if new_type == 0: remove.append(eid)
+			elif conn_type == 0:
+				add.append(e)
+				add_t.append(new_type)
+			else:
+				retype.append(eid)
+				retype_t.append(new_type)
+		# Deleting edges renumbers them, so this has to come after the retyping
+		if retype: graph.es.select(retype)['t'] = retype_t
+		if remove: graph.delete_edges(remove)
+		if add: graph.add_edges(add, attributes={'t': add_t})
 
 	def remove_vertices(self, vertices):
-		self.graph.delete_vertices(vertices)
+		vs = list(vertices)
+		if not vs: return
+		ty = self._ty
+		seen = set()
+		for v in vs:
+			if not 0 <= v < len(ty) or ty[v] < 0 or v in seen: raise KeyError(v)
+			seen.add(v)
+		self._etypes = None
+		self.graph.delete_edges(self.graph.es.select(_incident=vs))
+		for v in vs:
+			self._ty[v] = -1
+			self._phase[v] = 0
+			self._qindex.pop(v,None)
+			self._rindex.pop(v,None)
+			self._vdata.pop(v,None)
+			self.phase_index.pop(v,None)
+		self._free.extend(vs)
+		self._nverts -= len(vs)
+
+	def remove_vertex(self, vertex):
+		self.remove_vertices([vertex])
 
 	def remove_isolated_vertices(self):
-		self.graph.vs.select(_degree=0).delete()
+		ty = self._ty
+		self.remove_vertices([v for v in self.graph.vs.select(_degree=0).indices if ty[v] >= 0])
 
 	def remove_edges(self, edges):
-		self.graph.delete_edges(edges)
+		edges = list(edges)
+		if edges: 
+			self._etypes = None
+			self.graph.delete_edges(self.graph.get_eids(edges))
+
+	def remove_edge(self, edge):
+		self.remove_edges([edge])
 
 	def num_vertices(self):
-		return len(self.graph.vs)
+		return self._nverts
 
 	def num_edges(self):
-		return len(self.graph.es)
+		return self.graph.ecount()
 
 	def vertices(self):
-		return range(len(self.graph.vs))
+		return self._vertex_view
 
 	def edges(self):
-		return range(len(self.graph.es))
+		return iter(self.graph.get_edgelist())
 
-	def edge(self, s, t):
-		return self.graph.es[s,t][0].index
-	
-	def edge_st(self, edge):
-		edge = self.graph.es[edge]
-		return (edge.source, edge.target)
+	def edge_set(self):
+		return set(self.graph.get_edgelist())
+
+	def edges_of_type(self, edgetype):
+		el = self.graph.get_edgelist()
+		return (el[i] for i in self.graph.es.select(t_eq=edgetype).indices)
 
-	def edge_s(self, edge):
-		edge = self.graph.es[edge]
-		return edge.source
+	def num_edges_of_type(self, edgetype):
+		return len(self.graph.es.select(t_eq=edgetype))
 
-	def edge_t(self, edge):
-		edge = self.graph.es[edge]
-		return edge.target
+	def edge(self, s, t):
+		return (s,t) if s < t else (t,s)
+	def edge_st(self, edge):
+		return edge
 
 	def neighbours(self, vertex):
 		return self.graph.neighbors(vertex)
@@ -100,68 +216,68 @@ class GraphIG(BaseGraph):
 		return self.graph.degree(vertex)
 
 	def incident_edges(self, vertex):
-		return self.graph.incident(vertex, mode=ig.ALL)
+		return [(vertex, v1) if v1 > vertex else (v1, vertex) for v1 in self.graph.neighbors(vertex)]
 
 	def connected(self,v1,v2):
-		return self.graph.are_connected(v1,v2)
+		return self.graph.get_eid(v1, v2, error=False) >= 0
 
 	def edge_type(self, e):
-		if e in self.graph.es:
-			t = self.graph.es[e]['_t']
-			return 1 if t == None else t
-		else:
-			return 0
+		eid = self.graph.get_eid(e[0], e[1], error=False)
+		if eid < 0: return 0
+		if self._etypes is None: self._etypes = self.graph.es['t']
+		return self._etypes[eid]
 
 	def set_edge_type(self, e, t):
-		self.graph.es[e]['_t'] = t
-
-
-	def type(self, v):
-		t = self.graph.vs[v]['_t']
-		return t if t != None else 0
+		eid = self.graph.get_eid(e[0], e[1])
+		self.graph.es[eid]['t'] = t
+		if self._etypes is not None: self._etypes[eid] = t
 
+	def type(self, vertex):
+		return self._ty[vertex]
 	def types(self):
-		return self.graph.vs['_t']
+		return self._ty
+	def set_type(self, vertex, t):
+		self._ty[vertex] = t
 
-	def set_type(self, v, t):
-		self.graph.vs[v]['_t'] = t
-		
 	def phase(self, vertex):
-		a = self.graph.vs[vertex]['_a']
-		return a if a != None else 0
-
+		return self._phase[vertex]
 	def phases(self):
-		return [a if a != None else 0 for a in self.graph.vs['_a']]
-
+		return self._phase
 	def set_phase(self, vertex, phase):
-		self.graph.vs[vertex]['_a'] = phase % 2
+		if self.phase_denominator:
+			if type(phase) is not int:
+				phase = Fraction(phase)
+				if phase.denominator == 1: phase = phase.numerator
+			self._phase[vertex] = phase % (2*self.phase_denominator)
+		else: self._phase[vertex] = Fraction(phase) % 2
+	def add_to_phase(self, vertex, phase):
+		self.set_phase(vertex, self._phase[vertex] + phase)
 
 	def qubit(self, vertex):
-		return self.graph.vs[vertex]['_q'] or -1
+		return self._qindex.get(vertex,-1)
 	def qubits(self):
-		return self.graph.vs['_q']
+		return self._qindex
 	def set_qubit(self, vertex, q):
 		if q > self._maxq: self._maxq = q
-		self.graph.vs[vertex]['_q'] = q
+		self._qindex[vertex] = q
 
 	def row(self, vertex):
-		return self.graph.vs[vertex]['_r'] or -1
+		return self._rindex.get(vertex, -1)
 	def rows(self):
-		return self.graph.vs['_r']
+		return self._rindex
 	def set_row(self, vertex, r):
 		if r > self._maxr: self._maxr = r
-		self.graph.vs[vertex]['_r'] = r
+		self._rindex[vertex] = r
 
-	def set_vdata(self, v, key, val):
-		self.graph.vs[v][key] = val
-
-	def vdata_keys(self, v):
-		return [a for a in self.graph.vertex_attributes() if a != '_a' and a != '_t' and a != '_q' and a != '_r']
-
-	def vdata(self, v, key, default=0):
-		try:
-			val = self.graph.vs[v][key]
-			if not val: val = default
-		except KeyError:
-			val = default
-		return val
\ No newline at end of file
+	def vdata_keys(self, vertex):
+		return self._vdata.get(vertex, {}).keys()
+	def vdata(self, vertex, key, default=0):
+		if vertex in self._vdata:
+			return self._vdata[vertex].get(key,default)
+		else:
+			return default
+	def set_vdata(self, vertex, key, val):
+		if vertex in self._vdata:
+			self._vdata[vertex][key] = val
+		else:
+			self._vdata[vertex] = {key:val}
@@ -15,9 +15,31 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from collections.abc import Set
 from fractions import Fraction
 from .base import BaseGraph
 
+_ONE = Fraction(1)
+
+class _EdgeSetView(Set):
+	"""The read-only view on the edges of a :class:`GraphS` returned by :meth:`GraphS.edge_view`.
+	Like a set of the edges it only contains the edges ``(s,t)`` with ``s < t``."""
+	__slots__ = ('_g',)
+	def __init__(self, g):
+		self._g = g
+	def __contains__(self, e):
+		try: s, t = e
+		except (TypeError, ValueError): return False
+		adj = self._g.graph.get(s)
+		return adj is not None and s < t and t in adj
+	def __iter__(self):
+		return self._g.edges()
+	def __len__(self):
+		return self._g.nedges
+	@classmethod
+	def _from_iterable(cls, it):
+		return set(it)
+
 class GraphS(BaseGraph):
 	"""Purely Pythonic implementation of :class:`~graph.base.BaseGraph`."""
 	backend = 'simple'
@@ -29,6 +51,7 @@ class GraphS(BaseGraph):
 		self.graph = dict()
 		self._vindex = 0
 		self.nedges = 0
+		self._etypes = {1: set(), 2: set()} # the edges of every type, kept up to date with self.graph
 		self.ty = dict()
 		self._phase = dict()
 		self._qindex = dict()
@@ -39,6 +62,7 @@ class GraphS(BaseGraph):
 		self.inputs = []
 		self.outputs = []
 		self._vdata = dict()
+		self._journals = [] # stack of the changes since every snapshot, see snapshot()
 		
 
 	def vindex(self): return self._vindex
@@ -59,19 +83,152 @@ class GraphS(BaseGraph):
 		self._vindex += amount
 		return range(self._vindex - amount, self._vindex)
 
+	def snapshot(self):
+		# A journal holds the state of the graph at the time of the snapshot. For the vertices
+		# only the state of those that are changed afterwards is saved, just before the change.
+		j = {'vertices': dict(), 'vindex': self._vindex, 'nedges': self.nedges,
+			'maxq': self._maxq, 'maxr': self._maxr, 
+			'inputs': list(self.inputs), 'outputs': list(self.outputs)}
+		if self.track_phases:
+			j['phase_index'] = dict(self.phase_index)
+			j['phase_mult'] = dict(self.phase_mult)
+			j['max_phase_index'] = self.max_phase_index
+		self._journals.append(j)
+
+	def _save(self, v):
+		"""Saves the state of ``v`` in the latest journal, if it wasn't saved already."""
+		j = self._journals[-1]
+		saved = j['vertices']
+		if v in saved or v >= j['vindex']: return
+		vdata = self._vdata.get(v)
+		saved[v] = (dict(self.graph[v]), self.ty[v], self._phase[v], self._qindex.get(v), 
+			self._rindex.get(v), dict(vdata) if vdata is not None else None)
+
+	def rollback(self):
+		if not self._journals: raise ValueError("There is no snapshot to roll back to")
+		j = self._journals.pop()
+		graph = self.graph
+		etypes = self._etypes
+		for v in range(j['vindex'], self._vindex):
+			if v not in graph: continue
+			for w,t in graph.pop(v).items():
+				etypes[t].discard((v,w) if v < w else (w,v))
+			del self.ty[v]
+			del self._phase[v]
+			self._qindex.pop(v,None)
+			self._rindex.pop(v,None)
+			self._vdata.pop(v,None)
+			self.phase_index.pop(v,None)
+		saved = j['vertices']
+		for v in saved:
+			if v not in graph: continue
+			for w,t in graph[v].items():
+				etypes[t].discard((v,w) if v < w else (w,v))
+		for v, (adj, ty, phase, q, r, vdata) in saved.items():
+			graph[v] = adj
+			self.ty[v] = ty
+			self._phase[v] = phase
+			if q is None: self._qindex.pop(v,None)
+			else: self._qindex[v] = q
+			if r is None: self._rindex.pop(v,None)
+			else: self._rindex[v] = r
+			if vdata is None: self._vdata.pop(v,None)
+			else: self._vdata[v] = vdata
+		for v, (adj, _, _, _, _, _) in saved.items():
+			for w,t in adj.items():
+				etypes[t].add((v,w) if v < w else (w,v))
+		self._vindex = j['vindex']
+		self.nedges = j['nedges']
+		self._maxq = j['maxq']
+		self._maxr = j['maxr']
+		self.inputs = j['inputs']
+		self.outputs = j['outputs']
+		if 'phase_index' in j:
+			self.phase_index = j['phase_index']
+			self.phase_mult = j['phase_mult']
+			self.max_phase_index = j['max_phase_index']
+
+	def commit(self):
+		if not self._journals: raise ValueError("There is no snapshot to commit")
+		j = self._journals.pop()
+		if self._journals:
+			# The changes now belong to the previous snapshot, which for the vertices it hasn't
+			# saved yet needs their state from before these changes.
+			prev = self._journals[-1]
+			saved = prev['vertices']
+			for v, state in j['vertices'].items():
+				if v not in saved and v < prev['vindex']: saved[v] = state
+
 	def add_edges(self, edges, edgetype=1):
+		etypes = self._etypes
+		journal = bool(self._journals)
 		for s,t in edges:
+			if journal:
+				self._save(s)
+				self._save(t)
 			self.nedges += 1
+			e = (s,t) if s < t else (t,s)
+			old = self.graph[s].get(t, 0)
+			if old: etypes[old].discard(e)
+			etypes[edgetype].add(e)
 			self.graph[s][t] = edgetype
 			self.graph[t][s] = edgetype
 
+	def add_edge_table(self, etab):
+		# Same as BaseGraph.add_edge_table, but working directly on the adjacency dictionaries
+		graph = self.graph
+		ty = self.ty
+		etypes = self._etypes
+		journal = bool(self._journals)
+		pi = self.phase_units(1)
+		for (v1,v2),(n1,n2) in etab.items():
+			adj = graph[v1]
+			conn_type = adj.get(v2, 0)
+			if conn_type == 1: n1 += 1
+			elif conn_type == 2: n2 += 1
+			if ty[v1] == ty[v2]: # normal edges fuse, hadamard edges go modulo 2
+				n1 = n1 > 0
+				n2 = n2 % 2
+				new_type = 1 if n1 else (2 if n2 else 0)
+			else:                # normal edges go modulo 2, hadamard edges fuse
+				n1 = n1 % 2
+				n2 = n2 > 0
+				new_type = 2 if n2 else (1 if n1 else 0)
+			if n1 and n2: self.add_to_phase(v1, pi)
+			if new_type == conn_type: continue
+			if journal:
+				self._save(v1)
+				self._save(v2)
+			e = (v1,v2) if v1 < v2 else (v2,v1)
+			if new_type == 0:
+				del adj[v2]
+				del graph[v2][v1]
+				etypes[conn_type].discard(e)
+				self.nedges -= 1
+			else:
+				if conn_type == 0: self.nedges += 1
+				else: etypes[conn_type].discard(e)
+				etypes[new_type].add(e)
+				adj[v2] = new_type
+				graph[v2][v1] = new_type
+
 	def remove_vertices(self, vertices):
+		vertices = list(vertices)
+		seen = set()
+		for v in vertices: # check all of them before anything is removed
+			if v not in self.graph or v in seen: raise KeyError(v)
+			seen.add(v)
+		etypes = self._etypes
+		journal = bool(self._journals)
 		for v in vertices:
-			vs = list(self.graph[v])
+			adj = self.graph[v]
+			if journal:
+				self._save(v)
+				for v1 in adj: self._save(v1)
 			# remove all edges
-			for v1 in vs:
+			for v1,t in adj.items():
 				self.nedges -= 1
-				del self.graph[v][v1]
+				etypes[t].discard((v,v1) if v < v1 else (v1,v))
 				del self.graph[v1][v]
 			# remove the vertex
 			del self.graph[v]
@@ -92,8 +249,14 @@ class GraphS(BaseGraph):
 		self.remove_vertices([v for v in self.vertices() if self.vertex_degree(v)==0])
 
 	def remove_edges(self, edges):
+		etypes = self._etypes
+		journal = bool(self._journals)
 		for s,t in edges:
+			if journal:
+				self._save(s)
+				self._save(t)
 			self.nedges -= 1
+			etypes[self.graph[s][t]].discard((s,t) if s < t else (t,s))
 			del self.graph[s][t]
 			del self.graph[t][s]
 
@@ -118,10 +281,18 @@ class GraphS(BaseGraph):
 				yield v
 
 	def edges(self):
+		# Walks the adjacency dictionaries rather than self._etypes, as the order
+		# of the edges decides which matches the simplification routines find.
 		for v0,adj in self.graph.items():
 			for v1 in adj:
 				if v1 > v0: yield (v0,v1)
 
+	def edges_of_type(self, edgetype):
+		return iter(self._etypes[edgetype])
+
+	def num_edges_of_type(self, edgetype):
+		return len(self._etypes[edgetype])
+
 	def edges_in_range(self, start, end, safe=False):
 		"""like self.edges, but only returns edges that belong to vertices 
 		that are only directly connected to other vertices with 
@@ -148,6 +319,8 @@ class GraphS(BaseGraph):
 		return (s,t) if s < t else (t,s)
 	def edge_set(self):
 		return set(self.edges())
+	def edge_view(self):
+		return _EdgeSetView(self)
 	def edge_st(self, edge):
 		return edge
 
@@ -172,6 +345,13 @@ class GraphS(BaseGraph):
 
 	def set_edge_type(self, e, t):
 		v1,v2 = e
+		if self._journals:
+			self._save(v1)
+			self._save(v2)
+		e = (v1,v2) if v1 < v2 else (v2,v1)
+		old = self.graph[v1].get(v2, 0)
+		if old: self._etypes[old].discard(e)
+		self._etypes[t].add(e)
 		self.graph[v1][v2] = t
 		self.graph[v2][v1] = t
 
@@ -180,22 +360,33 @@ class GraphS(BaseGraph):
 	def types(self):
 		return self.ty
 	def set_type(self, vertex, t):
+		if self._journals: self._save(vertex)
 		self.ty[vertex] = t
 
 	def phase(self, vertex):
-		return self._phase.get(vertex,Fraction(1))
+		return self._phase.get(vertex,self.phase_denominator or _ONE)
 	def phases(self):
 		return self._phase
 	def set_phase(self, vertex, phase):
-		self._phase[vertex] = Fraction(phase) % 2
+		if self._journals: self._save(vertex)
+		if self.phase_denominator:
+			if type(phase) is not int:
+				phase = Fraction(phase)
+				if phase.denominator == 1: phase = phase.numerator
+			self._phase[vertex] = phase % (2*self.phase_denominator)
+		else: self._phase[vertex] = Fraction(phase) % 2
 	def add_to_phase(self, vertex, phase):
-		self._phase[vertex] = (self._phase.get(vertex,Fraction(1)) + phase) % 2
+		if self._journals: self._save(vertex)
+		if self.phase_denominator: 
+			self.set_phase(vertex, self._phase.get(vertex,self.phase_denominator) + phase)
+		else: self._phase[vertex] = (self._phase.get(vertex,_ONE) + phase) % 2
 
 	def qubit(self, vertex):
 		return self._qindex.get(vertex,-1)
 	def qubits(self):
 		return self._qindex
 	def set_qubit(self, vertex, q):
+		if self._journals: self._save(vertex)
 		if q > self._maxq: self._maxq = q
 		self._qindex[vertex] = q
 
@@ -204,6 +395,7 @@ class GraphS(BaseGraph):
 	def rows(self):
 		return self._rindex
 	def set_row(self, vertex, r):
+		if self._journals: self._save(vertex)
 		if r > self._maxr: self._maxr = r
 		self._rindex[vertex] = r
 
@@ -215,6 +407,7 @@ class GraphS(BaseGraph):
 		else:
 			return default
 	def set_vdata(self, vertex, key, val):
+		if self._journals: self._save(vertex)
 		if vertex in self._vdata:
 			self._vdata[vertex][key] = val
 		else:
@@ -160,7 +160,7 @@ def graph_to_json(g):
             if t==2: node_vs[name]["data"]["type"] = "X"
             elif t==1:node_vs[name]["data"]["type"] = "Z"
             elif t!=1: raise Exception("Unkown type "+ str(t))
-            phase = _phase_to_quanto_value(g.phase(v))
+            phase = _phase_to_quanto_value(g.phase_fraction(g.phase(v)))
             if phase: node_vs[name]["data"]["value"] = phase
             if not node_vs[name]["data"]: del node_vs[name]["data"]
 
@@ -231,11 +231,13 @@ class Mat2(object):
             if x.data[i][0] != 0:
                 return None
             i -= 1
-        if x.rows() > m.cols():
-            x.data[0] = x.data[0][:m.cols()]
-        else:
-            x.data[0] = x.data[0] + [[0]]*(m.cols()-x.rows())
-        return x
+        # Row i of the reduced matrix has its pivot in column p, which is the only
+        # one in that column, so setting the entries of x at the pivots solves it.
+        sol = Mat2([[0] for j in range(m.cols())])
+        for i in range(rank):
+            p = m.data[i].index(1)
+            sol.data[p][0] = x.data[i][0]
+        return sol
 
     def nullspace(self, should_copy=True):
         """Returns a list of non-zero vectors that span the nullspace
@@ -284,6 +286,152 @@ class Mat2(object):
             cn = best_cn
         return cn.cnots # list(reversed(cn.cnots)) 
 
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(n):
+        """Returns the number of ones in the binary expansion of the nonnegative integer n."""
+        return bin(n).count('1')
+
+def pack_row(row):
+    """Returns the list of zeroes and ones ``row`` as an integer where bit ``j`` is ``row[j]``."""
+    return int(''.join('1' if v else '0' for v in reversed(row)) or '0', 2)
+
+class BitMat2(object):
+    """A matrix over Z2 where every row is stored as a single integer, the entry at column ``j``
+    being the ``j``-th bit. This makes adding two rows a single XOR, regardless of the amount of
+    columns. It supports the row operations and Gaussian elimination of :class:`Mat2`, and
+    :meth:`gauss` performs exactly the same row operations as :meth:`Mat2.gauss`, so that
+    the two classes can be used interchangeably where only those are needed.
+    Use :meth:`to_mat2` for the rest of the functionality of :class:`Mat2`."""
+
+    @staticmethod
+    def id(n):
+        return BitMat2([1 << i for i in range(n)], n)
+
+    @staticmethod
+    def from_mat2(m):
+        return BitMat2([pack_row(row) for row in m.data], m.cols())
+
+    def __init__(self, data, cols):
+        self.data = data
+        self.ncols = cols
+    def __eq__(self, other):
+        if not isinstance(other, BitMat2): return False
+        return self.ncols == other.ncols and self.data == other.data
+    def __str__(self):
+        return str(self.to_mat2())
+    def __repr__(self):
+        return str(self)
+    def to_mat2(self):
+        return Mat2([[(r >> j) & 1 for j in range(self.ncols)] for r in self.data])
+    def copy(self):
+        return BitMat2(list(self.data), self.ncols)
+    def rows(self):
+        return len(self.data)
+    def cols(self):
+        return self.ncols
+    def entry(self, i, j):
+        return (self.data[i] >> j) & 1
+    def row_add(self, r0, r1):
+        """Add r0 to r1"""
+        self.data[r1] ^= self.data[r0]
+    def col_add(self, c0, c1):
+        """Add c0 to c1"""
+        d = self.data
+        b = 1 << c1
+        for i in range(len(d)):
+            if (d[i] >> c0) & 1: d[i] ^= b
+    def row_swap(self, r0, r1):
+        """Swap the rows r0 and r1"""
+        d = self.data
+        d[r0], d[r1] = d[r1], d[r0]
+
+    def gauss(self, full_reduce=False, x=None, y=None, blocksize=6):
+        """Compute the echelon form. Returns the number of non-zero rows in the result, i.e.
+        the rank of the matrix. See :meth:`Mat2.gauss` for the meaning of the parameters."""
+        d = self.data
+        rows = len(d)
+        cols = self.ncols
+        pcols = []
+        pivot_row = 0
+        for sec in range(math.ceil(cols / blocksize)):
+            i0 = sec * blocksize
+            i1 = min(cols, (sec+1) * blocksize)
+            mask = ((1 << (i1-i0)) - 1) << i0
+
+            # search for duplicate chunks of 'blocksize' bits and eliminate them
+            chunks = dict()
+            for r in range(pivot_row, rows):
+                t = d[r] & mask
+                if not t: continue
+                if t in chunks:
+                    d[r] ^= d[chunks[t]]
+                    if x is not None: x.row_add(chunks[t], r)
+                    if y is not None: y.col_add(r, chunks[t])
+                else:
+                    chunks[t] = r
+
+            p = i0
+            while p < i1:
+                b = 1 << p
+                for r0 in range(pivot_row, rows):
+                    if d[r0] & b:
+                        if r0 != pivot_row:
+                            d[pivot_row] ^= d[r0]
+                            if x is not None: x.row_add(r0, pivot_row)
+                            if y is not None: y.col_add(pivot_row, r0)
+                        prow = d[pivot_row]
+                        for r1 in range(pivot_row+1, rows):
+                            if d[r1] & b:
+                                d[r1] ^= prow
+                                if x is not None: x.row_add(pivot_row, r1)
+                                if y is not None: y.col_add(r1, pivot_row)
+                        if full_reduce: pcols.append(p)
+                        pivot_row += 1
+                        break
+                p += 1
+
+        rank = pivot_row
+
+        if full_reduce:
+            pivot_row -= 1
+
+            for sec in range(math.ceil(cols / blocksize) - 1, -1, -1):
+                i0 = sec * blocksize
+                i1 = min(cols, (sec+1) * blocksize)
+                mask = ((1 << (i1-i0)) - 1) << i0
+
+                chunks = dict()
+                for r in range(pivot_row, -1, -1):
+                    t = d[r] & mask
+                    if not t: continue
+                    if t in chunks:
+                        d[r] ^= d[chunks[t]]
+                        if x is not None: x.row_add(chunks[t], r)
+                        if y is not None: y.col_add(r, chunks[t])
+                    else:
+                        chunks[t] = r
+
+                while len(pcols) != 0 and i0 <= pcols[-1] < i1:
+                    b = 1 << pcols.pop()
+                    prow = d[pivot_row]
+                    for r in range(0, pivot_row):
+                        if d[r] & b:
+                            d[r] ^= prow
+                            if x is not None: x.row_add(pivot_row, r)
+                            if y is not None: y.col_add(r, pivot_row)
+                    pivot_row -= 1
+
+        return rank
+
+    def rank(self):
+        """Returns the rank of the matrix."""
+        return self.copy().gauss()
+
+    to_cnots = Mat2.to_cnots
+
+
 from .circuit import CNOT
 class CNOTMaker:
     def __init__(self):
@@ -296,12 +444,16 @@ class CNOTMaker:
 def xor_rows(l1, l2):
     return [0 if l1[i]==l2[i] else 1 for i in range(len(l1))]
 
+def _packed_rows(m):
+    if isinstance(m, BitMat2): return list(m.data)
+    return [pack_row(row) for row in m.data]
+
 def find_minimal_sums(m):
     """Returns a list of rows in m that can be added together to reduce one of the rows so that
     it only contains a single 1. Used in :func:`greedy_reduction`"""
-    r = m.rows()
-    d = m.data
-    if any(sum(r)==1 for r in d): return []
+    d = _packed_rows(m)
+    r = len(d)
+    if any(popcount(row)==1 for row in d): return []
     combs = {(i,):d[i] for i in range(r)}
     combs2 = {}
     iterations = 0
@@ -309,10 +461,8 @@ def find_minimal_sums(m):
         combs2 = {}
         for index,l in combs.items():
             for k in range(max(index)+1,r):
-                #Unrolled xor_rows(combs[index],d[k])
-                row = [0 if v1==v2 else 1 for v1,v2 in zip(combs[index],d[k])]
-                #row = xor_rows(combs[index],d[k])
-                if sum(row) == 1:
+                row = l ^ d[k]
+                if popcount(row) == 1:
                     return (*index,k)
                 combs2[(*index,k)] = row
                 iterations += 1
@@ -326,12 +476,14 @@ def find_minimal_sums(m):
 def greedy_reduction(m):
     """Returns a list of tuples (r1,r2) that specify which row should be added to which other row
     in order to reduce one row of m to only contain a single 1. 
+    ``m`` can be a :class:`Mat2` or a :class:`BitMat2`.
     Used in :func:`extract.streaming_extract`"""
     indices = find_minimal_sums(m)
     if not isinstance(indices, (list,tuple)): return indices
     indices = list(indices)
-    rows = {i:m.data[i] for i in indices}
-    weights = {i: sum(r) for i,r in rows.items()}
+    d = _packed_rows(m)
+    rows = {i:d[i] for i in indices}
+    weights = {i: popcount(r) for i,r in rows.items()}
     result = []
     while len(indices)>1:
         best = (-1,-1)
@@ -339,7 +491,7 @@ def greedy_reduction(m):
         for i in indices:
             for j in indices:
                 if j <= i: continue
-                w = sum(xor_rows(rows[i],rows[j]))
+                w = popcount(rows[i] ^ rows[j])
                 if weights[i] - w > reduction:
                     best = (j,i) # "Add row j to i"
                     reduction = weights[i] - w
@@ -348,7 +500,7 @@ def greedy_reduction(m):
                     reduction = weights[j] - w
         result.append(best)
         control, target = best
-        rows[target] = xor_rows(rows[control],rows[target])
+        rows[target] = rows[control] ^ rows[target]
         weights[target] = weights[target] - reduction
         indices.remove(control)
     return result
@@ -356,6 +508,7 @@ def greedy_reduction(m):
 
 
 def column_optimal_swap(m):
+    if isinstance(m, BitMat2): m = m.to_mat2()
     qubits = min([m.rows(), m.cols()])
     connections = {i: set() for i in range(qubits)}
     connectionsr= {j: set() for j in range(qubits)}
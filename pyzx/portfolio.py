@@ -0,0 +1,194 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Extracts a circuit from a ZX-diagram in several different ways at once and keeps the best one.
+Which CNOTs :func:`~extract.streaming_extract` chooses depends on the order in which it looks at
+the vertices, so extracting with different seeds (see the ``seed`` parameter of
+:func:`~extract.streaming_extract`) gives different circuits, some of which are noticeably
+smaller than others. :func:`portfolio_extract` runs a number of these extractions in
+worker processes and returns the circuit with the lowest cost.
+"""
+
+import os
+import time
+
+try:
+    import multiprocessing as mp
+    from multiprocessing.connection import wait
+except ImportError:
+    pass
+
+from .extract import streaming_extract
+from . import optimize
+
+__all__ = ['portfolio_extract', 'STRATEGIES', 'COSTS']
+
+
+def _extract(g, seed):
+    return streaming_extract(g, seed=seed).to_basic_gates()
+
+def _extract_basic(g, seed):
+    return optimize.basic_optimization(_extract(g, seed)).to_basic_gates()
+
+def _extract_full(g, seed):
+    return optimize.full_optimize(_extract(g, seed)).to_basic_gates()
+
+STRATEGIES = {'extract': _extract, 'basic': _extract_basic, 'full': _extract_full}
+"""The strategies :func:`portfolio_extract` can use, by name. ``'extract'`` only extracts the circuit,
+``'basic'`` also runs :func:`~optimize.basic_optimization` on it and ``'full'`` runs
+:func:`~optimize.full_optimize` instead."""
+
+COSTS = {
+    'twoqubit': lambda c: c.twoqubitcount(),
+    'tcount': lambda c: c.tcount(),
+    'depth': lambda c: c.depth(),
+    'gates': lambda c: len(c.to_basic_gates().gates),
+}
+"""The cost functions :func:`portfolio_extract` can minimise, by name."""
+
+
+def _portfolio_worker(conn, g, strategies):
+    """Loop run by each of the worker processes of :func:`portfolio_extract`. It receives pairs of
+    a strategy and a seed, and sends back the circuit extracted from a copy of ``g``."""
+    try:
+        while True:
+            task = conn.recv()
+            if task is None: break
+            name, seed = task
+            t = time.perf_counter()
+            try:
+                c = strategies[name](g.copy(), seed)
+                r = {'status': 'ok', 'circuit': c}
+            except Exception as e:
+                r = {'status': 'error', 'error': "{}: {}".format(type(e).__name__, e)}
+            r['time'] = time.perf_counter() - t
+            conn.send(r)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+def portfolio_extract(g, seeds=4, strategies=('extract',), cost='twoqubit', nworkers=None,
+                      deadline=None, target=None, callback=None):
+    """Extracts a circuit from the graph ``g``, which should be put into semi-normal form by
+    :func:`~simplify.full_reduce`, once for every combination of a strategy and a seed,
+    using ``nworkers`` processes that each work on their own copy of ``g``.
+    Returns the circuit, consisting of basic gates, with the lowest cost. When several have
+    the same cost, the one that comes first in the order of ``seeds`` and ``strategies`` is chosen,
+    so that the result only depends on the timing when ``deadline`` or ``target`` are given.
+    ``g`` itself is not changed.
+
+    :param g: The graph to extract a circuit from.
+    :param seeds: The seeds to pass to :func:`~extract.streaming_extract`, or the amount of seeds to use.
+       The seed None, which is the first of the seeds when an amount is given, gives the
+       same circuit as an extraction without a seed.
+    :param strategies: The strategies to use. Either names in :data:`STRATEGIES`, or functions
+       that take a graph and a seed and return a circuit.
+       With the ``spawn`` start method of :mod:`multiprocessing` these functions have to be picklable.
+    :param cost: The cost to minimise. Either a name in :data:`COSTS`, or a function
+       that takes a circuit and returns a number.
+    :param nworkers: The amount of worker processes. By default the amount of CPUs.
+    :param deadline: If given, the amount of seconds after which the extractions that are still running
+       are cancelled and the best circuit found so far is returned. If there is no circuit yet
+       at that point, it waits for the first one.
+    :param target: If given, the remaining extractions are cancelled as soon as
+       a circuit with at most this cost is found.
+    :param callback: Optional function that is called with a dictionary for every finished extraction,
+       containing its ``strategy``, ``seed``, ``status``, ``time`` and, if successful, its ``cost``.
+    :rtype: :class:`~circuit.Circuit`"""
+    if isinstance(seeds, int): seeds = [None] + list(range(1, seeds))
+    funcs = {}
+    tasks = []
+    for seed in seeds:
+        for s in strategies:
+            if not callable(s):
+                if s not in STRATEGIES:
+                    raise ValueError("Unknown strategy {}. Please use one of {}".format(s, ", ".join(STRATEGIES)))
+                funcs[s] = STRATEGIES[s]
+            else: funcs[s] = s
+            tasks.append((s, seed))
+    if not tasks: raise ValueError("No seeds or strategies given")
+    if not callable(cost):
+        if cost not in COSTS:
+            raise ValueError("Unknown cost {}. Please use one of {}".format(cost, ", ".join(COSTS)))
+        cost = COSTS[cost]
+    if nworkers is None: nworkers = os.cpu_count() or 1
+
+    def start_worker():
+        parent_conn, child_conn = mp.Pipe()
+        p = mp.Process(target=_portfolio_worker, args=(child_conn, g, funcs))
+        p.daemon = True
+        p.start()
+        child_conn.close()
+        return parent_conn, p
+
+    start = time.perf_counter()
+    best = None # (cost, index of the task, circuit)
+    errors = []
+    pending = list(enumerate(tasks))
+    pending.reverse()
+    idle = [start_worker() for _ in range(min(nworkers, len(tasks)))]
+    busy = dict() # connection -> (process, index of the task)
+    try:
+        while pending or busy:
+            if target is not None and best is not None and best[0] <= target: break
+            while idle and pending:
+                conn, p = idle.pop()
+                i, task = pending.pop()
+                conn.send(task)
+                busy[conn] = (p, i)
+            wait_time = None
+            if deadline is not None and best is not None:
+                wait_time = max(0.0, start + deadline - time.perf_counter())
+            ready = wait(list(busy), wait_time)
+            if not ready: break # The deadline has passed
+            for conn in ready:
+                p, i = busy.pop(conn)
+                try:
+                    r = conn.recv()
+                except EOFError: # The worker died, for instance because it ran out of memory
+                    r = {'status': 'error', 'time': None,
+                         'error': "Worker process exited with code {}".format(p.exitcode)}
+                    conn.close()
+                    p.join()
+                    conn, p = start_worker()
+                idle.append((conn, p))
+                name, seed = tasks[i]
+                info = {'strategy': name if isinstance(name, str) else getattr(name, '__name__', repr(name)),
+                        'seed': seed, 'status': r['status'], 'time': r['time']}
+                if r['status'] == 'ok':
+                    c = r['circuit']
+                    info['cost'] = cost(c)
+                    if best is None or (info['cost'], i) < best[:2]: best = (info['cost'], i, c)
+                else:
+                    info['error'] = r['error']
+                    errors.append(r['error'])
+                if callback: callback(info)
+            if deadline is not None and best is not None and time.perf_counter() - start >= deadline: break
+    finally:
+        for conn, p in idle:
+            try: conn.send(None)
+            except (OSError, EOFError): pass
+            conn.close()
+        for conn, (p, i) in busy.items():
+            p.terminate()
+            conn.close()
+        for conn, p in idle: p.join()
+        for p, i in busy.values(): p.join()
+    if best is None:
+        raise Exception("All extractions failed: " + "; ".join(errors))
+    return best[2]
@@ -0,0 +1,280 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Single-pass parser for QASM files. :func:`parse_qasm` reads a file object in blocks of
+:data:`BLOCK_SIZE` characters, which are split into statements, so that the file never has to be
+held in memory as a whole, and produces the same circuit as :class:`~circuit.QASMParser`, either as a
+:class:`~circuit.Circuit` or as a :class:`~compact_circuit.CompactCircuit`.
+
+Large QASM files mostly repeat a small amount of distinct statements, like ``cx q[3],q[4];``,
+so the gates of every statement are cached: a statement is only parsed the first time it is seen,
+after which its gates are copied. The body of a custom ``gate`` definition is parsed once into a
+template circuit, which is repositioned onto the arguments of the statements that use it.
+"""
+
+import os
+import re
+
+from .circuit import Circuit, QASMParser, XPhase, ZPhase, qasm_gate_table, _qasm_phase
+from .compact_circuit import CompactCircuit, OBJECT
+
+__all__ = ['parse_qasm', 'load_qasm']
+
+_DELIMITERS = re.compile(r'([;{}])')
+_COMMENT = re.compile(r'//[^\n]*')
+
+BLOCK_SIZE = 2**20
+"""The amount of characters :func:`parse_qasm` reads from the file at a time."""
+
+CACHE_SIZE = 100000
+"""The maximum amount of distinct statements of which :func:`parse_qasm` caches the gates."""
+
+
+def _statements(f):
+    """Yields the statements in the QASM source ``f``, a file object, as pairs of the statement
+    without comments and surrounding whitespace, and the character ``;``, ``{`` or ``}`` that ends it.
+    The text after the last of these characters is yielded with an empty string as the end.
+    The file is read in blocks of :data:`BLOCK_SIZE` characters, extended to the end of the line."""
+    pending = ''
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block: break
+        if not block.endswith('\n'): block += f.readline()
+        if '//' in block: block = _COMMENT.sub('', block)
+        if '{' in block or '}' in block:
+            parts = _DELIMITERS.split(block)
+            for k in range(0, len(parts) - 1, 2):
+                yield (pending + parts[k]).strip(), parts[k+1]
+                pending = ''
+        else:
+            parts = block.split(';')
+            if len(parts) > 1:
+                yield (pending + parts[0]).strip(), ';'
+                pending = ''
+                for k in range(1, len(parts) - 1):
+                    yield parts[k].strip(), ';'
+        pending += parts[-1]
+    pending = pending.strip()
+    if pending: yield pending, ''
+
+
+def _clone(g):
+    h = g.__class__.__new__(g.__class__)
+    h.__dict__.update(g.__dict__)
+    return h
+
+
+class _UnknownGate(TypeError):
+    """Raised by :class:`_StreamParser` for a gate that isn't a standard gate or a custom gate defined before."""
+
+
+class _StreamParser(object):
+    """Keeps the registers, custom gates and caches of a call to :func:`parse_qasm`."""
+    def __init__(self):
+        self.registers = {}
+        self.qubit_count = 0
+        self.customgates = {}
+        self.phases = {}
+
+    def parse_custom_gate(self, spec, body):
+        """Parses the definition ``gate spec { body }``, where ``body`` is a list of statements."""
+        data = "gate {} {{ {} }}".format(spec, "; ".join(body))
+        spec = spec[4:]
+        if "(" in spec:
+            i = spec.find("(")
+            j = spec.find(")")
+            if spec[i+1:j].strip():
+                raise TypeError("Arguments for custom gates are currently"
+                                " not supported: {}".format(data))
+            spec = spec[:i] + spec[j+1:]
+        spec = spec.strip().split(None, 1)
+        if len(spec) != 2:
+            raise TypeError("Custom gate specification doesn't have any "
+                            "arguments: {}".format(data))
+        name, args = spec
+        registers = {}
+        qubit_count = 0
+        for a in args.split(","):
+            a = a.strip()
+            if a in registers:
+                raise TypeError("Duplicate variable name: {}".format(data))
+            registers[a] = (qubit_count,1)
+            qubit_count += 1
+        circ = Circuit(qubit_count)
+        for c in body:
+            if c: circ.gates.extend(self.parse_command(c, registers))
+        self.customgates[name] = circ
+
+    def parse_command(self, c, registers):
+        """Returns the gates of the statement ``c``, like :meth:`QASMParser.parse_command <circuit.QASMParser.parse_command>`."""
+        gates = []
+        spec = c.split(None, 1)
+        name = spec[0]
+        if name in ("barrier","creg","measure", "id"): return gates
+        if name in ("opaque", "if"):
+            raise TypeError("Unsupported operation {}".format(c))
+        if "(" in name and ")" not in name: # A parameter with spaces in it
+            j = c.find(")")
+            name = c[:j+1].replace(" ", "")
+            spec = [name, c[j+1:]]
+        if len(spec) == 1: raise TypeError("Statement without arguments: {}".format(c))
+        args = [s.strip() for s in spec[1].split(",") if s.strip()]
+        if name == "qreg":
+            regname, size = args[0].split("[",1)
+            size = int(size[:-1])
+            registers[regname.strip()] = (self.qubit_count, size)
+            self.qubit_count += size
+            return gates
+        qubit_values = []
+        is_range = False
+        dim = 1
+        for a in args:
+            if "[" in a:
+                regname, val = a.split("[",1)
+                regname = regname.strip()
+                val = int(val[:-1])
+                if not regname in registers: raise TypeError("Invalid register {}".format(regname))
+                qubit_values.append([registers[regname][0]+val])
+            else:
+                if a not in registers: raise TypeError("Invalid register {}".format(a))
+                if is_range:
+                    if registers[a][1] != dim:
+                        raise TypeError("Error in parsing {}: Register sizes do not match".format(c))
+                else:
+                    dim = registers[a][1]
+                is_range = True
+                s = registers[a][0]
+                qubit_values.append(list(range(s,s + dim)))
+        if is_range:
+            for i in range(len(qubit_values)):
+                if len(qubit_values[i]) != dim:
+                    qubit_values[i] = [qubit_values[i][0]]*dim
+        for j in range(dim):
+            argset = [q[j] for q in qubit_values]
+            if name in self.customgates:
+                circ = self.customgates[name]
+                if len(argset) != circ.qubits:
+                    raise TypeError("Argument amount does not match gate spec: {}".format(c))
+                for g in circ.gates:
+                    gates.append(g.reposition(argset))
+                continue
+            if name in ("x", "z", "s", "t", "h", "sdg", "tdg"):
+                if name in ("sdg", "tdg"): g = qasm_gate_table[name](argset[0],adjoint=True)
+                else: g = qasm_gate_table[name](argset[0])
+                gates.append(g)
+                continue
+            if name.startswith("rx") or name.startswith("rz"):
+                if name not in self.phases: self.phases[name] = _qasm_phase(name)
+                if name.startswith('rx'): g = XPhase(argset[0],phase=self.phases[name])
+                else: g = ZPhase(argset[0],phase=self.phases[name])
+                gates.append(g)
+                continue
+            if name in ("cx","CX","cz"):
+                g = qasm_gate_table[name](control=argset[0],target=argset[1])
+                gates.append(g)
+                continue
+            if name in ("ccx", "ccz"):
+                g = qasm_gate_table[name](ctrl1=argset[0],ctrl2=argset[1],target=argset[2])
+                gates.append(g)
+                continue
+            raise _UnknownGate("Unknown gate name: {}".format(c))
+        return gates
+
+
+def parse_qasm(f, compact=False):
+    """Parses the QASM source ``f`` in a single pass and returns the circuit it describes.
+    Like :class:`~circuit.QASMParser`, it ignores the non-unitary instructions like measurements and
+    doesn't support custom gates that have parameters.
+
+    The QASM specification requires custom gates to be defined before they are used, but
+    :class:`~circuit.QASMParser` also accepts definitions further on in the file. To keep
+    loading such files, when a gate name is not known (yet) and ``f`` is seekable, the file is
+    read again from where it started, as a whole, by :class:`~circuit.QASMParser`.
+    For a file object that isn't seekable the TypeError is raised instead.
+
+    :param f: A file object opened in text mode. To parse a string ``s``, use ``io.StringIO(s)``.
+    :param compact: Whether to return a :class:`~compact_circuit.CompactCircuit` instead of a :class:`~circuit.Circuit`.
+       The gates are then added to the columns directly, without keeping a gate object for every gate.
+    :rtype: :class:`~circuit.Circuit` or :class:`~compact_circuit.CompactCircuit`"""
+    start = f.tell() if f.seekable() else None
+    try:
+        return _parse(f, compact)
+    except _UnknownGate:
+        if start is None: raise
+        f.seek(start)
+        c = QASMParser().parse(f.read())
+        return CompactCircuit.from_circuit(c) if compact else c
+
+def _parse(f, compact):
+    p = _StreamParser()
+    if compact:
+        circ = CompactCircuit(0)
+        encode, append = circ._encode, circ._append
+    else:
+        circ = Circuit(0)
+        append = circ.gates.append
+    cache = {} # statement -> the gates it produces, or for compact circuits their rows
+    statements = _statements(f)
+    header = 0
+    for c, end in statements:
+        if not c and end == ';': continue
+        if header < 2:
+            if header == 0 and not c.startswith("OPENQASM"):
+                raise TypeError("File does not start with OPENQASM descriptor")
+            if header == 1 and not c.startswith('include "qelib1.inc"'):
+                raise TypeError("File is not importing standard library")
+            header += 1
+            continue
+        if end == ';' or end == '':
+            gates = cache.get(c)
+            if gates is None:
+                gates = p.parse_command(c, p.registers)
+                if compact: gates = [(encode(g), g) for g in gates]
+                if c.startswith("qreg"): cache.clear()
+                elif len(cache) < CACHE_SIZE: cache[c] = gates
+            if compact:
+                for row, g in gates: append(row, _clone(g) if row[0] == OBJECT else g)
+            else:
+                for g in gates: append(_clone(g))
+        elif end == '{':
+            if not c.startswith("gate"):
+                raise TypeError("Unsupported operation {}".format(c))
+            body = []
+            for s, end in statements:
+                body.append(s)
+                if end != ';': break
+            if end != '}': raise TypeError("Unterminated definition of gate {}".format(c))
+            p.parse_custom_gate(c, body)
+            cache.clear()
+        else:
+            raise TypeError("Unexpected '}}' after {}".format(c))
+    if header < 2:
+        raise TypeError("File does not start with OPENQASM descriptor" if header == 0
+                        else "File is not importing standard library")
+    circ.qubits = p.qubit_count
+    return circ
+
+
+def load_qasm(fname, compact=False):
+    """Reads the QASM file ``fname`` with :func:`parse_qasm`, and names the circuit after the file."""
+    f = open(fname, 'r')
+    try:
+        c = parse_qasm(f, compact)
+    finally:
+        f.close()
+    c.name = os.path.basename(fname)
+    return c
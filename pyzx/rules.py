@@ -44,6 +44,15 @@ In particular, they are used in combination with :func:`simplify.simp` to create
 
 from fractions import Fraction
 import itertools
+import random
+
+MATCH_ORDER = None
+"""The order in which the ``match_*_parallel`` functions consider their candidates.
+By default (None) the candidates are taken from a Python set, so that the order depends on 
+how the set happened to be built. If set to ``'sorted'``, the candidates are considered in 
+increasing order, and if set to an integer, in an order that is shuffled using that number 
+as a seed. In both cases the matches, and hence the result of the simplification routines, 
+only depend on the graph itself."""
 
 
 def apply_rule(g, rewrite, m, check_isolated_vertices=True):
@@ -54,6 +63,66 @@ def apply_rule(g, rewrite, m, check_isolated_vertices=True):
     if check_isolated_vertices: g.remove_isolated_vertices()
 
 
+class _OrderedCandidates(object):
+    """Replacement for the set of candidates of a ``match_*`` function that pops the candidates
+    in the order given by :data:`MATCH_ORDER`. Discarded candidates are skipped lazily."""
+    __slots__ = ('_set', '_order')
+    def __init__(self, candidates, order):
+        self._set = candidates
+        self._order = sorted(candidates, reverse=True)
+        if order != 'sorted': random.Random(order).shuffle(self._order)
+    def __len__(self):
+        return len(self._set)
+    def __contains__(self, c):
+        return c in self._set
+    def pop(self):
+        while True:
+            c = self._order.pop()
+            if c in self._set:
+                self._set.remove(c)
+                return c
+    def discard(self, c):
+        self._set.discard(c)
+
+def _ordered(candidates):
+    if MATCH_ORDER is None: return candidates
+    return _OrderedCandidates(candidates, MATCH_ORDER)
+
+def _edge_candidates(g, matchf, edgelist, edgetype=None):
+    """Returns the set of candidate edges for a ``match_*_parallel`` function, 
+    restricted to ``edgelist`` if it is given, and filtered by ``matchf``.
+    If ``edgetype`` is given and ``edgelist`` isn't, the edges of the other type,
+    which the caller would skip anyway, are left out.
+
+    When :data:`MATCH_ORDER` is set, the order of the candidates doesn't depend on the set,
+    so these are taken from :meth:`~graph.base.BaseGraph.edges_of_type`, which only takes time
+    proportional to the amount of edges of that type on backends that index the edges per type.
+    Otherwise the order in which the set pops the candidates depends on how it was built, and
+    the result of the simplifications on that order. To keep this order, the edges of the other
+    type are then removed from the set of all edges, which takes time proportional to the
+    total amount of edges."""
+    if edgelist is None:
+        if edgetype is not None and MATCH_ORDER is not None:
+            edges = g.edges_of_type(edgetype)
+            if matchf != None: return _ordered(set([e for e in edges if matchf(e)]))
+            return _ordered(set(edges))
+        if matchf != None: candidates = set([e for e in g.edges() if matchf(e)])
+        else: candidates = g.edge_set()
+        if edgetype is not None:
+            candidates.difference_update(g.edges_of_type(3 - edgetype))
+        return _ordered(candidates)
+    if matchf != None: return _ordered(set([e for e in edgelist if matchf(e)]))
+    return _ordered(set(edgelist))
+
+def _vertex_candidates(g, vertexf, vertexlist):
+    """Same as :func:`_edge_candidates`, but for vertices."""
+    if vertexlist is None:
+        if vertexf != None: return _ordered(set([v for v in g.vertices() if vertexf(v)]))
+        return _ordered(g.vertex_set())
+    if vertexf != None: return _ordered(set([v for v in vertexlist if vertexf(v)]))
+    return _ordered(set(vertexlist))
+
+
 def match_bialg(g):
     """Does the same as :func:`match_bialg_parallel` but with ``num=1``."""
     types = g.types()
@@ -72,7 +141,7 @@ def match_bialg(g):
 
 
 #TODO: make it be hadamard edge aware
-def match_bialg_parallel(g, matchf=None, num=-1):
+def match_bialg_parallel(g, matchf=None, num=-1, edgelist=None):
     """Finds noninteracting matchings of the bialgebra rule.
     
     :param g: An instance of a ZX-graph.
@@ -81,12 +150,11 @@ def match_bialg_parallel(g, matchf=None, num=-1):
        consider all edges.
     :param num: Maximal amount of matchings to find. If -1 (the default)
        tries to find as many as possible.
-    :param edgelist: List of edges to consider. If -1 (the default), looks 
+    :param edgelist: Collection of edges to consider. If None (the default), looks 
        at all edges.
     :rtype: List of 4-tuples ``(v1, v2, neighbours_of_v1,neighbours_of_v2)``
     """
-    if matchf != None: candidates = set([e for e in g.edges() if matchf(e)])
-    else: candidates = g.edge_set()
+    candidates = _edge_candidates(g, matchf, edgelist)
     types = g.types()
     
     i = 0
@@ -134,7 +202,7 @@ def match_spider(g):
             return [[v0,v1]]
     return []
 
-def match_spider_parallel(g, matchf=None, num=-1):
+def match_spider_parallel(g, matchf=None, num=-1, edgelist=None):
     """Finds non-interacting matchings of the spider fusion rule.
     
     :param g: An instance of a ZX-graph.
@@ -143,10 +211,11 @@ def match_spider_parallel(g, matchf=None, num=-1):
        consider all edges.
     :param num: Maximal amount of matchings to find. If -1 (the default)
        tries to find as many as possible.
+    :param edgelist: Collection of edges to consider. If None (the default), looks 
+       at all edges.
     :rtype: List of 2-tuples ``(v1, v2)``
     """
-    if matchf != None: candidates = set([e for e in g.edges() if matchf(e)])
-    else: candidates = g.edge_set()
+    candidates = _edge_candidates(g, matchf, edgelist, edgetype=1)
     types = g.types()
     
     i = 0
@@ -227,7 +296,7 @@ def match_pivot(g):
     return match_pivot_parallel(g, num=1, check_edge_types=True)
 
 
-def match_pivot_parallel(g, matchf=None, num=-1, check_edge_types=False):
+def match_pivot_parallel(g, matchf=None, num=-1, check_edge_types=False, edgelist=None):
     """Finds non-interacting matchings of the pivot rule.
     
     :param g: An instance of a ZX-graph.
@@ -238,12 +307,14 @@ def match_pivot_parallel(g, matchf=None, num=-1, check_edge_types=False):
     :param matchf: An optional filtering function for candidate edge, should
        return True if a edge should considered as a match. Passing None will
        consider all edges.
+    :param edgelist: Collection of edges to consider. If None (the default), looks 
+       at all edges.
     :rtype: List of 4-tuples. See :func:`pivot` for the details.
     """
-    if matchf != None: candidates = set([e for e in g.edges() if matchf(e)])
-    else: candidates = g.edge_set()
+    candidates = _edge_candidates(g, matchf, edgelist, edgetype=None if check_edge_types else 2)
     types = g.types()
     phases = g.phases()
+    paulis = (0, g.phase_units(1))
     
     i = 0
     m = []
@@ -256,7 +327,7 @@ def match_pivot_parallel(g, matchf=None, num=-1, check_edge_types=False):
 
         v0a = phases[v0]
         v1a = phases[v1]
-        if not ((v0a in (0,1)) and (v1a in (0,1))): continue
+        if not ((v0a in paulis) and (v1a in paulis)): continue
 
         invalid_edge = False
 
@@ -295,15 +366,16 @@ def match_pivot_parallel(g, matchf=None, num=-1, check_edge_types=False):
         m.append([v0,v1,b0,b1])
     return m
 
-def match_pivot_gadget(g, matchf=None, num=-1):
+def match_pivot_gadget(g, matchf=None, num=-1, edgelist=None):
     """Like :func:`match_pivot_parallel`, but except for pairings of
     Pauli vertices, it looks for a pair of an interior Pauli vertex and an
-    interior non-Clifford vertex in order to gadgetize the non-Clifford vertex."""
-    if matchf != None: candidates = set([e for e in g.edges() if matchf(e)])
-    else: candidates = g.edge_set()
+    interior non-Clifford vertex in order to gadgetize the non-Clifford vertex.
+    Only the edges in ``edgelist`` are considered if it is given."""
+    candidates = _edge_candidates(g, matchf, edgelist)
     types = g.types()
     phases = g.phases()
     rs = g.rows()
+    paulis = (0, g.phase_units(1))
     
     edge_list = []
     i = 0
@@ -317,8 +389,8 @@ def match_pivot_gadget(g, matchf=None, num=-1):
         v0a = phases[v0]
         v1a = phases[v1]
         
-        if v0a not in (0,1):
-            if v1a in (0,1):
+        if v0a not in paulis:
+            if v1a in paulis:
                 t = v0
                 v0 = v1
                 v1 = t
@@ -326,7 +398,7 @@ def match_pivot_gadget(g, matchf=None, num=-1):
                 v0a = v1a
                 v1a = t
             else: continue
-        elif v1a in (0,1): continue
+        elif v1a in paulis: continue
         # Now v0 has a Pauli phase and v1 has a non-Pauli phase
         
         v0n = list(g.neighbours(v0))
@@ -364,15 +436,17 @@ def match_pivot_gadget(g, matchf=None, num=-1):
     return m
 
 
-def match_pivot_boundary(g, matchf=None, num=-1):
+def match_pivot_boundary(g, matchf=None, num=-1, vertexlist=None):
     """Like :func:`match_pivot_parallel`, but except for pairings of
     Pauli vertices, it looks for a pair of an interior Pauli vertex and a
-    boundary non-Pauli vertex in order to gadgetize the non-Pauli vertex."""
-    if matchf != None: candidates = set([v for v in g.vertices() if matchf(v)])
-    else: candidates = g.vertex_set()
+    boundary non-Pauli vertex in order to gadgetize the non-Pauli vertex.
+    Only the vertices in ``vertexlist`` are considered as the Pauli vertex if it is given."""
+    candidates = _vertex_candidates(g, matchf, vertexlist)
     types = g.types()
     phases = g.phases()
     rs = g.rows()
+    paulis = (0, g.phase_units(1))
+    cliffords = (g.phase_units(Fraction(1,2)), g.phase_units(Fraction(3,2)))
     
     edge_list = []
     consumed_vertices = set()
@@ -380,7 +454,7 @@ def match_pivot_boundary(g, matchf=None, num=-1):
     m = []
     while (num == -1 or i < num) and len(candidates) > 0:
         v = candidates.pop()
-        if types[v] != 1 or phases[v] not in (0,1): continue
+        if types[v] != 1 or phases[v] not in paulis: continue
 
         good_vert = True
         w = None
@@ -398,7 +472,7 @@ def match_pivot_boundary(g, matchf=None, num=-1):
             boundaries = [b for b in g.neighbours(n) if types[b]==0]
             if len(boundaries) != 1: # n is not on the boundary
                 continue        #, or it is connected to both an input and an output
-            if phases[n] and phases[n].denominator == 2:
+            if phases[n] in cliffords:
                 w = n
                 bound = boundaries[0]
             if not w:
@@ -437,6 +511,7 @@ def pivot(g, matches):
     rem_verts = []
     rem_edges = []
     etab = dict()
+    pi = g.phase_units(1)
     for m in matches:
         # compute:
         #  n[0] <- non-boundary neighbours of m[0] only
@@ -454,7 +529,7 @@ def pivot(g, matches):
               [(s,t) if s < t else (t,s) for s in n[1] for t in n[2]] +
               [(s,t) if s < t else (t,s) for s in n[0] for t in n[2]])
         
-        for v in n[2]: g.add_to_phase(v, 1)
+        for v in n[2]: g.add_to_phase(v, pi)
 
         for i in range(2):
             # if m[i] has a phase, it will get copied on to the neighbours of m[1-i]:
@@ -485,11 +560,35 @@ def pivot(g, matches):
 
     return (etab, rem_verts, rem_edges, True)
 
+def pivot_edge_delta(g, m):
+    """Returns the change in the amount of edges of ``g`` that applying :func:`pivot` 
+    with the single match ``m`` would cause. The edges between the neighbourhoods of the two
+    vertices are complemented, so that pairs that are already connected lose their edge."""
+    n = [set(g.neighbours(m[0])), set(g.neighbours(m[1]))]
+    for i in range(2):
+        n[i].discard(m[1-i])
+        if len(m[i+2]) == 1: n[i].discard(m[i+2][0])
+    n.append(n[0] & n[1])
+    n[0] = n[0] - n[2]
+    n[1] = n[1] - n[2]
+    pairs = len(n[0])*len(n[1]) + len(n[1])*len(n[2]) + len(n[0])*len(n[2])
+    connected = 0
+    for s in n[0]:
+        nb = g.neighbours(s)
+        connected += len(n[1].intersection(nb)) + len(n[2].intersection(nb))
+    for s in n[1]:
+        connected += len(n[2].intersection(g.neighbours(s)))
+    delta = pairs - 2*connected
+    if m[2] and m[3]: return delta
+    if m[2] or m[3]: # Only one vertex is removed, and the boundary edge is moved to the other one
+        return delta - g.vertex_degree(m[0] if m[2] else m[1]) + 1
+    return delta - g.vertex_degree(m[0]) - g.vertex_degree(m[1]) + 1
+
 def match_lcomp(g):
     """Same as :func:`match_lcomp_parallel`, but with ``num=1``"""
     return match_lcomp_parallel(g, num=1, check_edge_types=True)
 
-def match_lcomp_parallel(g, vertexf=None, num=-1, check_edge_types=False):
+def match_lcomp_parallel(g, vertexf=None, num=-1, check_edge_types=False, vertexlist=None):
     """Finds noninteracting matchings of the local complementation rule.
     
     :param g: An instance of a ZX-graph.
@@ -500,12 +599,14 @@ def match_lcomp_parallel(g, vertexf=None, num=-1, check_edge_types=False):
     :param vertexf: An optional filtering function for candidate vertices, should
        return True if a vertex should be considered as a match. Passing None will
        consider all vertices.
+    :param vertexlist: Collection of vertices to consider. If None (the default), looks 
+       at all vertices.
     :rtype: List of 2-tuples ``(vertex, neighbours)``.
     """
-    if vertexf != None: candidates = set([v for v in g.vertices() if vertexf(v)])
-    else: candidates = g.vertex_set()
+    candidates = _vertex_candidates(g, vertexf, vertexlist)
     types = g.types()
     phases = g.phases()
+    cliffords = (g.phase_units(Fraction(1,2)), g.phase_units(Fraction(3,2)))
     
     i = 0
     m = []
@@ -514,7 +615,7 @@ def match_lcomp_parallel(g, vertexf=None, num=-1, check_edge_types=False):
         vt = types[v]
         va = g.phase(v)
         
-        if not (va == Fraction(1,2) or va == Fraction(3,2)): continue
+        if va not in cliffords: continue
 
         if check_edge_types and not (
             all(g.edge_type(e) == 2 for e in g.incident_edges(v))
@@ -547,12 +648,21 @@ def lcomp(g, matches):
 
     return (etab, rem, [], False)
 
+def lcomp_edge_delta(g, m):
+    """Returns the change in the amount of edges of ``g`` that applying :func:`lcomp`
+    with the single match ``m`` would cause. The neighbourhood of the vertex is complemented,
+    and the vertex itself is removed."""
+    vn = set(m[1])
+    d = len(vn)
+    connected = sum(len(vn.intersection(g.neighbours(n))) for n in vn)//2
+    return d*(d-1)//2 - 2*connected - d
+
 
 def match_ids(g):
     """Finds a single identity node. See :func:`match_ids_parallel`."""
     return match_ids_parallel(g, num=1)
 
-def match_ids_parallel(g, vertexf=None, num=-1):
+def match_ids_parallel(g, vertexf=None, num=-1, vertexlist=None):
     """Finds non-interacting identity vertices.
     
     :param g: An instance of a ZX-graph.
@@ -561,10 +671,11 @@ def match_ids_parallel(g, vertexf=None, num=-1):
     :param vertexf: An optional filtering function for candidate vertices, should
        return True if a vertex should be considered as a match. Passing None will
        consider all vertices.
+    :param vertexlist: Collection of vertices to consider. If None (the default), looks 
+       at all vertices.
     :rtype: List of 4-tuples ``(identity_vertex, neighbour1, neighbour2, edge_type)``.
     """
-    if vertexf != None: candidates = set([v for v in g.vertices() if vertexf(v)])
-    else: candidates = g.vertex_set()
+    candidates = _vertex_candidates(g, vertexf, vertexlist)
     types = g.types()
     phases = g.phases()
 
@@ -599,24 +710,119 @@ def remove_ids(g, matches):
     
 
 
-def match_phase_gadgets(g):
+class GadgetIndex(object):
+    """Index of the phase gadgets of a graph, that is kept up to date by telling it which
+    vertices have changed, so that :func:`match_phase_gadgets` and :func:`match_gadgets_phasepoly`
+    don't have to look for the gadgets in the entire graph.
+
+    Every vertex of degree 1 that isn't a boundary vertex is considered a leaf, 
+    whose neighbour is the axel, or hub, of the gadget.
+    For every hub the index stores its leaf and the set of targets of the gadget, i.e. 
+    the other neighbours of the hub, and the hubs are grouped by their (hashed) target set.
+    The phase of a gadget is not stored, but read from the graph when matching, 
+    so that the index doesn't need to know about phase changes of a leaf that keeps its hub.
+
+    :param g: The graph to index.
+
+    Attributes:
+        leaf: Dictionary mapping every hub to its leaf.
+        hub: Dictionary mapping every leaf to its hub.
+        targets: Dictionary mapping every hub to the frozenset of its targets.
+        groups: Dictionary mapping sets of targets to the set of hubs acting on them.
+        pending: Set of target sets whose gadgets changed since they were last matched.
+    """
+    def __init__(self, g):
+        self.leaf = dict()
+        self.hub = dict()
+        self.targets = dict()
+        self.groups = dict()
+        self.pending = set()
+        self.update(g, g.vertices())
+
+    def _remove(self, h):
+        l = self.leaf.pop(h)
+        if self.hub.get(l) == h: del self.hub[l]
+        t = self.targets.pop(h)
+        hubs = self.groups[t]
+        hubs.discard(h)
+        if hubs: self.pending.add(t)
+        else: 
+            del self.groups[t]
+            self.pending.discard(t)
+
+    def _add(self, g, h, l):
+        if h in self.leaf: self._remove(h)
+        t = frozenset(g.neighbours(h))
+        t = t.difference((l,))
+        self.leaf[h] = l
+        self.hub[l] = h
+        self.targets[h] = t
+        if t in self.groups: self.groups[t].add(h)
+        else: self.groups[t] = {h}
+        self.pending.add(t)
+
+    def update(self, g, vertices):
+        """Updates the index after the vertices in ``vertices`` were changed. A vertex is changed 
+        when its phase or edges changed, or when it was added or removed. 
+        The sets of dirty vertices of :func:`simplify.worklist_reduce` are a valid choice."""
+        vs = g.vertices()
+        types = g.types()
+        hubs = set()
+        leaves = set()
+        for v in vertices:
+            if v in self.leaf: hubs.add(v)
+            if v in self.hub: hubs.add(self.hub[v])
+            if v not in vs: continue
+            if g.vertex_degree(v) == 1: leaves.add(v)
+            else: # v might be the hub of a new gadget
+                for n in g.neighbours(v):
+                    if g.vertex_degree(n) == 1: leaves.add(n)
+        for h in hubs: 
+            leaves.add(self.leaf[h])
+            self._remove(h)
+        for l in leaves:
+            if l in vs and g.vertex_degree(l) == 1 and types[l] != 0:
+                h = next(iter(g.neighbours(l)))
+                self._add(g, h, l)
+
+    def gadgets(self):
+        """Iterator over the triples ``(hub, leaf, targets)`` of all the gadgets in the index."""
+        return ((h, l, self.targets[h]) for h,l in self.leaf.items())
+
+def match_phase_gadgets(g, index=None):
     """Determines which phase gadgets act on the same vertices, so that they can be fused together.
     
     :param g: An instance of a ZX-graph.
+    :param index: An optional :class:`GadgetIndex` of ``g``. When it is given, only the groups 
+       of gadgets that changed since the last call are considered, so all the matches
+       need to be applied before it is called again.
     :rtype: List of 5-tuples ``(axel,leaf, total combined phase, other axels with same targets, other leafs)``.
     """
     phases = g.phases()
+    half = g.phase_units(Fraction(1,2))
 
     parities = dict()
     gadgets = dict()
     # First we find all the phase-gadgets, and the list of vertices they act on
-    for v in g.vertices():
-        if phases[v] != 0 and phases[v].denominator > 2 and len(list(g.neighbours(v)))==1:
-            n = list(g.neighbours(v))[0]
-            gadgets[n] = v
-            par = frozenset(set(g.neighbours(n)).difference({v}))
-            if par in parities: parities[par].append(n)
-            else: parities[par] = [n]
+    if index is not None:
+        pending = index.pending if MATCH_ORDER is None else sorted(index.pending, key=sorted)
+        for par in pending:
+            hubs = index.groups[par]
+            for n in (hubs if MATCH_ORDER is None else sorted(hubs)):
+                v = index.leaf[n]
+                if phases[v] % half != 0:
+                    gadgets[n] = v
+                    if par in parities: parities[par].append(n)
+                    else: parities[par] = [n]
+        index.pending = set()
+    else:
+        for v in g.vertices():
+            if phases[v] % half != 0 and len(list(g.neighbours(v)))==1:
+                n = list(g.neighbours(v))[0]
+                gadgets[n] = v
+                par = frozenset(set(g.neighbours(n)).difference({v}))
+                if par in parities: parities[par].append(n)
+                else: parities[par] = [n]
 
     m = []
     for par, gad in parities.items():
@@ -627,7 +833,7 @@ def match_phase_gadgets(g):
                 g.phase_negate(v)
                 m.append((v,n,-phases[v],[],[]))
         else:
-            totphase = sum((1 if phases[n]==0 else -1)*phases[gadgets[n]] for n in gad)%2
+            totphase = sum((1 if phases[n]==0 else -1)*phases[gadgets[n]] for n in gad)%(4*half)
             for n in gad:
                 if phases[n] != 0:
                     g.phase_negate(gadgets[n])
@@ -651,22 +857,26 @@ def merge_phase_gadgets(g, matches):
 
 
 
-def match_gadgets_phasepoly(g):
+def match_gadgets_phasepoly(g, index=None):
     """Finds groups of phase-gadgets that act on the same set of 4 vertices in order to apply a rewrite based on
-    rule R_13 of the paper *A Finite Presentation of CNOT-Dihedral Operators*.""" 
+    rule R_13 of the paper *A Finite Presentation of CNOT-Dihedral Operators*.
+    If a :class:`GadgetIndex` of ``g`` is given, the gadgets are taken from it.""" 
     targets = {}
     gadgets = {}
+    if index is not None: leaves = {v: (n, tgts) for n, v, tgts in index.gadgets()}
     for v in g.vertices():
-        if v not in g.inputs and v not in g.outputs and len(list(g.neighbours(v)))==1:
-            if g.phase(v) != 0 and g.phase(v).denominator != 4: continue
-            n = list(g.neighbours(v))[0]
-            tgts = frozenset(set(g.neighbours(n)).difference({v}))
+        if v not in g.inputs and v not in g.outputs and (v in leaves if index is not None else len(list(g.neighbours(v)))==1):
+            if g.phase(v) != 0 and g.phase_fraction(g.phase(v)).denominator != 4: continue
+            if index is not None: n, tgts = leaves[v]
+            else:
+                n = list(g.neighbours(v))[0]
+                tgts = frozenset(set(g.neighbours(n)).difference({v}))
             if len(tgts)>4: continue
             gadgets[tgts] = (n,v)
             for t in tgts:
                 if t in targets: targets[t].add(tgts)
                 else: targets[t] = {tgts}
-        if g.phase(v) != 0 and g.phase(v).denominator == 4:
+        if g.phase(v) != 0 and g.phase_fraction(g.phase(v)).denominator == 4:
             if v in targets: targets[v].add(frozenset([v]))
             else: targets[v] = {frozenset([v])}
     targets = {t:s for t,s in targets.items() if len(s)>1}
@@ -708,7 +918,7 @@ def apply_gadget_phasepoly(g, matches):
     for group, gadgets in matches:
         for i in range(4):
             v1 = group[i]
-            g.add_to_phase(v1, Fraction(5,4))
+            g.add_to_phase(v1, g.phase_units(Fraction(5,4)))
             
             for j in range(i+1,4):
                 v2 = group[j]
@@ -724,7 +934,7 @@ def apply_gadget_phasepoly(g, matches):
                     v = g.add_vertex(1,-2, rs[v2]+0.5)
                     phase = 0
                     g.add_edges([(n,v),(v1,n),(v2,n)],2)
-                g.set_phase(v, phase + Fraction(3,4))
+                g.set_phase(v, phase + g.phase_units(Fraction(3,4)))
 
                 for k in range(j+1,4):
                     v3 = group[k]
@@ -740,7 +950,7 @@ def apply_gadget_phasepoly(g, matches):
                         v = g.add_vertex(1,-2, rs[v3]+0.5)
                         phase = 0
                         g.add_edges([(n,v),(v1,n),(v2,n),(v3,n)],2)
-                    g.set_phase(v, phase + Fraction(1,4))
+                    g.set_phase(v, phase + g.phase_units(Fraction(1,4)))
         f = frozenset(group)
         if f in gadgets:
             n,v = gadgets[f]
@@ -753,4 +963,4 @@ def apply_gadget_phasepoly(g, matches):
             v = g.add_vertex(1,-2, rs[group[0]]+0.5)
             phase = 0
             g.add_edges([(n,v)]+[(n,w) for w in group],2)
-        g.set_phase(v, phase + Fraction(7,4))
\ No newline at end of file
+        g.set_phase(v, phase + g.phase_units(Fraction(7,4)))
\ No newline at end of file
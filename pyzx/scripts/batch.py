@@ -0,0 +1,95 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+from ..batch import run_batch, batch_sources
+from ..cache import CircuitCache
+
+description="""Optimise many circuits in parallel
+
+To optimise all the circuits in a directory, writing the statistics to results.jsonl, run
+    python -m pyzx batch -o results.jsonl circuits/
+
+Instead of a directory a manifest can be given: a text file listing a circuit file on every line.
+When the output file already exists, the circuits that have a result in it are skipped,
+so that an interrupted batch can be continued by running the same command again.
+The statistics are written as CSV when the output file ends in .csv.
+To also store the optimised circuits and limit the time spent on each circuit, run for instance
+    python -m pyzx batch -o results.csv -d optimised/ --timeout 600 circuits/
+"""
+
+import argparse
+parser = argparse.ArgumentParser(prog="pyzx batch", description=description, formatter_class=argparse.RawTextHelpFormatter)
+parser.add_argument('source',type=str,help='directory of circuits or manifest file')
+parser.add_argument('-o',type=str,help='file to write the results to (.jsonl or .csv)', dest='output',required=True)
+parser.add_argument('-d',type=str,help='directory to write the optimised circuits to', dest='outdir',default='')
+parser.add_argument('-t',type=str,default='match', dest='outformat',
+    help='Specify the output format (qasm, qc, quipper). By default matches the input')
+parser.add_argument('-j',type=int,default=0, dest='nworkers',
+    help='Amount of worker processes. By default the amount of CPUs')
+parser.add_argument('--timeout',type=float,default=None, dest='timeout',
+    help='Maximal amount of seconds to spend on a single circuit')
+parser.add_argument('-g',type=str,default='full', dest='simp', 
+    help='ZX-simplifier to use. Options are full (default), cliff, or tele')
+parser.add_argument('-p',default=False, action='store_true', dest='phasepoly',
+    help='Whether to also run the phase-polynomial optimizer (default is false)')
+parser.add_argument('--restart',default=False, action='store_true', dest='restart',
+    help='Overwrite the output file instead of skipping the circuits it already contains')
+parser.add_argument('--cache',type=str,default='', dest='cache',
+    help='Directory of a cache of optimised circuits, which is used and updated')
+parser.add_argument('--cache-size',type=float,default=None, dest='cache_size',
+    help='Maximal size of the cache in megabytes. By default the cache is unbounded')
+parser.add_argument('-v',default=False, action='store_true', dest='verbose',
+    help='Print the result of every circuit')
+
+def main(args):
+    options = parser.parse_args(args)
+    if not os.path.exists(options.source):
+        print("File {} does not exist".format(options.source))
+        return
+    if options.outformat not in ('match', 'qasm', 'qc', 'quipper'):
+        print("Unsupported circuit type {}. Please use qasm, qc or quipper".format(options.outformat))
+        return
+    if options.simp not in ('full', 'cliff', 'tele'):
+        print("Unknown simplifier {}. Please use full, cliff or tele".format(options.simp))
+        return
+    sources = batch_sources(options.source)
+    cache = None
+    if options.cache:
+        cache = CircuitCache(options.cache, 
+                    max_bytes=None if options.cache_size is None else int(options.cache_size*2**20))
+    def report(r):
+        if r['status'] == 'ok':
+            print("{}: {} -> {} gates, T-count {} -> {}, {} -> {} 2-qubit gates ({:.2f}s)".format(
+                r['source'], r['gates_before'], r['gates_after'], r['tcount_before'], r['tcount_after'],
+                r['twoqubit_before'], r['twoqubit_after'], r['time']) + (" (cached)" if r.get('cached') else ""))
+        elif r['status'] == 'timeout':
+            print("{}: timed out after {:.2f}s".format(r['source'], r['time']))
+        else:
+            print("{}: {}".format(r['source'], r['error']))
+    results = run_batch(sources, options.output, nworkers=options.nworkers or None, 
+                timeout=options.timeout, outdir=options.outdir or None, outformat=options.outformat,
+                simp=options.simp, phasepoly=options.phasepoly, resume=not options.restart,
+                callback=report if options.verbose else None, cache=cache)
+    counts = dict()
+    for r in results: counts[r['status']] = counts.get(r['status'], 0) + 1
+    if cache is not None:
+        print("{} circuits were taken from the cache".format(sum(1 for r in results if r.get('cached'))))
+    print("Optimised {} of {} circuits: {} ok, {} errors, {} timeouts. Results written to {}".format(
+        len(results), len(sources), counts.get('ok',0), counts.get('error',0), counts.get('timeout',0),
+        os.path.abspath(options.output)))
@@ -18,10 +18,8 @@
 import os
 import sys
 
-from ..circuit import Circuit, determine_file_type
-from .. import simplify
-from .. import extract
-from .. import optimize
+from ..circuit import Circuit, determine_file_type, write_circuit
+from ..batch import optimize_circuit
 
 description="""End-to-end circuit optimizer
 
@@ -61,7 +59,7 @@ def main(args):
     else:
         dtype = options.outformat
     if not options.dest:
-        base = os.path.splitext(options)[0]
+        base = os.path.splitext(options.source)[0]
         dest = base + "." + dtype
     else:
         dest = options.dest
@@ -70,31 +68,13 @@ def main(args):
     if options.verbose:
         print("Starting circuit:")
         print(c.to_basic_gates().stats())
-    g = c.to_graph()
-    if options.verbose: print("Running simplification algorithm...")
-    if options.simp == 'tele':
-        g = simplify.teleport_reduce(g,quiet=(not options.verbose))
-        c2 = Circuit.from_graph(g)
-        c2 = c2.split_phase_gates()
-    else:
-        if options.simp == 'full':
-            simplify.full_reduce(g,quiet=(not options.verbose))
-        if options.simp == 'cliff':
-            simplify.clifford_simp(g,quiet=(not options.verbose))
-        if options.verbose: print("Extracting circuit...")
-        c2 = extract.streaming_extract(g)
-    if options.verbose: print("Optimizing...")
-    if options.phasepoly:
-        c3 = optimize.full_optimize(c2.to_basic_gates())
-    else:
-        c3 = optimize.basic_optimization(c2.to_basic_gates())
-    c3 = c3.to_basic_gates()
-    c3 = c3.split_phase_gates()
+    c3 = optimize_circuit(c, options.simp, options.phasepoly, quiet=(not options.verbose))
     if options.verbose: print(c3.stats())
     print("Writing output to {}".format(os.path.abspath(dest)))
-    if dtype == 'qc': output = c3.to_qc()
-    if dtype == 'qasm': output = c3.to_qasm()
-    if dtype == 'quipper': output = c3.to_quipper()
     f = open(dest, 'w')
-    f.write(output)
+    try: write_circuit(f, c3, dtype)
+    except BaseException: # Don't leave an incomplete file behind
+        f.close()
+        os.remove(dest)
+        raise
     f.close()
@@ -30,69 +30,323 @@ except ImportError:
 
 __all__ = ['bialg_simp','spider_simp', 'id_simp', 'phase_free_simp', 'pivot_simp', 
         'pivot_gadget_simp', 'pivot_boundary_simp', 'gadget_simp',
-        'lcomp_simp', 'clifford_simp', 'tcount', 'to_gh', 'to_rg', 'full_reduce', 'teleport_reduce']
+        'lcomp_simp', 'clifford_simp', 'tcount', 'to_gh', 'to_rg', 'full_reduce', 'teleport_reduce',
+        'worklist_reduce', 'RewriteStats', 'RewriteBudget']
+
+import os
+import time
+from fractions import Fraction
+from inspect import signature
+from collections import deque, namedtuple
 
 from .rules import *
 
-def simp(g, name, match, rewrite, matchf=None, quiet=False):
+RewriteRecord = namedtuple('RewriteRecord', ['rule', 'iteration', 'matches', 'match_time', 
+        'rewrite_time', 'edge_table_time', 'vertices_removed', 'edges_removed', 'vertices', 'edges'])
+RewriteRecord.__doc__ = """Statistics of a single round of matching and rewriting done by :func:`simp`.
+The times are in seconds. ``rewrite_time`` includes the removal of vertices and edges, 
+but not the time spent in :meth:`~graph.base.BaseGraph.add_edge_table`, which is given by ``edge_table_time``.
+``vertices_removed`` and ``edges_removed`` are the net decrease of the amount of vertices and edges, 
+and ``vertices`` and ``edges`` the size of the graph afterwards.
+The last round of a rule, which finds no matches, is also recorded."""
+
+class RewriteStats(object):
+    """Collects a :class:`RewriteRecord` for every round of every rule applied during a
+    simplification. Pass an instance as the ``stats`` argument of :func:`full_reduce`,
+    :func:`clifford_simp`, :func:`teleport_reduce` or any of the ``*_simp`` functions.
+    
+    :param callback: Optional function that is called with every new record, 
+       for instance to stream the statistics somewhere else."""
+    def __init__(self, callback=None):
+        self.records = []
+        self.callback = callback
+
+    def add(self, record):
+        self.records.append(record)
+        if self.callback: self.callback(record)
+
+    def summary(self):
+        """Returns a dictionary mapping the name of every rule to a dictionary with the totals
+        of the fields of :class:`RewriteRecord` over all the rounds of that rule, 
+        together with the amount of ``rounds``."""
+        totals = dict()
+        for r in self.records:
+            if r.rule not in totals:
+                totals[r.rule] = {'rounds': 0, 'matches': 0, 'match_time': 0.0, 'rewrite_time': 0.0,
+                    'edge_table_time': 0.0, 'vertices_removed': 0, 'edges_removed': 0}
+            t = totals[r.rule]
+            t['rounds'] += 1
+            for k in ('matches', 'match_time', 'rewrite_time', 'edge_table_time', 
+                    'vertices_removed', 'edges_removed'):
+                t[k] += getattr(r, k)
+        return totals
+
+    def __str__(self):
+        s = "{:<22}{:>8}{:>9}{:>12}{:>12}{:>12}{:>10}{:>10}\n".format("rule", "rounds", "matches",
+                "match (s)", "rewrite (s)", "etab (s)", "-verts", "-edges")
+        for rule, t in sorted(self.summary().items(), key=lambda x: -x[1]['match_time']-x[1]['rewrite_time']):
+            s += "{:<22}{:>8}{:>9}{:>12.3f}{:>12.3f}{:>12.3f}{:>10}{:>10}\n".format(rule, t['rounds'], 
+                t['matches'], t['match_time'], t['rewrite_time'], t['edge_table_time'],
+                t['vertices_removed'], t['edges_removed'])
+        return s
+
+class RewriteBudget(object):
+    """A bound on the amount of work the simplification routines are allowed to do.
+    When passed as the ``budget`` argument of for instance :func:`full_reduce`, the rewriting
+    stops as soon as any of the limits is reached. As each round of rewriting is applied completely,
+    the graph is always left in a consistent state, and routines like :func:`full_reduce`
+    make sure it is graph-like, so that it can still be extracted.
+    Afterwards the budget reports how far the simplification got.
+
+    :param seconds: Wall-clock time in seconds, counted from the creation of the budget.
+    :param iterations: The maximal amount of rounds of rewriting, summed over all the rules.
+    :param rewrites: The maximal amount of individual rewrites, i.e. of matches applied."""
+    def __init__(self, seconds=None, iterations=None, rewrites=None):
+        self.max_seconds = seconds
+        self.max_iterations = iterations
+        self.max_rewrites = rewrites
+        self.start = time.perf_counter()
+        self.iterations = 0
+        self.rewrites = 0
+        self.exhausted = False
+
+    def elapsed(self):
+        """Returns the amount of seconds since the creation of the budget."""
+        return time.perf_counter() - self.start
+
+    def remaining(self):
+        """Returns the amount of rewrites that can still be done, 0 if the budget is exhausted 
+        and None if there is no bound on it."""
+        if not self.exhausted:
+            if ((self.max_seconds is not None and self.elapsed() >= self.max_seconds) or 
+                (self.max_iterations is not None and self.iterations >= self.max_iterations) or
+                (self.max_rewrites is not None and self.rewrites >= self.max_rewrites)):
+                self.exhausted = True
+        if self.exhausted: return 0
+        if self.max_rewrites is None: return None
+        return self.max_rewrites - self.rewrites
+
+    def spend(self, rewrites):
+        """Registers a round of rewriting that applied ``rewrites`` matches."""
+        self.iterations += 1
+        self.rewrites += rewrites
+
+    def __str__(self):
+        return "{} rounds, {} rewrites in {:.3f} seconds{}".format(self.iterations, self.rewrites, 
+                self.elapsed(), " (budget exhausted)" if self.exhausted else "")
+
+def simp(g, name, match, rewrite, matchf=None, quiet=False, incremental=False, nworkers=1, stats=None, budget=None):
     """Helper method for generating simplification strategies based on rules in rules_.
     It keeps matching and rewriting with the given methods until it can no longer do so.
     Example usage: ``simp(g, 'spider_simp', rules.match_spider_parallel, rules.spider)``
 
+    When ``incremental`` is set, only the first round looks for matches in the whole graph.
+    Afterwards a set of dirty vertices is kept, consisting of the vertices touched by the
+    previous rewrite, and only candidates close to these are matched again.
+    This requires ``match`` to support an ``edgelist`` or ``vertexlist`` argument, like 
+    :func:`~rules.match_spider_parallel` or :func:`~rules.match_lcomp_parallel`.
+
     :param g: The graph that needs to be simplified.
     :param str name: The name of this rewrite rule.
     :param match: One of the ``match_*`` functions of rules_.
     :param rewrite: One of the rewrite functions of rules_.
     :param matchf: An optional filtering function on candidate vertices or edges, which
        is passed as the second argument to the match function.
-    :param quiet: Suppress output on numbers of matches found during simplification."""
+    :param quiet: Suppress output on numbers of matches found during simplification.
+    :param incremental: Only rematch around the vertices changed by the previous round.
+    :param nworkers: If larger than 1, the matches are found by this many processes
+       using :func:`simp_parallel`.
+    :param stats: An optional :class:`RewriteStats` instance to which the statistics
+       of every round are added.
+    :param budget: An optional :class:`RewriteBudget`. Rewriting stops when it is exhausted,
+       and the last round is cut short when it would exceed the allowed amount of rewrites."""
+    if nworkers > 1:
+        return simp_parallel(g, name, match, rewrite, matchf=matchf, quiet=quiet, nworkers=nworkers, 
+                stats=stats, budget=budget)
     i = 0
     new_matches = True
+    candidates = None
+    if incremental: edge_rule = 'edgelist' in signature(match).parameters
     while new_matches:
         new_matches = False
-        if matchf != None:
+        if budget is not None:
+            allowed = budget.remaining()
+            if allowed == 0: break
+        if stats is not None: 
+            t0 = time.perf_counter()
+            nv, ne = g.num_vertices(), g.num_edges()
+        if candidates is not None:
+            if edge_rule: m = match(g, matchf, edgelist=candidates)
+            else: m = match(g, matchf, vertexlist=candidates)
+        elif matchf != None:
             m = match(g, matchf)
         else:
             m = match(g)
+        if budget is not None: 
+            m = m[:allowed]
+            if m: budget.spend(len(m))
+        if stats is not None: t1 = time.perf_counter()
         if len(m) > 0:
             i += 1
             if i == 1 and not quiet: print("{}: ".format(name),end='')
             if not quiet: print(len(m), end='')
             #print(len(m), end='', flush=True) #flush only supported on Python >3.3
+            if incremental: dirty = match_neighbourhood(g, m)
             etab, rem_verts, rem_edges, check_isolated_vertices = rewrite(g, m)
+            if incremental:
+                for e in etab: dirty.update(e)
+                for e in rem_edges: dirty.update(g.edge_st(e))
+            if stats is not None: t2 = time.perf_counter()
             g.add_edge_table(etab)
+            if stats is not None: t3 = time.perf_counter()
             g.remove_edges(rem_edges)
             g.remove_vertices(rem_verts)
             if check_isolated_vertices: g.remove_isolated_vertices()
+            if incremental: candidates = dirty_candidates(g, dirty, edge_rule)
             if not quiet: print('. ', end='')
             #print('. ', end='', flush=True)
             new_matches = True
+        elif stats is not None: t2 = t3 = t1
+        if stats is not None:
+            t4 = time.perf_counter()
+            stats.add(RewriteRecord(name, i if m else i+1, len(m), t1-t0, (t2-t1)+(t4-t3), t3-t2,
+                    nv-g.num_vertices(), ne-g.num_edges(), g.num_vertices(), g.num_edges()))
     if not quiet and i>0: print(' {!s} iterations'.format(i))
     return i
 
-def pivot_simp(g, matchf=None, quiet=False):
-    return simp(g, 'pivot_simp', match_pivot_parallel, pivot, matchf=matchf, quiet=quiet)
-
-def pivot_gadget_simp(g, matchf=None, quiet=False):
-    return simp(g, 'pivot_gadget_simp', match_pivot_gadget, pivot, matchf=matchf, quiet=quiet)
-
-def pivot_boundary_simp(g, matchf=None, quiet=False):
-    return simp(g, 'pivot_boundary_simp', match_pivot_boundary, pivot, matchf=matchf, quiet=quiet)
-
-def lcomp_simp(g, matchf=None, quiet=False):
-    return simp(g, 'lcomp_simp', match_lcomp_parallel, lcomp, matchf=matchf, quiet=quiet)
-
-def bialg_simp(g, quiet=False):
-    return simp(g, 'bialg_simp', match_bialg_parallel, bialg, quiet=quiet)
-
-def spider_simp(g, matchf=None, quiet=False):
-    return simp(g, 'spider_simp', match_spider_parallel, spider, matchf=matchf, quiet=quiet)
-
-def id_simp(g, matchf=None, quiet=False):
-    return simp(g, 'id_simp', match_ids_parallel, remove_ids, matchf=matchf, quiet=quiet)
+def scored_simp(g, name, match, rewrite, score, edge_limit, matchf=None, quiet=False, stats=None, budget=None):
+    """Variant of :func:`simp` that doesn't apply all the matches it finds. Instead, the matches 
+    are ranked by ``score``, the change in the amount of edges the rewrite would cause
+    (e.g. :func:`~rules.lcomp_edge_delta`), and applied greedily starting with the lowest.
+    A rewrite that adds edges is only done when the graph stays below ``edge_limit`` edges.
+    Those that would exceed it are not matched again during this call.
+    A match that overlaps with the neighbourhood of a match picked earlier in the same round 
+    is left for the next round, so that the scores of the applied matches add up exactly.
+    The other parameters are as for :func:`simp`."""
+    edge_rule = 'edgelist' in signature(match).parameters
+    rejected = set()
+    if matchf is None: f = lambda x: x not in rejected
+    else: f = lambda x: x not in rejected and matchf(x)
+    i = 0
+    while True:
+        if budget is not None:
+            allowed = budget.remaining()
+            if allowed == 0: break
+        if stats is not None: 
+            t0 = time.perf_counter()
+            nv, ne = g.num_vertices(), g.num_edges()
+        candidates = match(g, f)
+        if not candidates: break
+        scored = sorted(((score(g, c), k) for k, c in enumerate(candidates)))
+        m = []
+        taken = set()
+        edges = g.num_edges()
+        for delta, k in scored:
+            c = candidates[k]
+            if delta > 0 and edges + delta > edge_limit:
+                rejected.add(g.edge(c[0],c[1]) if edge_rule else c[0])
+                continue
+            nb = match_neighbourhood(g, [c])
+            if not taken.isdisjoint(nb): continue
+            taken.update(nb)
+            m.append(c)
+            edges += delta
+        if budget is not None: 
+            m = m[:allowed]
+            if m: budget.spend(len(m))
+        if not m: continue
+        i += 1
+        if i == 1 and not quiet: print("{}: ".format(name),end='')
+        if not quiet: print(len(m), end='')
+        if stats is not None: t1 = time.perf_counter()
+        rewrite_time, etab_time = _apply_matches(g, rewrite, m)
+        if not quiet: print('. ', end='')
+        if stats is not None:
+            stats.add(RewriteRecord(name, i, len(m), t1-t0, rewrite_time, etab_time,
+                    nv-g.num_vertices(), ne-g.num_edges(), g.num_vertices(), g.num_edges()))
+    if not quiet and i>0: print(' {!s} iterations'.format(i))
+    return i
 
-def gadget_simp(g, quiet=False):
-    return simp(g, 'gadget_simp', match_phase_gadgets, merge_phase_gadgets, quiet=quiet)
+def match_neighbourhood(g, matches):
+    """Returns the set of vertices that can be affected by rewriting ``matches``, namely
+    all the vertices appearing in the matches together with their neighbours.
+    Should be called before the rewrite is applied."""
+    vs = set()
+    for m in matches:
+        for x in m:
+            if isinstance(x, (list, tuple, set)): vs.update(x)
+            elif x in g.vertices(): vs.add(x)
+    dirty = set(vs)
+    for v in vs:
+        if v in g.vertices(): dirty.update(g.neighbours(v))
+    return dirty
+
+def dirty_candidates(g, dirty, edges=True, expand=True, vertexf=None, edgetype=None):
+    """Given a set of ``dirty`` vertices that were changed by a rewrite, returns the
+    candidates whose matching status could have changed: the edges incident to a dirty vertex
+    or one of its neighbours when ``edges`` is True, and those vertices themselves otherwise.
+    When ``expand`` is False the neighbours are left out, which suffices for rules that
+    only look at the vertices and edges of the match itself.
+    If ``vertexf`` is given, only the vertices for which it returns True are considered, and for 
+    edges both of their endpoints need to satisfy it. If ``edgetype`` is given, only edges of that 
+    type are returned. These can be used to leave out the candidates a rule would reject anyway."""
+    vertices = g.vertices()
+    near = set()
+    for v in dirty:
+        if v not in vertices: continue
+        near.add(v)
+        if expand: near.update(g.neighbours(v))
+    if vertexf is not None: 
+        near = set(v for v in near if vertexf(v))
+    if not edges: return near
+    if vertexf is None and edgetype is None:
+        cands = set()
+        for v in near: cands.update(g.incident_edges(v))
+        return cands
+    if edgetype is not None and g.num_edges_of_type(edgetype) < len(near):
+        # There are few edges of this type, e.g. regular edges in a graph-like diagram
+        cands = set()
+        for e in g.edges_of_type(edgetype):
+            s, t = g.edge_st(e)
+            if (s in near or t in near) and (vertexf is None or (vertexf(s) and vertexf(t))):
+                cands.add(e)
+        return cands
+    good = dict.fromkeys(near, True) # the vertices already known to satisfy vertexf
+    cands = set()
+    for v in near: 
+        for n in g.neighbours(v):
+            if vertexf is not None:
+                ok = good.get(n)
+                if ok is None: ok = good[n] = vertexf(n)
+                if not ok: continue
+            e = g.edge(v, n)
+            if edgetype is not None and g.edge_type(e) != edgetype: continue
+            cands.add(e)
+    return cands
+
+def pivot_simp(g, matchf=None, quiet=False, incremental=False, nworkers=1, stats=None, budget=None):
+    return simp(g, 'pivot_simp', match_pivot_parallel, pivot, matchf=matchf, quiet=quiet, incremental=incremental, nworkers=nworkers, stats=stats, budget=budget)
+
+def pivot_gadget_simp(g, matchf=None, quiet=False, stats=None, budget=None):
+    return simp(g, 'pivot_gadget_simp', match_pivot_gadget, pivot, matchf=matchf, quiet=quiet, stats=stats, budget=budget)
+
+def pivot_boundary_simp(g, matchf=None, quiet=False, stats=None, budget=None):
+    return simp(g, 'pivot_boundary_simp', match_pivot_boundary, pivot, matchf=matchf, quiet=quiet, stats=stats, budget=budget)
+
+def lcomp_simp(g, matchf=None, quiet=False, incremental=False, nworkers=1, stats=None, budget=None):
+    return simp(g, 'lcomp_simp', match_lcomp_parallel, lcomp, matchf=matchf, quiet=quiet, incremental=incremental, nworkers=nworkers, stats=stats, budget=budget)
+
+def bialg_simp(g, quiet=False, stats=None, budget=None):
+    return simp(g, 'bialg_simp', match_bialg_parallel, bialg, quiet=quiet, stats=stats, budget=budget)
+
+def spider_simp(g, matchf=None, quiet=False, incremental=False, nworkers=1, stats=None, budget=None):
+    return simp(g, 'spider_simp', match_spider_parallel, spider, matchf=matchf, quiet=quiet, incremental=incremental, nworkers=nworkers, stats=stats, budget=budget)
+
+def id_simp(g, matchf=None, quiet=False, incremental=False, nworkers=1, stats=None, budget=None):
+    return simp(g, 'id_simp', match_ids_parallel, remove_ids, matchf=matchf, quiet=quiet, incremental=incremental, nworkers=nworkers, stats=stats, budget=budget)
+
+def gadget_simp(g, quiet=False, stats=None, budget=None):
+    return simp(g, 'gadget_simp', match_phase_gadgets, merge_phase_gadgets, quiet=quiet, stats=stats, budget=budget)
 
 def phase_free_simp(g, quiet=False):
     '''Performs the following set of simplifications on the graph:
@@ -100,50 +354,190 @@ def phase_free_simp(g, quiet=False):
     spider_simp(g, quiet=quiet)
     bialg_simp(g, quiet=quiet)
 
-def interior_clifford_simp(g, quiet=False):
+def interior_clifford_simp(g, quiet=False, nworkers=1, stats=None, budget=None, edge_limit=None):
     """Keeps doing the simplifications ``id_simp``, ``spider_simp``, 
-    ``pivot_simp`` and ``lcomp_simp`` until none of them can be applied anymore."""
-    spider_simp(g, quiet=quiet)
+    ``pivot_simp`` and ``lcomp_simp`` until none of them can be applied anymore.
+    If ``nworkers`` is larger than 1, these are done using :func:`simp_parallel`.
+    If ``stats`` is given, statistics of every rewrite are added to it, see :class:`RewriteStats`.
+    If ``budget`` is given, the simplification stops early when it is exhausted, see :class:`RewriteBudget`.
+    If ``edge_limit`` is given, ``pivot_simp`` and ``lcomp_simp`` are replaced by 
+    :func:`scored_simp`, which skips the rewrites that would make the graph have more edges than that.
+    As identity removal and spider fusion never add edges, the amount of edges then never
+    exceeds ``edge_limit`` (or the amount it started with, if that is larger), but Clifford spiders
+    whose rewrite was skipped are left in the graph."""
+    spider_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
     to_gh(g)
     i = 0
     while True:
-        i1 = id_simp(g, quiet=quiet)
-        i2 = spider_simp(g, quiet=quiet)
-        i3 = pivot_simp(g, quiet=quiet)
-        i4 = lcomp_simp(g, quiet=quiet)
+        i1 = id_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+        i2 = spider_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+        if edge_limit is None:
+            i3 = pivot_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+            i4 = lcomp_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+        else:
+            i3 = scored_simp(g, 'pivot_simp', match_pivot_parallel, pivot, pivot_edge_delta, edge_limit,
+                    quiet=quiet, stats=stats, budget=budget)
+            i4 = scored_simp(g, 'lcomp_simp', match_lcomp_parallel, lcomp, lcomp_edge_delta, edge_limit,
+                    quiet=quiet, stats=stats, budget=budget)
         if i1+i2+i3+i4==0: break
         i += 1
+    _finish_budget(g, budget, quiet, stats)
     return i
 
-def clifford_simp(g, quiet=False):
+def clifford_simp(g, quiet=False, nworkers=1, stats=None, budget=None):
     """Keeps doing rounds of :func:`interior_clifford_simp` and
     :func:`pivot_boundary_simp` until they can't be applied anymore."""
     while True:
-        interior_clifford_simp(g, quiet=quiet)
-        i = pivot_boundary_simp(g, quiet=quiet)
+        interior_clifford_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+        i = pivot_boundary_simp(g, quiet=quiet, stats=stats, budget=budget)
         if i == 0:
             break
+    _finish_budget(g, budget, quiet, stats)
 
+def _finish_budget(g, budget, quiet, stats):
+    """When the budget has run out the graph might not be graph-like, as an identity removal
+    can leave two spiders connected by a regular edge. These are fused, which doesn't take long
+    as it only makes the graph smaller."""
+    if budget is not None and budget.exhausted:
+        spider_simp(g, quiet=quiet, stats=stats)
+        to_gh(g)
 
-def full_reduce(g, quiet=True):
+
+def full_reduce(g, quiet=True, nworkers=1, stats=None, budget=None, growth_target=None):
     """The main simplification routine of PyZX. It uses a combination of :func:`clifford_simp` and
-    the gadgetization strategies :func:`pivot_gadget_simp` and :func:`gadget_simp`."""
-    interior_clifford_simp(g, quiet=quiet)
-    pivot_gadget_simp(g,quiet=quiet)
+    the gadgetization strategies :func:`pivot_gadget_simp` and :func:`gadget_simp`.
+    If ``nworkers`` is larger than 1, the Clifford simplifications are done in parallel by
+    that many processes, see :func:`simp_parallel`. This needs the ``'fork'`` start method 
+    of :mod:`multiprocessing` and more than one CPU, otherwise they are done sequentially.
+    If ``stats`` is given, statistics of every rewrite are added to it, see :class:`RewriteStats`.
+    If ``budget`` is given, the simplification stops when it is exhausted, leaving a graph-like
+    diagram that can still be extracted, see :class:`RewriteBudget`.
+
+    ``growth_target`` changes the order in which the Clifford rewrites are done, not which ones are 
+    done. If it is given, the first round of Clifford simplifications selects its pivots 
+    and local complementations with :func:`scored_simp`, doing those that keep the amount of edges
+    below ``1 + growth_target`` times that of the graph after the initial spider fusion first
+    (a negative value asks for a sparser graph). The rewrites that were skipped are still 
+    done afterwards, without a limit, as the gadgetization rules and :func:`~extract.streaming_extract` 
+    rely on the Clifford spiders being gone. So this doesn't bound the amount of edges, but doing 
+    the cheapest rewrites first tends to give a sparser graph. For a hard bound on the amount of edges, 
+    use :func:`interior_clifford_simp` with ``edge_limit``, which leaves the graph unextractable 
+    for :func:`~extract.streaming_extract` when it has to skip rewrites."""
+    edge_limit = None
+    if growth_target is not None:
+        spider_simp(g, quiet=quiet, stats=stats, budget=budget)
+        to_gh(g)
+        edge_limit = int(g.num_edges()*(1+growth_target))
+    interior_clifford_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget, edge_limit=edge_limit)
+    if edge_limit is not None: 
+        interior_clifford_simp(g, quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+    pivot_gadget_simp(g,quiet=quiet, stats=stats, budget=budget)
     while True:
-        clifford_simp(g,quiet=quiet)
-        i = gadget_simp(g, quiet=quiet)
-        interior_clifford_simp(g,quiet=quiet)
-        j = pivot_gadget_simp(g,quiet=quiet)
+        clifford_simp(g,quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+        i = gadget_simp(g, quiet=quiet, stats=stats, budget=budget)
+        interior_clifford_simp(g,quiet=quiet, nworkers=nworkers, stats=stats, budget=budget)
+        j = pivot_gadget_simp(g,quiet=quiet, stats=stats, budget=budget)
         if i+j == 0:
             break
+    _finish_budget(g, budget, quiet, stats)
+
+def worklist_reduce(g, quiet=True, stats=None, budget=None):
+    """Event-driven version of :func:`full_reduce`, using the same rules. Instead of repeatedly
+    sweeping the whole graph with every rule, it keeps a worklist of dirty vertices per rule.
+    A rule only looks for matches close to its dirty vertices, see :func:`dirty_candidates`,
+    and the vertices changed by a rewrite are added to the worklists of all the rules. 
+    At every step the first rule in the order ``id_simp``, ``spider_simp``, ``pivot_simp``, 
+    ``lcomp_simp``, ``pivot_boundary_simp``, ``gadget_simp``, ``pivot_gadget_simp``
+    that has a nonempty worklist is applied, so that as in :func:`full_reduce` 
+    the gadgetization rules are only tried once the Clifford simplifications are done.
+    The simplification ends when all the worklists are empty.
+
+    Every rule looks at the whole graph only once, in its first round.
+    The dirty vertices include all the vertices of a match and their neighbours, and the
+    vertices whose edges changed. For most rules it then suffices to look at the dirty vertices 
+    and the edges incident to them, but ``pivot_boundary_simp`` and ``pivot_gadget_simp`` also
+    depend on the degrees of the neighbours of the match, so for those the dirty vertices are 
+    first extended with their neighbours. The candidates are further restricted to the vertices 
+    and edges of the right type and phase, e.g. for ``pivot_simp`` to the Hadamard edges between 
+    two Pauli spiders. For ``gadget_simp`` a :class:`~rules.GadgetIndex` is kept up to date 
+    with the dirty vertices, so that only the gadgets that changed are looked at.
+    The parameters ``stats`` and ``budget`` are as for :func:`full_reduce`.
+    Returns the amount of rounds of rewriting."""
+    spider_simp(g, quiet=quiet, incremental=True, stats=stats, budget=budget)
+    to_gh(g)
+    index = GadgetIndex(g)
+    types, phases = g.types(), g.phases()
+    paulis = (0, g.phase_units(1))
+    cliffords = (g.phase_units(Fraction(1,2)), g.phase_units(Fraction(3,2)))
+    def zero(v): return phases[v] == 0
+    def pauli(v): return types[v] == 1 and phases[v] in paulis
+    def clifford(v): return phases[v] in cliffords
+    # pivot_boundary_simp needs a Pauli vertex with a neighbour that is connected to a boundary,
+    # and pivot_gadget_simp two interior spiders that aren't phase gadgets
+    boundary = [v for v in g.vertices() if types[v] == 0]
+    near_boundary = set()
+    def boundary_pauli(v): return pauli(v) and not near_boundary.isdisjoint(g.neighbours(v))
+    def interior(v): return types[v] == 1 and v not in near_boundary and g.vertex_degree(v) > 1
+    def match_gadgets(g): return match_phase_gadgets(g, index)
+    # For every rule: its name, match and rewrite functions, whether the match function takes
+    # an edgelist (True), a vertexlist (False) or uses the gadget index (None), whether the dirty 
+    # vertices are extended with their neighbours, and the filters passed to dirty_candidates.
+    rules = [('id_simp', match_ids_parallel, remove_ids, False, False, zero, None),
+             ('spider_simp', match_spider_parallel, spider, True, False, None, 1),
+             ('pivot_simp', match_pivot_parallel, pivot, True, False, pauli, 2),
+             ('lcomp_simp', match_lcomp_parallel, lcomp, False, False, clifford, None),
+             ('pivot_boundary_simp', match_pivot_boundary, pivot, False, True, boundary_pauli, None),
+             ('gadget_simp', match_gadgets, merge_phase_gadgets, None, True, None, None),
+             ('pivot_gadget_simp', match_pivot_gadget, pivot, True, True, interior, None)]
+    dirty = [None]*len(rules) # None means that the entire graph needs to be looked at
+    i = 0
+    while True:
+        k = next((k for k in range(len(rules)) if dirty[k] is None or dirty[k]), None)
+        if k is None: break
+        if budget is not None:
+            allowed = budget.remaining()
+            if allowed == 0: break
+        name, match, rewrite, edge_rule, expand, vertexf, edgetype = rules[k]
+        if stats is not None: 
+            t0 = time.perf_counter()
+            nv, ne = g.num_vertices(), g.num_edges()
+        types, phases = g.types(), g.phases()
+        if vertexf is boundary_pauli or vertexf is interior: 
+            near_boundary = set(n for b in boundary if b in g.vertices() for n in g.neighbours(b))
+        if dirty[k] is None or edge_rule is None: 
+            m = match(g)
+        elif edge_rule: 
+            m = match(g, edgelist=dirty_candidates(g, dirty[k], True, expand, vertexf, edgetype))
+        else: 
+            m = match(g, vertexlist=dirty_candidates(g, dirty[k], False, expand, vertexf))
+        dirty[k] = set()
+        if budget is not None: 
+            m = m[:allowed]
+            if m: budget.spend(len(m))
+        if stats is not None: t1 = time.perf_counter()
+        if not m: continue
+        i += 1
+        if not quiet: print("{}: {}".format(name, len(m)))
+        touched = match_neighbourhood(g, m)
+        rewrite_time, etab_time = _apply_matches(g, rewrite, m, touched)
+        index.update(g, touched)
+        for d in dirty:
+            if d is not None: d.update(touched)
+        if stats is not None:
+            stats.add(RewriteRecord(name, i, len(m), t1-t0, rewrite_time, etab_time,
+                    nv-g.num_vertices(), ne-g.num_edges(), g.num_vertices(), g.num_edges()))
+    _finish_budget(g, budget, quiet, stats)
+    return i
 
-def teleport_reduce(g, quiet=True):
+def teleport_reduce(g, quiet=True, stats=None, budget=None):
     """This simplification procedure runs :func:`full_reduce` in a way 
     that does not change the graph structure of the resulting diagram.
-    The only thing that is different in the output graph are the location and value of the phases.""" 
+    The only thing that is different in the output graph are the location and value of the phases.
+    If ``stats`` is given, statistics of every rewrite are added to it, see :class:`RewriteStats`.
+    If ``budget`` is given, the phases found to be fusable until it is exhausted are fused, 
+    see :class:`RewriteBudget`.""" 
     s = Simplifier(g)
-    s.full_reduce(quiet)
+    s.full_reduce(quiet, stats=stats, budget=budget)
     return s.mastergraph
 
 
@@ -162,8 +556,8 @@ class Simplifier(object):
             v2 = self.mastergraph.vertex_from_phase_index(i2)
         except ValueError: return
         #self.mastergraph.phase_index[v2] = i1
-        p1 = self.mastergraph.phase(v1)
-        p2 = self.mastergraph.phase(v2)
+        p1 = self.mastergraph.phase_fraction(self.mastergraph.phase(v1))
+        p2 = self.mastergraph.phase_fraction(self.mastergraph.phase(v2))
         m1 = self.simplifygraph.phase_mult[i1]
         m2 = self.simplifygraph.phase_mult[i2]
         if (p2 == 0 or p2.denominator <= 2): # Deleted vertex contains Clifford phase
@@ -171,13 +565,13 @@ class Simplifier(object):
                 v3,i3 = self.phantom_phases[v2]
                 m2 = m2*self.simplifygraph.phase_mult[i3]
                 v2,i2 = v3,i3
-                p2 = self.mastergraph.phase(v2)
+                p2 = self.mastergraph.phase_fraction(self.mastergraph.phase(v2))
             else: return
         if (p1 == 0 or p1.denominator <= 2): # Need to save non-Clifford location
             if v1 in self.phantom_phases: # Already fused with non-Clifford before
                 v3,i3 = self.phantom_phases[v1]
                 self.mastergraph.phase_index[v3] = i1
-                p1 = self.mastergraph.phase(v3)
+                p1 = self.mastergraph.phase_fraction(self.mastergraph.phase(v3))
                 if (p1+p2).denominator <= 2:
                     del self.phantom_phases[v1]
                 v1,i1 = v3,i3
@@ -189,13 +583,13 @@ class Simplifier(object):
         # Both have non-Clifford phase
         if m1*m2 == 1: phase = (p1 + p2)%2
         else: phase = p1 - p2
-        self.mastergraph.set_phase(v1,phase)
+        self.mastergraph.set_phase(v1,self.mastergraph.phase_units(phase))
         self.mastergraph.set_phase(v2,0)
         self.simplifygraph.phase_mult[i1] = 1
         self.simplifygraph.phase_mult[i2] = 1
     
-    def full_reduce(self, quiet=True):
-        full_reduce(self.simplifygraph,quiet=quiet)
+    def full_reduce(self, quiet=True, stats=None, budget=None):
+        full_reduce(self.simplifygraph,quiet=quiet, stats=stats, budget=budget)
 
 
 
@@ -239,8 +633,9 @@ def tcount(g):
         return g.tcount()
     count = 0
     phases = g.phases()
+    half = g.phase_units(Fraction(1,2))
     for v in g.vertices():
-        if phases[v]!=0 and phases[v].denominator > 2:
+        if phases[v] % half != 0:
             count += 1
     return count
 
@@ -437,142 +832,210 @@ def clifford_iter(g):
 
 
 
-def _worker(arg):
-    match, rewrite, g, kwargname, kwarg = arg
-    m =  match(g, **{kwargname:kwarg})
-    if m: return (len(m),rewrite(g, m))
-    return None
-
-def simp_threaded(g, name, match, rewrite, uses_verts=False,safe=False,skip_unthreaded_pass=False):
-    """Version of :func:`simp` that uses :mod:`multiprocessing`."""
-    nthreads = 5
-    i = 0
-    new_matches = True
-    sep = int(g.vindex / nthreads) + 1 #TODO: currently only works on graph_s
-    pool = mp.Pool(processes=nthreads)
-    #Threaded pass
-    print("Starting {} with {} threads".format(name,str(nthreads)))
-    while new_matches:
-        new_matches = False
-        if uses_verts:
-            chunks = [set(g.vertices_in_range(j*sep,(j+1)*sep)) for j in range(nthreads)]
-            for j in range(nthreads-1):
-                if chunks[j] & chunks[j+1]:
-                    raise Exception("overlapping chunks")
-            results = pool.map(_worker, ((match, rewrite, g, "vertexlist", chunks[j]) for j in range(nthreads)),
-                                        #set(g.vertices_in_range(j*sep,(j+1)*sep))) for j in range(nthreads)),
-                                chunksize=1)
-        else:
-            chunks = [set(g.edges_in_range(j*sep,(j+1)*sep,safe)) for j in range(nthreads)]
-            for j in range(nthreads-1):
-                if chunks[j] & chunks[j+1]:
-                    raise Exception("overlapping chunks")
-            results = pool.map(_worker, ((match, rewrite, g, "edgelist", chunks[j]) for j in range(nthreads)),
-                                        #set(g.edges_in_range(j*sep,(j+1)*sep,safe))) for j in range(nthreads)),
-                                chunksize=1)
-
-        check_isolated_vertices = False
-        for j,r in enumerate(results):
-            if not r: continue
-            new_matches = True
-            amount, (etab, rem_verts, rem_edges, check) = r
-            print(amount, end=',')
-            if uses_verts and not chunks[j].issuperset(set(rem_verts)):
-                raise Exception("Deleting vertices outside of chunk: ", chunks[j], set(rem_verts))
-            else:
-                for v in rem_verts:
-                    if not (j*sep<v<(j+1)*sep):
-                        raise Exception("Deleting vertices outside of chunk")
-            g.add_edge_table(etab)
-            g.remove_edges(rem_edges)
-            g.remove_vertices(rem_verts)
-            check_isolated_vertices = check
-        if check_isolated_vertices: g.remove_isolated_vertices() 
-        if new_matches: i += 1
-        print('. ', end='')
-    pool.close()
-    #Unthreaded pass
-    if not skip_unthreaded_pass:
-        new_matches = True
-        if i!=0: print("\nUnthreaded pass: ", end='')
-        else: print("Unthreaded pass: ", end='') 
-        while new_matches:
-            new_matches = False
-            m = match(g)
-            if len(m) > 0:
-                print(len(m), end='')
-                etab, rem_verts, rem_edges, check_isolated_vertices = rewrite(g, m)
-                g.add_edge_table(etab)
-                g.remove_edges(rem_edges)
-                g.remove_vertices(rem_verts)
-                if check_isolated_vertices: g.remove_isolated_vertices()
-                print('. ', end='')
-                new_matches = True
-            if new_matches: i += 1
-    if i!=0:  print('\nDid ' + str(i) + ' nonzero iterations')
-    else: print('Did ' + str(i) + ' nonzero iterations')
-
-
-def pivot_threaded(g):
-    return simp_threaded(g, 'pivot_simp', match_pivot_parallel, pivot, uses_verts=False,safe=True)
-
-def lcomp_threaded_old(g):
-    simp_threaded(g, 'lcomp_simp', match_lcomp_parallel, lcomp, uses_verts=True)
-
-def lcomp_threaded(g):
-    simp_threaded(g, 'lcomp_simp', match_lcomp_parallel, lcomp, uses_verts=True,skip_unthreaded_pass=True)
-    print("Full pass: ",end='')
-    nthreads = 5
-    pool = mp.Pool(processes=nthreads)
-    i = 0
-    new_matches = True
-    while new_matches:
-        i += 1
-        new_matches = False
-        matches = match_lcomp_parallel(g)
-        if len(matches) > 0:
-            print(len(matches), end='')
-            vs, ns = [], []
-            for v, neighbours in matches:
-                a = g.phase(v)
-                for v2 in neighbours: g.add_to_phase(v2, -a)
-                vs.append(v)
-                ns.append(neighbours)
-            for etab in pool.map(_lcomp_do, (ns[i:i + 10] for i in range(0, len(ns), 10))):
-                g.add_edge_table(etab)
-            g.remove_vertices(vs)
-            print('. ', end='')
-            new_matches = True
-    pool.close()
-    print('\nfinished in ' + str(i) + ' iterations')
-
-def _lcomp_do(matches):
-    etab = dict()
-    for neighbours in matches:
-        for i in range(len(neighbours)):
-            for j in range(i+1, len(neighbours)):
-                e = (neighbours[i],neighbours[j])
-                if (e[0] > e[1]): e = (e[1],e[0])
-                if e not in etab: etab[e] = [0,1]
-                else: etab[e][1] += 1
-
-    return etab
-
-def bialg_threaded(g):
-    return simp_threaded(g, 'bialg_simp', match_bialg_parallel, bialg, uses_verts=False)
+PARALLEL_MIN_VERTICES = 2000
+"""Graphs with fewer vertices than this are simplified sequentially by :func:`simp_parallel`,
+as the cost of starting the worker processes would outweigh the gain."""
 
-def spider_threaded(g):
-    return simp_threaded(g, 'spider_simp', match_spider_parallel, spider, uses_verts=False)
+def available_cpus():
+    """Returns the amount of CPUs the current process is allowed to run on.
+    :func:`simp_parallel` doesn't start more worker processes than this."""
+    try: return len(os.sched_getaffinity(0))
+    except AttributeError: return mp.cpu_count()
 
-def id_threaded(g):
-    return simp_threaded(g, 'id_simp', match_ids_parallel, remove_ids, uses_verts=True)
-
-def clifford_threaded(g):
-    spider_threaded(g)
-    to_gh(g)
-    lcomp_threaded(g)
-    pivot_threaded(g)
-    to_rg(g)
-    id_threaded(g)
+def partition_graph(g, nparts):
+    """Partitions the vertices of ``g`` into ``nparts`` regions of roughly equal size,
+    such that few edges run between different regions.
+    The regions are grown one at a time breadth-first from an unassigned vertex of minimal index,
+    after which a refinement pass moves every vertex on a region boundary to the neighbouring
+    region it has the most edges to, as long as this keeps the regions balanced.
+    The result only depends on the structure of the graph, so it is deterministic.
 
+    :param g: A ZX-graph.
+    :param int nparts: The amount of regions.
+    :rtype: Dictionary mapping every vertex to the index of its region."""
+    verts = sorted(g.vertices())
+    size = len(verts) // nparts + 1
+    region = dict()
+    sizes = [0]*nparts
+    unassigned = iter(verts)
+    for r in range(nparts):
+        queue = deque()
+        while sizes[r] < size:
+            if not queue:
+                v = next((v for v in unassigned if v not in region), None)
+                if v is None: break
+                region[v] = r
+                sizes[r] += 1
+                queue.append(v)
+            v = queue.popleft()
+            for w in sorted(g.neighbours(v)):
+                if w in region or sizes[r] >= size: continue
+                region[w] = r
+                sizes[r] += 1
+                queue.append(w)
+    for v in verts: # regions can end up slightly too small, the remainder goes to the last one
+        if v not in region:
+            region[v] = nparts - 1
+            sizes[nparts-1] += 1
+
+    lower, upper = int(0.9*size), int(1.1*size) + 1
+    for v in verts:
+        r = region[v]
+        if sizes[r] <= lower: continue
+        counts = [0]*nparts
+        for w in g.neighbours(v): counts[region[w]] += 1
+        best = max(range(nparts), key=lambda s: (counts[s], s == r))
+        if best != r and counts[best] > counts[r] and sizes[best] < upper:
+            region[v] = best
+            sizes[r] -= 1
+            sizes[best] += 1
+    return region
+
+def _region_candidates(g, region, r, nparts, edges):
+    """Returns the vertices of region ``r``, or the edges owned by it if ``edges`` is True.
+    Vertices created after the partitioning are distributed according to their index, 
+    and an edge is owned by the region of lowest index among those of its endpoints."""
+    owner = lambda v: region.get(v, v % nparts)
+    vs = [v for v in g.vertices() if owner(v) == r]
+    if not edges: return vs
+    es = set()
+    for v in vs:
+        for e in g.incident_edges(v):
+            s,t = g.edge_st(e)
+            if owner(s) >= r and owner(t) >= r: es.add(e)
+    return es
+
+def _apply_matches(g, rewrite, m, dirty=None):
+    """Rewrites the graph with the matches ``m``. Returns the time spent in 
+    :meth:`~graph.base.BaseGraph.add_edge_table` and the rest of the time spent.
+    If the set ``dirty`` is given, the endpoints of the changed edges are added to it."""
+    t0 = time.perf_counter()
+    etab, rem_verts, rem_edges, check_isolated_vertices = rewrite(g, m)
+    if dirty is not None:
+        for e in etab: dirty.update(e)
+        for e in rem_edges: dirty.update(g.edge_st(e))
+    t1 = time.perf_counter()
+    g.add_edge_table(etab)
+    t2 = time.perf_counter()
+    g.remove_edges(rem_edges)
+    g.remove_vertices(rem_verts)
+    if check_isolated_vertices: g.remove_isolated_vertices()
+    return (t1-t0) + (time.perf_counter()-t2), t2-t1
+
+def _region_worker(conn, g, match, rewrite, matchf, region, r, nparts, edge_rule):
+    """Loop run by each of the worker processes of :func:`simp_parallel`. 
+    The worker owns a copy of ``g``, inherited from the parent process when it is forked.
+    It receives the matches that were accepted in the previous round, applies them to keep its
+    copy in sync with the parent, and sends back the matches it finds in its own region."""
+    try:
+        while True:
+            m = conn.recv()
+            if m is None: break
+            if m: _apply_matches(g, rewrite, m)
+            cands = _region_candidates(g, region, r, nparts, edge_rule)
+            if edge_rule: m = match(g, matchf, edgelist=cands)
+            else: m = match(g, matchf, vertexlist=cands)
+            conn.send((m, g.num_vertices(), g.num_edges()))
+    finally:
+        conn.close()
+
+def merge_region_matches(g, region_matches):
+    """Merges the lists of matches found in the different regions by :func:`simp_parallel`.
+    The matches within one region do not interact, but matches of different regions might
+    if they lie close to the boundary. The regions are therefore visited in order, and a match is
+    only accepted when none of its vertices or their neighbours is used by an accepted
+    match of another region. Rejected matches are found again in a later round."""
+    used = dict()
+    accepted = []
+    for r, matches in enumerate(region_matches):
+        for m in matches:
+            vs = match_neighbourhood(g, [m])
+            if any(used.get(v, r) != r for v in vs): continue
+            for v in vs: used[v] = r
+            accepted.append(m)
+    return accepted
+
+def simp_parallel(g, name, match, rewrite, matchf=None, quiet=False, nworkers=4, stats=None, budget=None):
+    """Version of :func:`simp` that finds matches using several processes.
+    The graph is split into ``nworkers`` regions with :func:`partition_graph`, and every
+    worker process looks for matches in its own region. The workers are forked from the current
+    process, so that they start out with a copy of the graph without it having to be pickled.
+    In each round the matches are merged with :func:`merge_region_matches` and applied to the graph, 
+    and only the accepted matches are sent to the workers, which apply them to their own copy.
+    As in :func:`simp`, rewriting continues until no more matches are found, so the result
+    is again a fixpoint of the rule. 
+
+    Only the matching is divided over the workers: every accepted match is applied both by
+    the main process and by every worker, at the same time. The speedup is therefore at most
+    that of the matching, and only when the workers run on different CPUs. 
+    ``benchmark_parallel.py`` measures it, together with the share of time spent matching.
+
+    This requires the ``'fork'`` start method of :mod:`multiprocessing`, which is available
+    on Linux and macOS but not on Windows, and ``match`` has to support an ``edgelist`` or
+    ``vertexlist`` argument. At most :func:`available_cpus` workers are started.
+    If there are fewer than two, if the graph has fewer than :data:`PARALLEL_MIN_VERTICES` vertices,
+    or if one of the requirements isn't met, this just calls :func:`simp`.
+
+    :param nworkers: The maximal amount of worker processes.
+    The other parameters are the same as for :func:`simp`. In the statistics added to ``stats``,
+    the match time of a round is the time spent waiting for the workers and merging their matches."""
+    params = signature(match).parameters
+    nworkers = min(nworkers, available_cpus())
+    if (nworkers < 2 or g.num_vertices() < PARALLEL_MIN_VERTICES or 
+            not ('edgelist' in params or 'vertexlist' in params) or
+            'fork' not in mp.get_all_start_methods()):
+        return simp(g, name, match, rewrite, matchf=matchf, quiet=quiet, stats=stats, budget=budget)
+    edge_rule = 'edgelist' in params
+    region = partition_graph(g, nworkers)
+    ctx = mp.get_context('fork')
+    conns, procs = [], []
+    for r in range(nworkers):
+        parent_conn, child_conn = ctx.Pipe()
+        p = ctx.Process(target=_region_worker, 
+                args=(child_conn, g, match, rewrite, matchf, region, r, nworkers, edge_rule))
+        p.daemon = True
+        p.start()
+        child_conn.close()
+        conns.append(parent_conn)
+        procs.append(p)
 
+    i = 0
+    m = []
+    try:
+        while True:
+            for conn in conns: conn.send(m)
+            if m: # this overlaps with the workers doing the same
+                nv, ne = g.num_vertices(), g.num_edges()
+                rewrite_time, etab_time = _apply_matches(g, rewrite, m) 
+                if stats is not None:
+                    stats.add(RewriteRecord(name, i, len(m), match_time, rewrite_time, etab_time, 
+                        nv-g.num_vertices(), ne-g.num_edges(), g.num_vertices(), g.num_edges()))
+            t = time.perf_counter()
+            region_matches = []
+            for conn in conns:
+                rm, nv, ne = conn.recv()
+                if nv != g.num_vertices() or ne != g.num_edges():
+                    raise Exception("Graph of worker process is out of sync")
+                region_matches.append(rm)
+            m = merge_region_matches(g, region_matches)
+            if budget is not None:
+                m = m[:budget.remaining()]
+                if m: budget.spend(len(m))
+            match_time = time.perf_counter() - t
+            if not m: 
+                if stats is not None:
+                    stats.add(RewriteRecord(name, i+1, 0, match_time, 0.0, 0.0, 0, 0, 
+                        g.num_vertices(), g.num_edges()))
+                break
+            i += 1
+            if i == 1 and not quiet: print("{}: ".format(name),end='')
+            if not quiet: print(len(m), end='')
+            if not quiet: print('. ', end='')
+    finally:
+        for conn in conns: 
+            try: conn.send(None)
+            except (OSError, EOFError): pass
+            conn.close()
+        for p in procs: p.join()
+    if not quiet and i>0: print(' {!s} iterations'.format(i))
+    return i
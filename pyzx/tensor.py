@@ -88,7 +88,7 @@ def tensorfy(g):
                 d += 1
                 t = id2
             else:
-                phase = pi*phases[v]
+                phase = pi*g.phase_fraction(phases[v])
                 t = Z_to_tensor(d,phase) if types[v] == 1 else X_to_tensor(d,phase)
             nn = list(filter(lambda n: rows[n]<r or (rows[n]==r and n<v), neigh))
             ety = {n:g.edge_type(g.edge(v,n)) for n in nn}
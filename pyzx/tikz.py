@@ -45,7 +45,7 @@ def to_tikz(g, xoffset=0, yoffset=0, idoffset=0, full_output=True):
     verts = []
     maxindex = idoffset
     for v in g.vertices():
-        phase = g.phase(v)
+        phase = g.phase_fraction(g.phase(v))
         ty = g.type(v)
         if ty == 0:
             style = "none"
@@ -0,0 +1,129 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+import random
+import os
+import sys
+import shutil
+import tempfile
+from fractions import Fraction
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.generate import CNOT_HAD_PHASE_circuit
+from pyzx.circuit import Circuit
+from pyzx.batch import run_batch, read_results, batch_sources, optimize_file, optimize_circuit
+from pyzx.cache import CircuitCache
+
+SEED = 1337
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+        self.dir = tempfile.mkdtemp()
+        self.indir = os.path.join(self.dir, 'in')
+        os.mkdir(self.indir)
+        for i in range(3):
+            c = CNOT_HAD_PHASE_circuit(4, 40, 0.2, 0.2)
+            with open(os.path.join(self.indir, 'c{}.qasm'.format(i)), 'w') as f:
+                f.write(c.to_qasm())
+        with open(os.path.join(self.indir, 'bad.qasm'), 'w') as f:
+            f.write('not a circuit')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_run_batch(self):
+        for ext in ('jsonl', 'csv'):
+            with self.subTest(ext=ext):
+                output = os.path.join(self.dir, 'results.' + ext)
+                outdir = os.path.join(self.dir, 'out')
+                results = run_batch(self.indir, output, nworkers=2, outdir=outdir)
+                self.assertEqual(len(results), 4)
+                status = {os.path.basename(r['source']): r['status'] for r in read_results(output)}
+                self.assertEqual(status, {'c0.qasm': 'ok', 'c1.qasm': 'ok', 'c2.qasm': 'ok', 'bad.qasm': 'error'})
+                self.assertEqual(sorted(os.listdir(outdir)), ['c0.qasm', 'c1.qasm', 'c2.qasm'])
+                c = Circuit.load(os.path.join(outdir, 'c0.qasm'))
+                self.assertEqual(c.qubits, 4)
+                # Everything is done already
+                self.assertEqual(run_batch(self.indir, output, nworkers=2), [])
+
+    def test_optimize_file(self):
+        # The result should be the same as that of 'python -m pyzx opt', which optimises the loaded circuit
+        c = CNOT_HAD_PHASE_circuit(4, 40, 0.2, 0.2)
+        for q in range(3): c.add_gate("TOF", q, (q+1)%4, (q+2)%4)
+        source = os.path.join(self.dir, 'tof.qasm')
+        dest = os.path.join(self.dir, 'tof_opt.qasm')
+        with open(source, 'w') as f:
+            f.write(c.to_qasm())
+        r = optimize_file(source, dest)
+        with open(dest) as f:
+            self.assertEqual(f.read(), optimize_circuit(Circuit.load(source)).to_qasm())
+        b = Circuit.load(source).to_basic_gates()
+        self.assertEqual(r['gates_before'], len(b.gates))
+        self.assertEqual(r['tcount_before'], b.tcount())
+
+    def test_optimize_file_failure(self):
+        # A phase of 1/3 can't be written to a .qc file, which shouldn't leave an incomplete file behind
+        c = Circuit(2)
+        c.add_gate("CNOT", 0, 1)
+        c.add_gate("ZPhase", 1, phase=Fraction(1,3))
+        source = os.path.join(self.dir, 'third.qasm')
+        dest = os.path.join(self.dir, 'third.qc')
+        with open(source, 'w') as f:
+            f.write(c.to_qasm())
+        with self.assertRaises(Exception):
+            optimize_file(source, dest, outformat='qc')
+        self.assertFalse(os.path.exists(dest))
+
+    def test_resume(self):
+        output = os.path.join(self.dir, 'results.jsonl')
+        run_batch(batch_sources(self.indir)[:2], output, nworkers=1)
+        with open(output, 'a') as f: 
+            f.write('{"source": "' + os.path.join(self.indir, 'c2.qasm')) # interrupted while writing
+        results = run_batch(self.indir, output, nworkers=1)
+        self.assertEqual([os.path.basename(r['source']) for r in results], ['c1.qasm', 'c2.qasm'])
+        self.assertEqual(len(read_results(output)), 4)
+
+    def test_cache(self):
+        output = os.path.join(self.dir, 'results.jsonl')
+        cache = CircuitCache(os.path.join(self.dir, 'cache'))
+        first = run_batch(self.indir, output, nworkers=2, cache=cache)
+        second = run_batch(self.indir, output, nworkers=2, cache=cache, resume=False)
+        key = lambda r: r['source']
+        for r1, r2 in zip(sorted(first, key=key), sorted(second, key=key)):
+            if r1['status'] != 'ok': continue
+            self.assertFalse(r1['cached'])
+            self.assertTrue(r2['cached'])
+            self.assertEqual(r1['gates_after'], r2['gates_after'])
+
+    def test_timeout(self):
+        c = CNOT_HAD_PHASE_circuit(30, 20000, 0.2, 0.2)
+        with open(os.path.join(self.indir, 'big.qasm'), 'w') as f:
+            f.write(c.to_qasm())
+        output = os.path.join(self.dir, 'results.jsonl')
+        results = run_batch(self.indir, output, nworkers=2, timeout=0.5)
+        status = {os.path.basename(r['source']): r['status'] for r in results}
+        self.assertEqual(status['big.qasm'], 'timeout')
+        self.assertEqual(status['c2.qasm'], 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
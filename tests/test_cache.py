@@ -0,0 +1,136 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+import random
+import os
+import sys
+import time
+import shutil
+import tempfile
+import zlib
+import multiprocessing as mp
+from fractions import Fraction
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.generate import CNOT_HAD_PHASE_circuit
+from pyzx.circuit import Circuit
+from pyzx.optimize import basic_optimization
+from pyzx.cache import CircuitCache, circuit_hash, dump_circuit, load_circuit
+
+SEED = 1337
+
+def _put_many(directory, circuits):
+    cache = CircuitCache(directory, max_entries=8)
+    for c in circuits:
+        cache.optimize(c, basic_optimization)
+        cache.get(cache.key(c, 'pyzx.optimize.basic_optimization'))
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+        self.dir = tempfile.mkdtemp()
+        self.circuits = [CNOT_HAD_PHASE_circuit(4, 30, 0.2, 0.2) for _ in range(12)]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_dump_load(self):
+        c = self.circuits[0].copy()
+        c.add_gate("ParityPhase", Fraction(3,4), 0, 2, 3)
+        c.add_gate("TOF", 0, 1, 2)
+        c.add_gate("T", 1, adjoint=True)
+        c.add_gate("ZPhase", 2, phase=Fraction(7,4))
+        c2 = load_circuit(dump_circuit(c))
+        self.assertEqual(c.qubits, c2.qubits)
+        self.assertEqual(c.gates, c2.gates)
+        self.assertEqual([vars(g) for g in c.gates], [vars(g) for g in c2.gates])
+
+    def test_hash(self):
+        c = self.circuits[0]
+        c2 = Circuit(c.qubits, name='other')
+        c2.gates = [g.copy() for g in c.gates]
+        self.assertEqual(circuit_hash(c), circuit_hash(c2))
+        c2.add_gate("HAD", 0)
+        self.assertNotEqual(circuit_hash(c), circuit_hash(c2))
+
+    def test_optimize(self):
+        cache = CircuitCache(self.dir)
+        c = self.circuits[0]
+        c2 = cache.optimize(c, basic_optimization)
+        c3 = cache.optimize(c.copy(), basic_optimization)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(c2.gates, c3.gates)
+        cache.optimize(c, basic_optimization, do_swaps=False)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(len(cache), 2)
+        # A corrupted entry counts as missing
+        key = cache.key(c, 'pyzx.optimize.basic_optimization')
+        with open(cache._path(key), 'wb') as f: f.write(b'garbage')
+        self.assertEqual(cache.get(key), None)
+        self.assertEqual(len(cache), 1)
+        cache.put(key, c2)
+        with open(cache._path(key), 'wb') as f: f.write(zlib.compress(b'["name", 1, 5]'))
+        self.assertEqual(cache.get(key), None)
+        self.assertEqual(len(cache), 1)
+
+    def test_eviction(self):
+        cache = CircuitCache(self.dir, max_entries=10)
+        keys = []
+        for i, c in enumerate(self.circuits[:10]):
+            keys.append(cache.key(c, 'test'))
+            cache.put(keys[-1], c)
+            os.utime(cache._path(keys[-1]), (i, i))
+        self.assertIsNotNone(cache.get(keys[0])) # Makes it the most recently used entry
+        cache.put(cache.key(self.circuits[10], 'test'), self.circuits[10])
+        self.assertEqual(len(cache), 9)
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNone(cache.get(keys[2]))
+        self.assertIsNotNone(cache.get(keys[3]))
+
+    def test_replace(self):
+        cache = CircuitCache(self.dir, max_entries=3)
+        keys = [cache.key(c, 'test') for c in self.circuits[:3]]
+        for k, c in zip(keys, self.circuits): cache.put(k, c)
+        for i in range(10): cache.put(keys[0], self.circuits[i])
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache._entries, 3)
+        self.assertEqual(cache._bytes, sum(e[2] for e in cache._scan()))
+        self.assertTrue(all(cache.get(k) is not None for k in keys))
+
+    def test_concurrent(self):
+        procs = [mp.Process(target=_put_many, args=(self.dir, self.circuits)) for _ in range(4)]
+        for p in procs: p.start()
+        for p in procs: p.join()
+        self.assertTrue(all(p.exitcode == 0 for p in procs))
+        cache = CircuitCache(self.dir, max_entries=8)
+        self.assertTrue(0 < len(cache) <= 4*8)
+        cache.evict()
+        self.assertTrue(0 < len(cache) <= 8)
+        for c in self.circuits:
+            c2 = cache.get(cache.key(c, 'pyzx.optimize.basic_optimization'))
+            if c2 is not None: self.assertEqual(c2.gates, basic_optimization(c).gates)
+        self.assertFalse(any(f.endswith('.tmp') for d in os.listdir(self.dir) 
+                                                for f in os.listdir(os.path.join(self.dir, d))))
+
+
+if __name__ == '__main__':
+    unittest.main()
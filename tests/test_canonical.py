@@ -0,0 +1,113 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+import random
+import sys
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.graph.graph import Graph
+from pyzx.generate import cliffordT
+from pyzx.simplify import full_reduce
+from pyzx.canonical import graph_hash, canonical_labelling
+
+SEED = 1337
+
+def shuffled(g, backend='simple'):
+    """Returns a copy of ``g`` where the vertices and edges are added in a random order."""
+    vs = list(g.vertices())
+    random.shuffle(vs)
+    h = Graph(backend)
+    m = {v: h.add_vertex(g.type(v), phase=g.phase(v)) for v in vs}
+    es = list(g.edges())
+    random.shuffle(es)
+    for e in es:
+        s, t = g.edge_st(e)
+        if random.random() < 0.5: s, t = t, s
+        h.add_edge((m[s],m[t]), g.edge_type(e))
+    h.inputs = [m[v] for v in g.inputs]
+    h.outputs = [m[v] for v in g.outputs]
+    return h
+
+def relabelled_edges(g, labels):
+    return sorted((min(labels[s],labels[t]), max(labels[s],labels[t]), g.edge_type((s,t)))
+                  for s, t in (g.edge_st(e) for e in g.edges()))
+
+class TestCanonical(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+        self.graphs = []
+        for i in range(4):
+            g = cliffordT(4, 40)
+            if i % 2: full_reduce(g)
+            self.graphs.append(g)
+
+    def test_invariance(self):
+        for g in self.graphs:
+            h = graph_hash(g)
+            for backend in ('simple', 'compact'):
+                g2 = shuffled(g, backend)
+                self.assertEqual(graph_hash(g2), h)
+                self.assertEqual(graph_hash(g2, exact=True), graph_hash(g, exact=True))
+
+    def test_sensitivity(self):
+        g = self.graphs[1]
+        h = graph_hash(g)
+        hexact = graph_hash(g, exact=True)
+        g2 = g.copy()
+        v = next(v for v in g2.vertices() if g2.type(v) != 0)
+        g2.add_to_phase(v, 1)
+        self.assertNotEqual(graph_hash(g2), h)
+        self.assertNotEqual(graph_hash(g2, exact=True), hexact)
+        g2 = g.copy()
+        e = next(iter(g2.edges()))
+        g2.set_edge_type(e, 3 - g2.edge_type(e))
+        self.assertNotEqual(graph_hash(g2), h)
+        g2 = g.copy()
+        g2.inputs = list(reversed(g2.inputs))
+        self.assertNotEqual(graph_hash(g2), h)
+
+    def test_canonical_labelling(self):
+        for g in self.graphs:
+            labels = canonical_labelling(g)
+            self.assertEqual(sorted(labels.values()), list(range(g.num_vertices())))
+            g2 = shuffled(g)
+            self.assertEqual(relabelled_edges(g, labels), relabelled_edges(g2, canonical_labelling(g2)))
+
+    def test_symmetric(self):
+        # A cycle can't be split by refinement alone, so this needs the search
+        g = Graph()
+        vs = [g.add_vertex(1) for i in range(6)]
+        for i in range(6): g.add_edge((vs[i], vs[(i+1)%6]))
+        g2 = shuffled(g)
+        self.assertEqual(relabelled_edges(g, canonical_labelling(g)),
+                         relabelled_edges(g2, canonical_labelling(g2)))
+        # Two triangles are not isomorphic to a hexagon, but WL can't tell them apart
+        h = Graph()
+        ws = [h.add_vertex(1) for i in range(6)]
+        for i in range(3):
+            h.add_edge((ws[i], ws[(i+1)%3]))
+            h.add_edge((ws[3+i], ws[3+(i+1)%3]))
+        self.assertEqual(graph_hash(h), graph_hash(g))
+        self.assertNotEqual(graph_hash(h, exact=True), graph_hash(g, exact=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,8 @@
 import unittest
 import random
 import sys
+import io
+from fractions import Fraction
 if __name__ == '__main__':
     sys.path.append('..')
     sys.path.append('.')
@@ -28,10 +30,10 @@ try:
 except ImportError:
     np = None
 
-from pyzx.generate import cliffordT, cliffords
-from pyzx.simplify import clifford_simp
-from pyzx.extract import streaming_extract
-from pyzx.circuit import Circuit
+from pyzx.generate import cliffordT, cliffords, CNOT_HAD_PHASE_circuit
+from pyzx.simplify import clifford_simp, full_reduce
+from pyzx.extract import streaming_extract, streaming_extract_gates
+from pyzx.circuit import Circuit, QASMWriter, QCWriter, QuipperWriter, write_circuit
 
 SEED = 1337
 
@@ -86,5 +88,73 @@ class TestCircuit(unittest.TestCase):
         t2 = c.to_tensor()
         self.assertTrue(compare_tensors(t,t2))
 
+class ChunkCounter(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+class TestCircuitWriters(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(5, 250, 0.2, 0.3)
+        c.add_gate("XPhase", 2, phase=Fraction(3,4))
+        c.add_gate("ZPhase", 1, phase=Fraction(1,1))
+        c.add_gate("TOF", 0, 1, 2)
+        self.c = c
+
+    def test_same_output(self):
+        for dtype in ('qasm', 'qc', 'quipper'):
+            c = self.c.split_phase_gates() if dtype == 'quipper' else self.c
+            f = ChunkCounter()
+            write_circuit(f, c, dtype)
+            expected = {'qasm': c.to_qasm, 'qc': c.to_qc, 'quipper': c.to_quipper}[dtype]()
+            self.assertEqual(f.getvalue(), expected)
+        with self.assertRaises(ValueError):
+            write_circuit(io.StringIO(), self.c, 'tikz')
+
+    def test_chunks(self):
+        f = ChunkCounter()
+        with QCWriter(f, self.c.qubits) as w:
+            w.buffer_size = 20
+            w.add_gates(iter(self.c.gates))
+        self.assertEqual(w.gate_count, len(self.c.gates))
+        self.assertEqual(f.getvalue(), self.c.to_qc())
+        self.assertGreater(f.writes, len(self.c.split_phase_gates().gates) // 20)
+
+    def test_extract_sink(self):
+        random.seed(SEED)
+        g = cliffordT(5, 70, 0.15)
+        full_reduce(g, quiet=True)
+        expected = streaming_extract(g.copy()).to_basic_gates().to_qasm()
+        f = io.StringIO()
+        with QASMWriter(f, g.qubit_count(), basic_gates=True) as w:
+            streaming_extract(g.copy(), sink=w)
+        self.assertEqual(f.getvalue(), expected)
+        f = io.StringIO()
+        with QASMWriter(f, g.qubit_count(), basic_gates=True) as w:
+            w.add_gates(streaming_extract_gates(g.copy()))
+        self.assertEqual(f.getvalue(), expected)
+
+    def test_abort(self):
+        c = Circuit(3)
+        c.add_gate("CNOT", 0, 1)
+        c.add_gate("HAD", 2)
+        for cls in (QASMWriter, QCWriter, QuipperWriter):
+            complete = io.StringIO()
+            with cls(complete, c.qubits) as w:
+                w.add_circuit(c)
+            complete = complete.getvalue()
+            f = io.StringIO()
+            with self.assertRaises(KeyboardInterrupt):
+                with cls(f, c.qubits) as w:
+                    w.add_circuit(c)
+                    raise KeyboardInterrupt()
+            marker = w.comment("Incomplete circuit: KeyboardInterrupt while writing") + "\n"
+            self.assertEqual(f.getvalue(), complete[:len(complete)-len(w.footer())] + marker)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+import random
+import sys
+from fractions import Fraction
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.generate import CNOT_HAD_PHASE_circuit
+from pyzx.circuit import Circuit, PostSelect, InitAncilla
+from pyzx.compact_circuit import CompactCircuit, OBJECT
+
+SEED = 1337
+
+def same_graph(test, g1, g2):
+    test.assertEqual(list(g1.vertices()), list(g2.vertices()))
+    test.assertEqual(sorted(g1.edges()), sorted(g2.edges()))
+    test.assertEqual(g1.inputs, g2.inputs)
+    test.assertEqual(g1.outputs, g2.outputs)
+    for v in g1.vertices():
+        test.assertEqual((g1.type(v), g1.phase(v), g1.qubit(v), g1.row(v)),
+                         (g2.type(v), g2.phase(v), g2.qubit(v), g2.row(v)))
+    for e in g1.edges():
+        test.assertEqual(g1.edge_type(e), g2.edge_type(e))
+
+class TestCompactCircuit(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(5, 300, 0.2, 0.3)
+        c.add_gate("ZPhase", 1, phase=Fraction(3,4))
+        c.add_gate("XPhase", 2, phase=Fraction(1,2))
+        c.add_gate("XPhase", 3)
+        c.add_gate("ZPhase", 0, phase=1)
+        c.add_gate("S", 1, adjoint=True)
+        c.add_gate("T", 2, adjoint=True)
+        c.add_gate("NOT", 3)
+        c.add_gate("CZ", 4, 0)
+        c.add_gate("CX", 2, 3)
+        c.add_gate("SWAP", 1, 4)
+        c.add_gate("TOF", 0, 1, 2)
+        c.add_gate("CCZ", 4, 3, 2)
+        c.add_gate("ParityPhase", Fraction(1,4), 0, 2, 3)
+        c.add_gate("ParityPhase", Fraction(1,2), 1, 4)
+        c.gates.append(c.gates[-1].reposition([0,1,2,3,4])) # targets as a list
+        g = c.gates[0].copy()
+        g.index = 3
+        c.add_gate(g)
+        self.c = c
+
+    def test_conversion(self):
+        cc = CompactCircuit.from_circuit(self.c)
+        self.assertEqual(len(cc), len(self.c.gates))
+        self.assertEqual(cc._ops[-1], OBJECT)
+        c2 = cc.to_circuit()
+        self.assertEqual(c2.qubits, self.c.qubits)
+        for g1, g2 in zip(self.c.gates, c2.gates):
+            self.assertIs(type(g1), type(g2))
+            self.assertEqual(vars(g1), vars(g2))
+            for a in vars(g1): self.assertIs(type(getattr(g1, a)), type(getattr(g2, a)))
+        self.assertEqual(cc.gates[5], self.c.gates[5])
+        self.assertEqual(cc.gates[-3:], self.c.gates[-3:])
+        cc.gates[5] = self.c.gates[-5] # a Tofolli gate replacing a smaller gate
+        self.assertEqual(cc.gates[5], self.c.gates[-5])
+        self.assertEqual(cc.gates[6], self.c.gates[6])
+        self.assertEqual(cc.copy().gates, cc.gates)
+
+    def test_counts(self):
+        cc = CompactCircuit.from_circuit(self.c)
+        self.assertEqual(cc.tcount(), self.c.tcount())
+        self.assertEqual(cc.twoqubitcount(), self.c.twoqubitcount())
+        self.assertEqual(cc.stats(), self.c.stats())
+
+    def test_to_qasm(self):
+        c = Circuit(self.c.qubits)
+        c.gates = [g for g in self.c.gates if g.name not in ('CX', 'SWAP', 'ParityPhase')]
+        self.assertEqual(CompactCircuit.from_circuit(c).to_qasm(), c.to_qasm())
+        with self.assertRaises(TypeError):
+            CompactCircuit.from_circuit(self.c).to_qasm()
+
+    def test_to_graph(self):
+        cc = CompactCircuit.from_circuit(self.c)
+        same_graph(self, cc.to_graph(), self.c.to_graph())
+        same_graph(self, cc.to_graph(compress_rows=False), self.c.to_graph(compress_rows=False))
+        c = Circuit(2)
+        c.add_gate("HAD", 0)
+        c.add_gate(InitAncilla('a'))
+        c.add_gate("CNOT", 1, 'a')
+        c.add_gate(PostSelect('a'))
+        c.add_gate("T", 1)
+        cc = CompactCircuit.from_circuit(c)
+        same_graph(self, cc.to_graph(), c.to_graph())
+
+
+if __name__ == '__main__':
+    unittest.main()
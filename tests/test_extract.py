@@ -18,6 +18,7 @@
 import unittest
 import random
 import sys
+import os
 if __name__ == '__main__':
     sys.path.append('..')
     sys.path.append('.')
@@ -29,8 +30,9 @@ except ImportError:
     np = None
 
 from pyzx.generate import cliffordT, cliffords
-from pyzx.simplify import clifford_simp
-from pyzx.extract import streaming_extract
+from pyzx.simplify import clifford_simp, full_reduce
+from pyzx.circuit import Circuit
+from pyzx.extract import streaming_extract, streaming_extract_gates
 
 SEED = 1337
 
@@ -90,5 +92,76 @@ class TestExtract(unittest.TestCase):
                 t2 = c.to_tensor()
                 self.assertTrue(compare_tensors(t,t2))
 
+    def test_streaming_extract_compact(self):
+        random.seed(SEED)
+        for i in range(5):
+            circ = cliffordT(4,50,0.1,backend='compact')
+            t = tensorfy(circ)
+            full_reduce(circ,quiet=True)
+            with self.subTest(i=i):
+                c = streaming_extract(circ)
+                t2 = c.to_tensor()
+                self.assertTrue(compare_tensors(t,t2))
+
+    def test_streaming_extract_integer_phases(self):
+        random.seed(SEED)
+        for i in range(5):
+            circ = cliffordT(4,50,0.1)
+            circ.set_phase_denominator(4)
+            t = tensorfy(circ)
+            full_reduce(circ,quiet=True)
+            with self.subTest(i=i):
+                c = streaming_extract(circ)
+                t2 = c.to_tensor()
+                self.assertTrue(compare_tensors(t,t2))
+
+    def test_streaming_extract_gates(self):
+        random.seed(SEED)
+        for i in range(5):
+            circ = cliffordT(4,50,0.1)
+            t = tensorfy(circ)
+            full_reduce(circ,quiet=True)
+            start = circ.num_vertices()
+            with self.subTest(i=i):
+                c = Circuit(4)
+                for gate in streaming_extract_gates(circ):
+                    c.add_gate(gate)
+                    self.assertTrue(circ.num_vertices() <= start)
+                self.assertTrue(compare_tensors(t,c.to_tensor()))
+                # Only the boundary, the last frontier and its parents are left
+                self.assertTrue(circ.num_vertices() <= 4*4)
+
+    def test_streaming_extract_sink(self):
+        class Sink(object):
+            def __init__(self): self.gates = []
+            def add_gate(self, gate): self.gates.append(gate)
+        random.seed(SEED)
+        circ = cliffordT(4,50,0.1)
+        full_reduce(circ,quiet=True)
+        sink = Sink()
+        self.assertIs(streaming_extract(circ.copy(), sink=sink), sink)
+        self.assertEqual(sink.gates, streaming_extract(circ.copy()).gates)
+
+FAST = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'circuits', 'Fast')
+
+@unittest.skipUnless(os.path.isdir(FAST), "the benchmark circuits are needed for this to run")
+class TestExtractBenchmarks(unittest.TestCase):
+
+    # Gates, two-qubit gates and T-count of these circuits after full_reduce and streaming_extract,
+    # decomposed into basic gates. Changes that are only meant to make the rewriting faster,
+    # like the order in which candidate edges are built, shouldn't change these.
+    expected = {'tof_4_before': (92, 50, 23),
+                'barenco_tof_3_before': (64, 36, 16),
+                'gf2^4_mult_before': (376, 277, 68),
+                'csla_mux_3_original_before': (301, 203, 62)}
+
+    def test_gate_counts(self):
+        for name, counts in self.expected.items():
+            with self.subTest(circuit=name):
+                g = Circuit.load(os.path.join(FAST, name)).to_basic_gates().to_graph()
+                full_reduce(g, quiet=True)
+                c = streaming_extract(g).to_basic_gates()
+                self.assertEqual((len(c.gates), c.twoqubitcount(), c.tcount()), counts)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
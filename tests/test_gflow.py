@@ -0,0 +1,77 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+import random
+import sys
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.generate import cliffordT
+from pyzx.simplify import spider_simp, to_gh, interior_clifford_simp, full_reduce
+from pyzx.gflow import gflow, fast_gflow
+
+SEED = 1337
+
+def check_gflow(test, g, result):
+    """Checks that the correction set of every vertex only contains vertices of earlier layers,
+    and that the same goes for its odd neighbourhood, except for the vertex itself."""
+    l, flow, k = result
+    test.assertEqual(set(l), set(g.vertices()))
+    for u, X in flow.items():
+        odd = set()
+        for x in X:
+            test.assertLess(l[x], l[u])
+            odd.symmetric_difference_update(g.neighbours(x))
+        test.assertIn(u, odd)
+        for w in odd:
+            if w != u: test.assertLess(l[w], l[u])
+
+class TestGflow(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+
+    def test_fast_gflow(self):
+        for i in range(10):
+            g = cliffordT(4, 60)
+            spider_simp(g, quiet=True)
+            to_gh(g)
+            interior_clifford_simp(g, quiet=True)
+            r1 = gflow(g)
+            r2 = fast_gflow(g)
+            self.assertIsNotNone(r2)
+            self.assertEqual(r1[0], r2[0])
+            self.assertEqual(r1[2], r2[2])
+            check_gflow(self, g, r1)
+            check_gflow(self, g, r2)
+
+    def test_no_gflow(self):
+        found = False
+        for i in range(10):
+            g = cliffordT(4, 60)
+            full_reduce(g, quiet=True)
+            r1 = gflow(g)
+            r2 = fast_gflow(g)
+            self.assertEqual(r1 is None, r2 is None)
+            if r2 is None: found = True
+            else: self.assertEqual(r1[0], r2[0])
+        self.assertTrue(found) # Phase gadgets don't have a gflow
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import unittest
+import random
 from fractions import Fraction
 import sys
 if __name__ == '__main__':
@@ -23,6 +24,8 @@ if __name__ == '__main__':
     sys.path.append('.')
 
 from pyzx.graph import Graph
+from pyzx.graph.graph import backends
+from pyzx.graph.base import BaseGraph
 
 
 class TestGraphBasicMethods(unittest.TestCase):
@@ -41,6 +44,26 @@ class TestGraphBasicMethods(unittest.TestCase):
         g.remove_vertex(v)
         self.assertEqual(g.num_vertices(),3)
 
+    def test_remove_twice(self):
+        # Removing a vertex that isn't there raises a KeyError on every backend
+        for backend in backends:
+            with self.subTest(backend=backend):
+                g = Graph(backend)
+                v1, v2, v3 = g.add_vertices(3)
+                g.add_edges([(v1,v2),(v2,v3)])
+                g.remove_vertex(v2)
+                with self.assertRaises(KeyError): g.remove_vertex(v2)
+                with self.assertRaises(KeyError): g.remove_vertices([v1, v1])
+                with self.assertRaises(KeyError): g.remove_vertex(100)
+                self.assertEqual(set(g.vertices()), {v1, v3}) # nothing was removed
+                g.remove_vertex(v1)
+                self.assertEqual(g.num_vertices(),1)
+                self.assertEqual(g.num_edges(),0)
+                w1, w2 = g.add_vertex(1), g.add_vertex(1)
+                self.assertNotEqual(w1, w2)
+                self.assertEqual(g.num_vertices(),3)
+                self.assertEqual(set(g.vertices()), {v3, w1, w2})
+
     def test_edges(self):
         g = Graph()
         v1, v2, v3 = g.add_vertices(3)
@@ -108,6 +131,105 @@ class TestGraphBasicMethods(unittest.TestCase):
         self.assertEqual(g.edge_type(g.edge(v1,v2)),2)
         self.assertTrue((g.phase(v1)==1  and g.phase(v2)==0) or (g.phase(v1)==0 and g.phase(v2)==1))
 
+    def test_add_edge_table_large(self):
+        """The backends have their own faster versions of add_edge_table, which should give
+        the same result as the generic one."""
+        r = random.Random(1337)
+        edges = set((r.randrange(200),r.randrange(200)) for i in range(1500))
+        edges = {(s,t) for s,t in edges if s < t}
+        etab = {}
+        for i in range(2000):
+            s, t = r.randrange(200), r.randrange(200)
+            if s < t: etab[(s,t)] = [r.randrange(3),r.randrange(3)]
+        def make(backend):
+            g = Graph(backend)
+            g.add_vertices(200)
+            for v in range(200): g.set_type(v, 1 + v%2)
+            for e in edges: g.add_edge(e, 1 + sum(e)%2)
+            return g
+        g = make('simple')
+        BaseGraph.add_edge_table(g, etab)
+        for backend in [b for b in ('simple','compact','igraph') if b in backends]:
+            with self.subTest(backend=backend):
+                g2 = make(backend)
+                g2.add_edge_table(etab)
+                self.assertEqual(g2.num_edges(), g.num_edges())
+                self.assertEqual(set((e,g2.edge_type(e)) for e in g2.edges()), 
+                                 set((e,g.edge_type(e)) for e in g.edges()))
+                self.assertEqual([g2.phase(v) for v in range(200)], [g.phase(v) for v in range(200)])
+
+    def test_edges_of_type(self):
+        r = random.Random(42)
+        for backend in [b for b in ('simple','compact','igraph') if b in backends]:
+            with self.subTest(backend=backend):
+                g = Graph(backend)
+                g.add_vertices(100)
+                for v in range(100): g.set_type(v, 1 + v%2)
+                for i in range(400):
+                    s, t = r.randrange(100), r.randrange(100)
+                    if s != t and not g.connected(s,t): g.add_edge((s,t), r.randrange(1,3))
+                etab = {}
+                for i in range(300):
+                    s, t = r.randrange(100), r.randrange(100)
+                    if s < t: etab[(s,t)] = [r.randrange(2),r.randrange(2)]
+                g.add_edge_table(etab)
+                g.remove_edges(r.sample(sorted(g.edges()), 20))
+                for e in r.sample(sorted(g.edges()), 20): g.set_edge_type(e, 3 - g.edge_type(e))
+                g.remove_vertices(r.sample(sorted(g.vertices()), 10))
+                for t in (1,2):
+                    expected = set(e for e in g.edges() if g.edge_type(e) == t)
+                    self.assertEqual(set(g.edges_of_type(t)), expected)
+                    self.assertEqual(g.num_edges_of_type(t), len(expected))
+                self.assertEqual(g.edge_set(), set(g.edges()))
+                self.assertEqual(g.edge_view(), set(g.edges()))
+                self.assertEqual(len(g.edge_view()), g.num_edges())
+                self.assertEqual(set(g.edges()), 
+                        set(g.edge(v,w) for v in g.vertices() for w in g.neighbours(v)))
+
+    def test_edge_set_and_view(self):
+        g = Graph('simple')
+        g.add_vertices(4)
+        g.add_edges([(0,1),(1,2),(2,3)])
+        s = g.edge_set()
+        view = g.edge_view()
+        s.discard((0,1))
+        self.assertEqual(g.num_edges(), 3)
+        self.assertIn((0,1), view)
+        self.assertNotIn((1,0), view)
+        g.add_edge((0,3))
+        self.assertIn((0,3), view)
+        self.assertNotIn((0,3), s)
+        self.assertEqual(view, {(0,1),(1,2),(2,3),(0,3)})
+        self.assertEqual(len(view), 4)
+
+    def test_snapshot_rollback(self):
+        g = Graph('simple')
+        vs = g.add_vertices(4)
+        g.add_edges([(0,1),(1,2),(2,3)])
+        g.set_phase(1, Fraction(1,4))
+        g.set_qubit(2, 1)
+        g.snapshot()
+        g.add_edge_table({(0,2): [1,0], (1,2): [0,1]})
+        g.remove_vertex(3)
+        v = g.add_vertex(1, phase=Fraction(1,2))
+        g.add_edge((v,0), 2)
+        g.set_phase(1, Fraction(3,4))
+        g.set_type(0, 2)
+        g.snapshot()
+        g.remove_vertex(0)
+        g.commit()
+        self.assertEqual(g.num_vertices(), 3)
+        g.rollback()
+        self.assertEqual(set(g.vertices()), {0,1,2,3})
+        self.assertEqual(set(g.edges()), {(0,1),(1,2),(2,3)})
+        self.assertEqual(set(g.edges_of_type(1)), {(0,1),(1,2),(2,3)})
+        self.assertEqual(g.num_edges(), 3)
+        self.assertEqual(g.phase(1), Fraction(1,4))
+        self.assertEqual(g.type(0), 0)
+        self.assertEqual(g.qubit(2), 1)
+        self.assertEqual(g.add_vertex(), 4)
+        self.assertRaises(ValueError, g.rollback)
+
     def test_copy(self):
         g = Graph()
         v1, v2 = g.add_vertices(2)
@@ -118,6 +240,27 @@ class TestGraphBasicMethods(unittest.TestCase):
         v1, v2 = list(g2.vertices())
         self.assertEqual(g.edge_type(g.edge(v1,v2)),2)
 
+    def test_integer_phases(self):
+        g = Graph()
+        v1, v2 = g.add_vertices(2)
+        g.set_phase(v1, Fraction(3,4))
+        g.set_phase_denominator(4)
+        self.assertEqual(g.phase(v1), 3)
+        self.assertEqual(g.phase_fraction(g.phase(v1)), Fraction(3,4))
+        g.add_to_phase(v1, g.phase_units(Fraction(3,2)))
+        self.assertEqual(g.phase(v1), 1)
+        g.set_phase(v2, g.phase_units(Fraction(1,3)))
+        self.assertEqual(g.phase(v2), Fraction(4,3))
+        g.add_to_phase(v2, Fraction(2,3))
+        self.assertEqual(g.phase(v2), 2)
+        self.assertTrue(isinstance(g.phase(v2), int))
+        g2 = g.copy()
+        self.assertEqual(g2.phase_denominator, 4)
+        self.assertEqual(sorted(g2.phases().values()), [1,2])
+        g.set_phase_denominator(None)
+        self.assertEqual(g.phase(v1), Fraction(1,4))
+        self.assertRaises(ValueError, g.set_phase_denominator, 3)
+
 
 class TestGraphCircuitMethods(unittest.TestCase):
 
@@ -172,5 +315,87 @@ class TestGraphCircuitMethods(unittest.TestCase):
         num_hadamards = len([e for e in g2.edges() if g2.edge_type(e)==2])
         self.assertEqual(num_hadamards, 0)
 
+class TestGraphCompactBackend(unittest.TestCase):
+
+    def test_vertex_reuse(self):
+        g = Graph('compact')
+        v1, v2, v3 = g.add_vertices(3)
+        g.add_edges([(v1,v2),(v2,v3)])
+        g.set_phase(v2, Fraction(1,4))
+        g.set_qubit(v2, 1)
+        g.remove_vertex(v2)
+        self.assertEqual(g.num_vertices(),2)
+        self.assertEqual(g.num_edges(),0)
+        self.assertFalse(v2 in g.vertices())
+        self.assertFalse(v2 in g.qubits())
+        w = g.add_vertex(1)
+        self.assertEqual(w, v2)
+        self.assertEqual(g.phase(w), 0)
+        self.assertEqual(g.qubit(w), -1)
+        self.assertEqual(g.vertex_degree(w), 0)
+
+    def test_adjacency_growth(self):
+        g = Graph('compact')
+        vs = g.add_vertices(50)
+        for v in vs[1:]:
+            g.add_edge((vs[0],v), 1 + v%2)
+        self.assertEqual(g.vertex_degree(vs[0]), 49)
+        self.assertEqual(set(g.neighbours(vs[0])), set(vs[1:]))
+        self.assertTrue(all(g.edge_type(g.edge(vs[0],v)) == 1 + v%2 for v in vs[1:]))
+        g.remove_vertices(vs[1:25])
+        g.compact()
+        self.assertEqual(g.num_edges(), 25)
+        self.assertEqual(sorted(g.neighbours(vs[0])), vs[25:])
+        self.assertEqual(sorted(g.edges()), [(vs[0],v) for v in vs[25:]])
+
+    def test_copy_to_simple(self):
+        g = Graph('compact')
+        i = g.add_vertex(0,0,0)
+        v = g.add_vertex(1,0,1,Fraction(1,2))
+        o = g.add_vertex(0,0,2)
+        g.add_edges([(i,v),(v,o)])
+        g.inputs, g.outputs = [i], [o]
+        g2 = g.copy(backend='simple')
+        self.assertEqual(g2.backend, 'simple')
+        self.assertEqual(g2.num_edges(), 2)
+        self.assertEqual(g2.depth(), 2)
+        self.assertEqual(sorted(g2.phases().values()), [0,0,Fraction(1,2)])
+
+@unittest.skipUnless('igraph' in backends, "python-igraph needs to be installed for this to run")
+class TestGraphIgraphBackend(unittest.TestCase):
+
+    def test_stable_vertex_indices(self):
+        g = Graph('igraph')
+        vs = g.add_vertices(5)
+        g.add_edges([(0,1),(1,2),(2,3),(3,4)])
+        g.set_phase(3, Fraction(1,4))
+        g.set_row(4, 2)
+        g.remove_vertices([1,2])
+        self.assertEqual(set(g.vertices()), {0,3,4})
+        self.assertEqual(list(g.edges()), [(3,4)])
+        self.assertEqual(g.phase(3), Fraction(1,4))
+        self.assertEqual(g.depth(), 2)
+        self.assertEqual(g.vertex_degree(0), 0)
+        w = g.add_vertex(1)
+        self.assertTrue(w in (1,2))
+        self.assertEqual(g.vertex_degree(w), 0)
+        self.assertFalse(g.connected(w, 0))
+
+    def test_full_reduce(self):
+        from pyzx.generate import CNOT_HAD_PHASE_circuit
+        from pyzx.simplify import full_reduce
+        from pyzx.extract import streaming_extract
+        from pyzx.tensor import compare_tensors
+        random.seed(1337)
+        for i in range(5):
+            with self.subTest(i=i):
+                c = CNOT_HAD_PHASE_circuit(4, 60, p_had=0.2, p_t=0.2)
+                g = c.to_graph(backend='igraph')
+                full_reduce(g)
+                g2 = c.to_graph()
+                full_reduce(g2)
+                self.assertEqual(g.num_vertices(), g2.num_vertices())
+                self.assertTrue(compare_tensors(c.to_tensor(), streaming_extract(g).to_tensor()))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -16,12 +16,13 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import unittest
+import random
 import sys
 if __name__ == '__main__':
     sys.path.append('..')
     sys.path.append('.')
 
-from pyzx.linalg import Mat2
+from pyzx.linalg import Mat2, BitMat2, greedy_reduction
 
 
 class TestMat2(unittest.TestCase):
@@ -74,6 +75,11 @@ class TestMat2(unittest.TestCase):
         b = Mat2([[1],[0],[1],[1],[0]])
         x = self.m4.solve(b)
         self.assertEqual(self.m4*x, b)
+        m = Mat2([[0,1,1],
+                  [0,0,1]])
+        b = Mat2([[0],[1]])
+        x = m.solve(b)
+        self.assertEqual(m*x, b)
 
     def test_factor(self):
         m0, m1 = self.m3.factor()
@@ -81,5 +87,52 @@ class TestMat2(unittest.TestCase):
         self.assertEqual(m1.rows(),self.m3.rank())
         self.assertEqual(m0*m1, self.m3)
 
+
+class RowOps(object):
+    def __init__(self): self.ops = []
+    def row_add(self, r1, r2): self.ops.append(('row',r1,r2))
+    def col_add(self, c1, c2): self.ops.append(('col',c1,c2))
+
+class TestBitMat2(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(1337)
+        self.matrices = [Mat2([[random.randint(0,1) for j in range(c)] for i in range(r)])
+                         for r, c in [(5,5),(8,3),(3,8),(20,20),(12,70),(70,12)]]
+
+    def test_conversion(self):
+        for m in self.matrices:
+            b = BitMat2.from_mat2(m)
+            self.assertEqual(b.to_mat2(), m)
+            self.assertEqual([[b.entry(i,j) for j in range(m.cols())] for i in range(m.rows())], m.data)
+
+    def test_same_row_operations(self):
+        for m in self.matrices:
+            for full_reduce in (False, True):
+                for blocksize in (1, 3, 6, 100):
+                    m1, x1 = m.copy(), RowOps()
+                    b, x2 = BitMat2.from_mat2(m), RowOps()
+                    r1 = m1.gauss(full_reduce=full_reduce, x=x1, y=x1, blocksize=blocksize)
+                    r2 = b.gauss(full_reduce=full_reduce, x=x2, y=x2, blocksize=blocksize)
+                    self.assertEqual(r1, r2)
+                    self.assertEqual(x1.ops, x2.ops)
+                    self.assertEqual(b.to_mat2(), m1)
+
+    def test_row_col_operations(self):
+        m = self.matrices[3]
+        b = BitMat2.from_mat2(m)
+        m.row_add(2,5); b.row_add(2,5)
+        m.col_add(4,1); b.col_add(4,1)
+        m.row_swap(0,7); b.row_swap(0,7)
+        self.assertEqual(b.to_mat2(), m)
+        self.assertEqual(b.rank(), m.rank())
+        self.assertEqual([(c.control,c.target) for c in b.to_cnots()],
+                         [(c.control,c.target) for c in m.to_cnots()])
+
+    def test_greedy_reduction(self):
+        for m in self.matrices:
+            self.assertEqual(greedy_reduction(m), greedy_reduction(BitMat2.from_mat2(m)))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
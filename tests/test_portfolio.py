@@ -0,0 +1,91 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+import random
+import sys
+import time
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.generate import cliffordT
+from pyzx.circuit import Circuit
+from pyzx.simplify import full_reduce
+from pyzx.extract import streaming_extract
+from pyzx.portfolio import portfolio_extract
+
+try:
+    import numpy as np
+    from pyzx.tensor import compare_tensors
+except ImportError:
+    np = None
+
+SEED = 1337
+
+def _slow(g, seed):
+    if seed is not None: time.sleep(60)
+    return streaming_extract(g, seed=seed)
+
+def _broken(g, seed):
+    raise ValueError("broken")
+
+class TestPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+        self.circuit = Circuit.from_graph(cliffordT(5, 150))
+        self.g = self.circuit.to_graph()
+        full_reduce(self.g)
+        self.vertices = self.g.num_vertices()
+
+    @unittest.skipUnless(np, "numpy needs to be installed for this to run")
+    def test_portfolio(self):
+        results = []
+        c = portfolio_extract(self.g, seeds=6, strategies=('extract', 'basic'), nworkers=2, callback=results.append)
+        self.assertTrue(compare_tensors(self.circuit, c))
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(r['status'] == 'ok' for r in results))
+        self.assertEqual(c.twoqubitcount(), min(r['cost'] for r in results))
+        self.assertLessEqual(c.twoqubitcount(), streaming_extract(self.g.copy()).twoqubitcount())
+        c2 = portfolio_extract(self.g, seeds=[None, 1], cost='depth', nworkers=2)
+        self.assertTrue(compare_tensors(self.circuit, c2))
+        self.assertEqual(self.g.num_vertices(), self.vertices) # g itself is left alone
+
+    def test_stop_early(self):
+        results = []
+        portfolio_extract(self.g, seeds=8, nworkers=1, target=10**6, callback=results.append)
+        self.assertEqual(len(results), 1)
+        t = time.perf_counter()
+        c = portfolio_extract(self.g, seeds=3, strategies=(_slow,), nworkers=3, deadline=1)
+        self.assertLess(time.perf_counter() - t, 30)
+        self.assertEqual(c.gates, streaming_extract(self.g.copy()).gates)
+
+    def test_errors(self):
+        results = []
+        c = portfolio_extract(self.g, seeds=2, strategies=(_broken, 'extract'), nworkers=2, callback=results.append)
+        self.assertEqual(sorted(r['status'] for r in results), ['error', 'error', 'ok', 'ok'])
+        self.assertEqual(c.qubits, 5)
+        with self.assertRaises(Exception):
+            portfolio_extract(self.g, seeds=1, strategies=(_broken,), nworkers=1)
+        with self.assertRaises(ValueError):
+            portfolio_extract(self.g, strategies=('unknown',))
+        with self.assertRaises(ValueError):
+            portfolio_extract(self.g, cost='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimisation using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+import random
+import sys
+import os
+import io
+import tempfile
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.generate import CNOT_HAD_PHASE_circuit
+from pyzx.circuit import Circuit, QASMParser
+from pyzx import qasm
+from pyzx.qasm import parse_qasm, load_qasm
+
+SEED = 1337
+
+CUSTOM = """OPENQASM 2.0;
+include "qelib1.inc"; // standard gates
+gate maj a,b,c
+{
+  cx c,b;
+  cx c,a; ccx a,b,c;
+}
+gate foo() a, b { maj a,b,b; rz(0.5*pi) b; }
+qreg q[3];
+qreg r[3]; creg c[3];
+maj q[0],q[1],q[2];
+foo q, r; // broadcast over both registers
+cx q, r[1]; h r;
+tdg q[2]; rx(1.25) q[0];
+maj q[0],q[1],q[2];
+measure q[0] -> c[0];
+"""
+
+class TestQASM(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(SEED)
+        self.c = CNOT_HAD_PHASE_circuit(6, 400, 0.2, 0.3)
+        self.c.add_gate("TOF", 0, 1, 2)
+        self.c.add_gate("CCZ", 4, 3, 2)
+        self.c.add_gate("S", 1, adjoint=True)
+        self.c.add_gate("T", 2, adjoint=True)
+        self.c.add_gate("NOT", 3)
+
+    def same_gates(self, gates1, gates2):
+        self.assertEqual([(type(g), vars(g)) for g in gates1], [(type(g), vars(g)) for g in gates2])
+
+    def test_same_circuit(self):
+        for s in (self.c.to_qasm(), CUSTOM):
+            c1 = QASMParser().parse(s)
+            c2 = parse_qasm(io.StringIO(s))
+            self.assertEqual(c2.qubits, c1.qubits)
+            self.same_gates(c2.gates, c1.gates)
+            c3 = parse_qasm(io.StringIO(s), compact=True)
+            self.assertEqual(c3.qubits, c1.qubits)
+            self.same_gates(c3.gates, c1.gates)
+
+    def test_small_blocks(self):
+        block_size = qasm.BLOCK_SIZE
+        qasm.BLOCK_SIZE = 7
+        try:
+            for s in (self.c.to_qasm(), CUSTOM):
+                self.same_gates(parse_qasm(io.StringIO(s)).gates, QASMParser().parse(s).gates)
+        finally:
+            qasm.BLOCK_SIZE = block_size
+
+    def test_gates_are_distinct(self):
+        c = parse_qasm(io.StringIO(CUSTOM))
+        self.assertEqual(len(set(id(g) for g in c.gates)), len(c.gates))
+        g1, g2 = c.gates[0], c.gates[-3]
+        self.assertEqual(g1, g2)
+        g1.target = 5
+        self.assertEqual(g2.target, 1)
+
+    def test_load(self):
+        fd, fname = tempfile.mkstemp(suffix='.qasm')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.c.to_qasm())
+            c = load_qasm(fname)
+            self.assertEqual(c.name, os.path.basename(fname))
+            self.same_gates(c.gates, QASMParser().parse(self.c.to_qasm()).gates)
+            self.same_gates(Circuit.load(fname).gates, c.gates)
+        finally:
+            os.remove(fname)
+
+    def test_definition_after_use(self):
+        s = CUSTOM.replace('gate maj a,b,c', 'qreg p[1];\nmaj p[0], p[0], p[0];\ngate maj a,b,c')
+        c1 = QASMParser().parse(s)
+        for compact in (False, True):
+            c2 = parse_qasm(io.StringIO(s), compact)
+            self.assertEqual(c2.qubits, c1.qubits)
+            self.same_gates(c2.gates, c1.gates)
+        class Unseekable(io.StringIO):
+            def seekable(self): return False
+        with self.assertRaises(TypeError):
+            parse_qasm(Unseekable(s))
+
+    def test_errors(self):
+        header = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\n'
+        for s in ('qreg q[2];\n',
+                  'OPENQASM 2.0;\nqreg q[2];\n',
+                  header + 'u3(0,0,0) q[0];\n',
+                  header + 'cx q[0], p[1];\n',
+                  header + 'if(c==1) x q[0];\n',
+                  header + 'gate foo(theta) a { rz(theta) a; }\n',
+                  header + 'gate foo a { x a;\n'):
+            with self.assertRaises(TypeError):
+                parse_qasm(io.StringIO(s))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,8 @@
 import unittest
 import random
 import sys
+from fractions import Fraction
+
 if __name__ == '__main__':
     sys.path.append('..')
     sys.path.append('.')
@@ -28,8 +30,13 @@ try:
 except ImportError:
     np = None
 
-from pyzx.generate import cliffordT
+from pyzx.generate import cliffordT, CNOT_HAD_PHASE_circuit
+from pyzx.graph import Graph
+from pyzx.graph.graph_s import GraphS
+from pyzx.rules import GadgetIndex, match_phase_gadgets, match_spider_parallel, match_pivot_parallel
 from pyzx.simplify import *
+from pyzx import simplify
+from pyzx.extract import streaming_extract
 
 SEED = 1337
 
@@ -74,6 +81,270 @@ class TestSimplify(unittest.TestCase):
     def test_clifford_simp(self):
         self.func_test(clifford_simp)
 
+    def test_incremental_simp(self):
+        for func in (spider_simp, id_simp, pivot_simp, lcomp_simp):
+            for i,c in enumerate(self.circuits):
+                with self.subTest(i=i, func=func.__name__):
+                    c = c.copy()
+                    spider_simp(c, quiet=True)
+                    to_gh(c)
+                    t = tensorfy(c)
+                    func(c, quiet=True, incremental=True)
+                    t2 = tensorfy(c)
+                    self.assertTrue(compare_tensors(t,t2))
+                    self.assertEqual(func(c, quiet=True), 0) # incremental rounds reach the same fixpoint
+
+    def test_parallel_simp(self):
+        min_vertices, cpus = simplify.PARALLEL_MIN_VERTICES, simplify.available_cpus
+        simplify.PARALLEL_MIN_VERTICES = 0
+        simplify.available_cpus = lambda: 4 # also test the workers on a machine with a single CPU
+        try:
+            for i,c in enumerate(self.circuits):
+                with self.subTest(i=i):
+                    c = c.copy()
+                    t = tensorfy(c)
+                    full_reduce(c, quiet=True, nworkers=3)
+                    t2 = tensorfy(c)
+                    self.assertTrue(compare_tensors(t,t2))
+                    self.assertEqual(simplify.interior_clifford_simp(c, quiet=True), 0)
+        finally:
+            simplify.PARALLEL_MIN_VERTICES, simplify.available_cpus = min_vertices, cpus
+
+    def test_parallel_simp_single_cpu(self):
+        # Without a second CPU no workers are started, and the result is that of full_reduce
+        min_vertices, cpus = simplify.PARALLEL_MIN_VERTICES, simplify.available_cpus
+        partition = simplify.partition_graph
+        simplify.PARALLEL_MIN_VERTICES = 0
+        simplify.available_cpus = lambda: 1
+        def no_partition(g, nparts): raise AssertionError("started worker processes")
+        simplify.partition_graph = no_partition
+        try:
+            for i,c in enumerate(self.circuits):
+                with self.subTest(i=i):
+                    c1, c2 = c.copy(), c.copy()
+                    full_reduce(c1, quiet=True)
+                    full_reduce(c2, quiet=True, nworkers=3)
+                    self.assertEqual(sorted(c1.edges()), sorted(c2.edges()))
+        finally:
+            simplify.PARALLEL_MIN_VERTICES, simplify.available_cpus = min_vertices, cpus
+            simplify.partition_graph = partition
+
+    def test_partition_graph(self):
+        g = self.circuits[4].copy()
+        region = simplify.partition_graph(g, 4)
+        self.assertEqual(set(region), set(g.vertices()))
+        sizes = [list(region.values()).count(r) for r in range(4)]
+        self.assertTrue(max(sizes) <= 1.1*(g.num_vertices()//4 + 1) + 1)
+        self.assertEqual(region, simplify.partition_graph(g.copy(), 4))
+
+    def test_worklist_reduce(self):
+        for i,c in enumerate(self.circuits):
+            with self.subTest(i=i):
+                c2 = c.copy()
+                t = tensorfy(c)
+                worklist_reduce(c2, quiet=True)
+                self.assertTrue(compare_tensors(t,tensorfy(c2)))
+                c3 = c.copy()
+                full_reduce(c3, quiet=True)
+                self.assertEqual(tcount(c2), tcount(c3))
+
+    def test_worklist_full_scans(self):
+        # Count the calls of the match functions that look at the whole graph
+        from pyzx import rules
+        scans = []
+        edge_candidates, vertex_candidates = rules._edge_candidates, rules._vertex_candidates
+        match_gadgets = simplify.match_phase_gadgets
+        def count(f):
+            def counted(g, matchf, candidates, *args, **kwargs):
+                if candidates is None: scans.append(f)
+                return f(g, matchf, candidates, *args, **kwargs)
+            return counted
+        def counted_gadgets(g, index=None):
+            if index is None: scans.append(match_gadgets)
+            return match_gadgets(g, index)
+        try:
+            rules._edge_candidates = count(edge_candidates)
+            rules._vertex_candidates = count(vertex_candidates)
+            simplify.match_phase_gadgets = counted_gadgets
+            for i,c in enumerate(self.circuits):
+                with self.subTest(i=i):
+                    del scans[:]
+                    full_reduce(c.copy(), quiet=True)
+                    full = len(scans)
+                    del scans[:]
+                    worklist_reduce(c.copy(), quiet=True)
+                    # The initial spider fusion and the first round of every rule
+                    self.assertLessEqual(len(scans), 1 + 7)
+                    self.assertLess(len(scans), full)
+        finally:
+            rules._edge_candidates, rules._vertex_candidates = edge_candidates, vertex_candidates
+            simplify.match_phase_gadgets = match_gadgets
+
+    def test_gadget_index(self):
+        from pyzx.rules import GadgetIndex, match_pivot_gadget, match_phase_gadgets, merge_phase_gadgets, pivot
+        for i,c in enumerate(self.circuits):
+            with self.subTest(i=i):
+                c = c.copy()
+                simplify.interior_clifford_simp(c, quiet=True)
+                index = GadgetIndex(c)
+                for match in (match_pivot_gadget, lambda g: match_phase_gadgets(g, index)):
+                    m = match(c)
+                    touched = simplify.match_neighbourhood(c, m)
+                    simplify._apply_matches(c, pivot if match is match_pivot_gadget else merge_phase_gadgets, 
+                                            m, touched)
+                    index.update(c, touched)
+                    fresh = GadgetIndex(c)
+                    self.assertEqual(index.leaf, fresh.leaf)
+                    self.assertEqual(index.targets, fresh.targets)
+                    self.assertEqual(index.groups, fresh.groups)
+
+    def test_rewrite_stats(self):
+        seen = []
+        stats = RewriteStats(callback=seen.append)
+        c = self.circuits[4].copy()
+        nv = c.num_vertices()
+        full_reduce(c, quiet=True, stats=stats)
+        self.assertEqual(seen, stats.records)
+        summary = stats.summary()
+        self.assertIn('spider_simp', summary)
+        self.assertIn('pivot_gadget_simp', summary)
+        self.assertEqual(sum(s['vertices_removed'] for s in summary.values()), nv - c.num_vertices())
+        self.assertEqual(stats.records[-1].vertices, c.num_vertices())
+        for r in stats.records:
+            self.assertTrue(r.match_time >= 0 and r.rewrite_time >= 0 and r.edge_table_time >= 0)
+
+    def test_rewrite_budget(self):
+        for i,c in enumerate(self.circuits):
+            for rewrites in (0, 5, 20):
+                with self.subTest(i=i, rewrites=rewrites):
+                    c2 = c.copy()
+                    budget = RewriteBudget(rewrites=rewrites)
+                    full_reduce(c2, budget=budget)
+                    self.assertTrue(budget.rewrites <= rewrites)
+                    t = tensorfy(c)
+                    t2 = streaming_extract(c2.copy()).to_tensor()
+                    self.assertTrue(compare_tensors(t,t2))
+        c = self.circuits[0].copy()
+        budget = RewriteBudget(iterations=2)
+        teleport_reduce(c, budget=budget)
+        self.assertTrue(budget.exhausted)
+        self.assertEqual(budget.iterations, 2)
+
+    def test_edge_delta(self):
+        from pyzx.rules import (pivot_edge_delta, lcomp_edge_delta, match_pivot_parallel, pivot,
+                                match_lcomp_parallel, lcomp)
+        for i,c in enumerate(self.circuits):
+            with self.subTest(i=i):
+                c = c.copy()
+                spider_simp(c, quiet=True)
+                to_gh(c)
+                for match, rewrite, score in ((match_pivot_parallel, pivot, pivot_edge_delta),
+                                              (match_lcomp_parallel, lcomp, lcomp_edge_delta)):
+                    for m in match(c)[:3]:
+                        delta = score(c, m)
+                        ne = c.num_edges()
+                        c.snapshot()
+                        simplify._apply_matches(c, rewrite, [m])
+                        self.assertEqual(c.num_edges() - ne, delta)
+                        c.rollback()
+
+    def test_scored_simp(self):
+        for i,c in enumerate(self.circuits):
+            with self.subTest(i=i):
+                c2 = c.copy()
+                spider_simp(c2, quiet=True)
+                to_gh(c2)
+                limit = c2.num_edges()
+                stats = RewriteStats()
+                simplify.interior_clifford_simp(c2, quiet=True, edge_limit=limit, stats=stats)
+                self.assertTrue(c2.num_edges() <= limit)
+                self.assertLessEqual(max(r.edges for r in stats.records), limit) # after every round
+                self.assertTrue(compare_tensors(tensorfy(c), tensorfy(c2)))
+                c3 = c.copy()
+                full_reduce(c3, growth_target=-0.2)
+                self.assertTrue(compare_tensors(tensorfy(c), streaming_extract(c3).to_tensor()))
+
+    def test_edge_limit_peak(self):
+        # A circuit on which the unbounded Clifford simplification passes through more edges
+        random.seed(SEED)
+        g = CNOT_HAD_PHASE_circuit(8, 300, 0.3, 0.1).to_graph()
+        spider_simp(g, quiet=True)
+        to_gh(g)
+        limit = g.num_edges()
+        def peak(g, edge_limit=None):
+            stats = RewriteStats()
+            simplify.interior_clifford_simp(g, quiet=True, stats=stats, edge_limit=edge_limit)
+            return max(r.edges for r in stats.records)
+        self.assertGreater(peak(g.copy()), limit)
+        self.assertLessEqual(peak(g.copy(), edge_limit=limit), limit)
+
+    def test_match_order(self):
+        from pyzx import rules
+        def rebuilt(g):
+            # Same graph, but with the edges inserted in reverse order
+            h = g.copy()
+            h.remove_edges(list(h.edges()))
+            h.add_edges(list(reversed(list(g.edges()))))
+            for e in g.edges(): h.set_edge_type(e, g.edge_type(e))
+            return h
+        def result(g):
+            full_reduce(g, quiet=True)
+            return sorted(g.edges()), sorted(g.phases().items())
+        try:
+            for order in ('sorted', 42):
+                rules.MATCH_ORDER = order
+                for i,c in enumerate(self.circuits):
+                    with self.subTest(order=order, i=i):
+                        r = result(c.copy(backend='simple'))
+                        self.assertEqual(r, result(rebuilt(c)))
+                        self.assertEqual(r, result(c.copy(backend='simple')))
+                        c2 = c.copy()
+                        full_reduce(c2, quiet=True)
+                        self.assertTrue(compare_tensors(tensorfy(c), streaming_extract(c2).to_tensor()))
+        finally:
+            rules.MATCH_ORDER = None
+
+    def test_match_order_uses_edge_index(self):
+        # With a fixed order, spider fusion and pivoting only look at the edges of the right type
+        from pyzx import rules
+        class NoScan(GraphS):
+            def edges(self): raise AssertionError("scanned all the edges")
+        try:
+            rules.MATCH_ORDER = 'sorted'
+            for c in self.circuits:
+                g = c.copy(backend='simple')
+                expected = (match_spider_parallel(g), match_pivot_parallel(g, check_edge_types=False))
+                g.__class__ = NoScan
+                self.assertEqual(match_spider_parallel(g), expected[0])
+                self.assertEqual(match_pivot_parallel(g, check_edge_types=False), expected[1])
+        finally:
+            rules.MATCH_ORDER = None
+
+
+class TestGadgetIndex(unittest.TestCase):
+
+    def test_hub_next_to_boundary(self):
+        # Gadgets whose hub is also connected to an input, which has degree 1 as well
+        g = Graph()
+        t1, t2 = g.add_vertex(1,0,2), g.add_vertex(1,1,2)
+        g.add_edge((t1,t2))
+        leaves = dict()
+        for q in range(8):
+            h = g.add_vertex(1,q+2,1,phase=1)
+            l = g.add_vertex(1,q+2,2,phase=Fraction(1,4))
+            g.add_edges([(h,l),(h,t1),(h,t2)],2)
+            leaves[h] = l
+        for q, h in enumerate(leaves):
+            i = g.add_vertex(0,q+2,0)
+            g.add_edge((i,h))
+            g.inputs.append(i)
+        index = GadgetIndex(g)
+        self.assertEqual(index.leaf, leaves)
+        index.update(g, list(g.vertices()))
+        self.assertEqual(index.leaf, leaves)
+        self.assertEqual(len(match_phase_gadgets(g.copy())), 8)
+        m = match_phase_gadgets(g, index)
+        self.assertEqual(sorted((n,v) for v,n,_,_,_ in m), sorted(leaves.items()))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file